@@ -13,12 +13,13 @@ from groq import Groq
 
 load_dotenv()
 
-from transcription import TranscriptionService
+from transcription import TranscriptionService, LiveTranscriptionSession
 from image_processing import ImageProcessingService
 from summarization import ConsultationSummaryService
 from term_explanation import TermExplanationService
 from medication import MedicationSchedulingService
 from memory import Mem0Service
+from explanation_cache import ExplanationCache
 from orchestrator import AgnoOrchestrator
 
 def initialize_services():
@@ -30,6 +31,7 @@ def initialize_services():
         explanation_service = TermExplanationService()
         medication_service = MedicationSchedulingService()
         memory_service = Mem0Service()
+        explanation_cache = ExplanationCache()
         
         orchestrator = AgnoOrchestrator(
             transcription_service,
@@ -37,7 +39,8 @@ def initialize_services():
             summary_service, 
             explanation_service, 
             medication_service, 
-            memory_service
+            memory_service,
+            explanation_cache=explanation_cache
         )
         
         print("Services initialized successfully.")
@@ -61,27 +64,51 @@ def create_user_session():
     }
     return user_id
 
-def process_consultation(audio_file=None, text_input=None, image_file=None, user_id=None):
-    """Process a consultation and return formatted results."""
+def highlight_terms(terms):
+    """Format terms for the highlighted terms component."""
+    return [(term["term"], term["term"]) for term in terms]
+
+def end_user_session(user_id):
+    """Drop a closed session and cancel its queued background work."""
+    if user_id is None:
+        return
+    orchestrator.cancel_prefetch(user_id)
+    active_users.pop(user_id, None)
+
+def process_consultation(audio_file=None, text_input=None, image_file=None, document_files=None, user_id=None):
+    """Process a consultation, streaming the summary and terms into the UI as they are generated."""
     if user_id is None or user_id not in active_users:
         user_id = create_user_session()
     
+    if image_file is None and document_files:
+        image_file = document_files
+    
     if audio_file is None and image_file is None and (text_input is None or text_input.strip() == ""):
-        return "Please provide either an audio recording, image, or text input.", None, "[]", user_id
+        yield "Please provide either an audio recording, image, or text input.", None, "[]", [], user_id
+        return
     
     try:
-        result = orchestrator.process_consultation(user_id, audio_file, text_input, image_file)
-        
-        active_users[user_id]["consultations"].append(result)
-        
-        formatted_terms = json.dumps(result["terms"])
+        if os.getenv("SUMMARY_STREAMING", "true").lower() not in ("1", "true", "yes"):
+            result = orchestrator.process_consultation(user_id, audio_file, text_input, image_file)
+            active_users[user_id]["consultations"].append(result)
+            yield result["summary"], result["transcription"], json.dumps(result["terms"]), highlight_terms(result["terms"]), user_id
+            return
         
-        return result["summary"], result["transcription"], formatted_terms, user_id
+        shown_terms = 0
+        for result in orchestrator.process_consultation_stream(user_id, audio_file, text_input, image_file):
+            if result["done"]:
+                active_users[user_id]["consultations"].append(result)
+            elif len(result["terms"]) == shown_terms:
+                # Only the summary text changed; leave the terms components alone
+                yield result["summary"], result["transcription"], gr.update(), gr.update(), user_id
+                continue
+            shown_terms = len(result["terms"])
+            yield result["summary"], result["transcription"], json.dumps(result["terms"]), highlight_terms(result["terms"]), user_id
     except Exception as e:
         import traceback
         print(f"Error in process_consultation: {str(e)}")
         print(traceback.format_exc())
-        return f"Error processing consultation: {str(e)}", None, "[]", user_id
+        yield f"Error processing consultation: {str(e)}", None, "[]", [], user_id
 
 def explain_term(term, context, user_id):
     """Get explanation for a medical term."""
@@ -171,6 +198,24 @@ def format_schedule_html(schedule):
             html += "</li>"
         html += "</ul>"
     
+    if "weeklySchedule" in schedule and schedule["weeklySchedule"]:
+        html += "<h3>Weekly</h3><ul>"
+        for med in schedule["weeklySchedule"]:
+            html += f"<li><b>{med['time']}</b>: {med['name']} {med['dosage']}"
+            if "instructions" in med and med["instructions"]:
+                html += f" <i>({med['instructions']})</i>"
+            html += "</li>"
+        html += "</ul>"
+    
+    if "asNeededSchedule" in schedule and schedule["asNeededSchedule"]:
+        html += "<h3>As Needed</h3><ul>"
+        for med in schedule["asNeededSchedule"]:
+            html += f"<li>{med['name']} {med['dosage']}"
+            if "instructions" in med and med["instructions"]:
+                html += f" <i>({med['instructions']})</i>"
+            html += "</li>"
+        html += "</ul>"
+    
     html += "</div>"
     return html
 
@@ -216,6 +261,33 @@ def term_clicked(evt: gr.SelectData, terms_json, user_id):
     except Exception as e:
         return f"Error processing term selection: {str(e)}"
 
+def stream_live_audio(audio_chunk, live_session):
+    """Feed a chunk of microphone audio to the live transcription session."""
+    if audio_chunk is None:
+        return gr.update(), live_session
+    
+    if live_session is None:
+        live_session = LiveTranscriptionSession(orchestrator.transcription_service)
+    
+    sample_rate, samples = audio_chunk
+    transcript = live_session.add_audio(sample_rate, samples)
+    return transcript, live_session
+
+def finish_live_audio(live_session):
+    """Finish live transcription and hand the transcript to the notes box."""
+    if live_session is None:
+        return gr.update(), gr.update(), None
+    
+    try:
+        transcript = live_session.finish()
+    except Exception as e:
+        return f"Error transcribing recording: {str(e)}", gr.update(), None
+    
+    status = transcript
+    for number, start, end, error in live_session.failed_segments:
+        status += f"\n\n[Segment {number} ({start:.0f}-{end:.0f}s) could not be transcribed: {error}]"
+    return status, transcript, None
+
 def extract_medications_from_summary(summary, user_id):
     """Extract medications from consultation summary."""
     if user_id is None or user_id not in active_users:
@@ -224,6 +296,13 @@ def extract_medications_from_summary(summary, user_id):
     if not summary or summary.strip() == "":
         return "No consultation summary available. Process a consultation first."
     
+    # Medications extracted together with the summary need no further LLM call
+    for consultation in reversed(active_users[user_id]["consultations"]):
+        if consultation["summary"] == summary and consultation.get("medication_lines") is not None:
+            if not consultation["medication_lines"]:
+                return "No medications found in the consultation summary."
+            return "\n".join(consultation["medication_lines"])
+    
     try:
         api_key = os.getenv("GROQ_API_KEY")
         client = Groq(api_key=api_key)
@@ -262,8 +341,9 @@ def extract_medications_from_summary(summary, user_id):
         return f"Error extracting medications: {str(e)}"
 
 with gr.Blocks(title="PatientPal", theme=gr.themes.Soft(primary_hue="teal")) as app:
-    user_id = gr.State(None)
+    user_id = gr.State(None, delete_callback=end_user_session)
     terms_json = gr.State("[]")
+    live_session = gr.State(None)
     
     gr.Markdown("# PatientPal 👨‍⚕️")
     gr.Markdown("### Understanding Consultations & Managing Medications")
@@ -280,12 +360,26 @@ with gr.Blocks(title="PatientPal", theme=gr.themes.Soft(primary_hue="teal")) as
                         sources=["microphone","upload"],
                     )
                     
+                    live_audio_input = gr.Audio(
+                        label="Or Record Live (transcribed as you speak)",
+                        type="numpy",
+                        sources=["microphone"],
+                        streaming=True,
+                    )
+                    
                     image_input = gr.Image(
                         label="Or Upload Image of Notes",
                         type="filepath",
                         sources=["upload", "webcam"]
                     )
                     
+                    document_input = gr.File(
+                        label="Or Upload a PDF / Several Pages of Notes",
+                        file_count="multiple",
+                        file_types=["image", ".pdf"],
+                        type="filepath"
+                    )
+                    
                 with gr.Column(scale=2):
                     text_input = gr.Textbox(
                         label="Or paste/type consultation notes here",
@@ -370,12 +464,20 @@ with gr.Blocks(title="PatientPal", theme=gr.themes.Soft(primary_hue="teal")) as
     
     process_btn.click(
         fn=process_consultation,
-        inputs=[audio_input, text_input, image_input, user_id],
-        outputs=[summary_output, transcription_output, terms_json, user_id]
-    ).then(
-        fn=lambda terms: [(term["term"], term["term"]) for term in json.loads(terms)],
-        inputs=[terms_json],
-        outputs=[terms_output]
+        inputs=[audio_input, text_input, image_input, document_input, user_id],
+        outputs=[summary_output, transcription_output, terms_json, terms_output, user_id]
+    )
+    
+    live_audio_input.stream(
+        fn=stream_live_audio,
+        inputs=[live_audio_input, live_session],
+        outputs=[transcription_output, live_session]
+    )
+    
+    live_audio_input.stop_recording(
+        fn=finish_live_audio,
+        inputs=[live_session],
+        outputs=[transcription_output, text_input, live_session]
     )
     
     terms_output.select(
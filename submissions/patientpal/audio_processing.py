@@ -0,0 +1,360 @@
+"""
+Audio helpers for PatientPal transcription.
+Pre-processes recordings, splits long ones on silence and stitches chunk transcripts back together.
+"""
+
+import io
+import re
+import wave
+import shutil
+import subprocess
+import numpy as np
+
+SAMPLE_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def wav_info(path):
+    """
+    Read the header of a WAV file.
+
+    Args:
+        path (str): Path to the audio file
+
+    Returns:
+        dict: channels, sample_width, sample_rate, frames and duration in seconds,
+              or None if the file is not a PCM WAV file
+    """
+    try:
+        with wave.open(path, "rb") as wav:
+            channels, sample_width, sample_rate, frames = wav.getparams()[:4]
+    except (wave.Error, EOFError):
+        return None
+    return {
+        "channels": channels,
+        "sample_width": sample_width,
+        "sample_rate": sample_rate,
+        "frames": frames,
+        "duration": frames / float(sample_rate) if sample_rate else 0.0
+    }
+
+
+def frames_to_mono(raw, channels, sample_width):
+    """Decode raw PCM frames into a float32 mono signal in [-1, 1]."""
+    dtype = SAMPLE_DTYPES.get(sample_width)
+    if dtype is None:
+        raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+    samples = np.frombuffer(raw, dtype=dtype).astype(np.float32)
+    if sample_width == 1:
+        samples -= 128.0
+    samples /= float(2 ** (8 * sample_width - 1))
+    if channels > 1:
+        samples = samples[: len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def sample_energies(samples, sample_rate, window_seconds=0.1):
+    """Compute per-window RMS energy of in-memory int16 mono samples."""
+    window = max(1, int(sample_rate * window_seconds))
+    padded = np.zeros(-(-len(samples) // window) * window, dtype=np.float32)
+    padded[:len(samples)] = samples / 32768.0
+    return np.sqrt(np.mean(padded.reshape(-1, window) ** 2, axis=1))
+
+
+def window_energies(path, window_seconds=0.1, block_seconds=30):
+    """
+    Compute the RMS energy of consecutive windows, reading the file in blocks.
+
+    Args:
+        path (str): Path to a WAV file
+        window_seconds (float): Window length
+        block_seconds (float): Amount of audio decoded at a time
+
+    Returns:
+        numpy.ndarray: One RMS value per window
+    """
+    energies = []
+    with wave.open(path, "rb") as wav:
+        channels, sample_width, sample_rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        window = max(1, int(sample_rate * window_seconds))
+        block_frames = window * max(1, int(block_seconds / window_seconds))
+        while True:
+            raw = wav.readframes(block_frames)
+            if not raw:
+                break
+            samples = frames_to_mono(raw, channels, sample_width)
+            usable = len(samples) - len(samples) % window
+            if usable:
+                energies.append(np.sqrt(np.mean(samples[:usable].reshape(-1, window) ** 2, axis=1)))
+            if usable < len(samples):
+                energies.append(np.sqrt(np.mean(samples[usable:] ** 2, keepdims=True)))
+    return np.concatenate(energies) if energies else np.zeros(0, dtype=np.float32)
+
+
+def plan_chunks(energies, window_seconds, duration, chunk_seconds, overlap_seconds=2.0, search_seconds=None):
+    """
+    Choose chunk boundaries, cutting at the quietest point near each target length.
+
+    Args:
+        energies (numpy.ndarray): Per-window RMS energy from window_energies
+        window_seconds (float): Window length used for the energies
+        duration (float): Total duration in seconds
+        chunk_seconds (float): Target chunk length
+        overlap_seconds (float): Audio shared between consecutive chunks
+        search_seconds (float, optional): How far before the target to look for silence;
+            defaults to 20% of the chunk length
+
+    Returns:
+        list: (start, end) pairs in seconds, in order
+    """
+    if search_seconds is None:
+        search_seconds = chunk_seconds * 0.2
+
+    chunks = []
+    start = 0.0
+    while duration - start > chunk_seconds:
+        target = start + chunk_seconds
+        low = int(max(start + overlap_seconds + 1.0, target - search_seconds) / window_seconds)
+        high = int(target / window_seconds)
+        if high > low and high <= len(energies):
+            cut = (low + int(np.argmin(energies[low:high]))) * window_seconds
+        else:
+            cut = target
+        chunks.append((max(0.0, start - overlap_seconds) if chunks else 0.0, cut))
+        start = cut
+    chunks.append((max(0.0, start - overlap_seconds) if chunks else 0.0, duration))
+    return chunks
+
+
+def read_wav_segment(path, start_seconds, end_seconds):
+    """
+    Extract a segment of a WAV file as a standalone WAV file in memory.
+
+    Args:
+        path (str): Path to a WAV file
+        start_seconds (float): Segment start
+        end_seconds (float): Segment end
+
+    Returns:
+        bytes: WAV-encoded segment
+    """
+    with wave.open(path, "rb") as wav:
+        params = wav.getparams()
+        start_frame = int(start_seconds * params.framerate)
+        end_frame = min(params.nframes, int(end_seconds * params.framerate))
+        wav.setpos(start_frame)
+        raw = wav.readframes(max(0, end_frame - start_frame))
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(params.nchannels)
+        out.setsampwidth(params.sampwidth)
+        out.setframerate(params.framerate)
+        out.writeframes(raw)
+    return buffer.getvalue()
+
+
+def to_mono_int16(samples):
+    """Convert a numpy sample array (frames or frames x channels) to mono int16."""
+    samples = np.asarray(samples)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if np.issubdtype(samples.dtype, np.floating):
+        samples = np.clip(samples, -1.0, 1.0) * 32767
+    elif samples.dtype == np.int32:
+        samples = samples / 65536
+    return samples.astype(np.int16)
+
+
+def lowpass_taps(cutoff, taps_per_cycle=8):
+    """
+    Design a windowed-sinc low-pass FIR filter.
+
+    Args:
+        cutoff (float): Cutoff frequency as a fraction of the sample rate (0-0.5)
+        taps_per_cycle (int): Filter length per period of the cutoff frequency
+
+    Returns:
+        numpy.ndarray: Odd number of float32 taps with unit DC gain
+    """
+    half = int(np.ceil(taps_per_cycle / (2.0 * cutoff)))
+    n = np.arange(-half, half + 1)
+    taps = 2.0 * cutoff * np.sinc(2.0 * cutoff * n) * np.blackman(len(n))
+    return (taps / taps.sum()).astype(np.float32)
+
+
+def resample_wav_to_mono(path, target_rate=16000, block_seconds=5, start_seconds=0.0, end_seconds=None):
+    """
+    Decode a PCM WAV file, or a segment of it, to mono int16 at the target rate, block by block.
+
+    When downsampling, a low-pass filter below the new Nyquist frequency runs
+    first so higher frequencies do not alias into speech. Only one block is
+    held as floating point at a time; output is kept as int16.
+
+    Args:
+        path (str): Path to a WAV file
+        target_rate (int): Output sample rate
+        block_seconds (float): Amount of audio decoded at a time
+        start_seconds (float): Segment start
+        end_seconds (float, optional): Segment end; defaults to the end of the file
+
+    Returns:
+        numpy.ndarray: Mono int16 samples at target_rate
+    """
+    output = []
+    with wave.open(path, "rb") as wav:
+        channels, sample_width, source_rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+        start_frame = min(wav.getnframes(), int(start_seconds * source_rate))
+        end_frame = wav.getnframes() if end_seconds is None else min(wav.getnframes(), int(end_seconds * source_rate))
+        wav.setpos(start_frame)
+        remaining = max(0, end_frame - start_frame)
+
+        step = source_rate / float(target_rate)
+        taps = lowpass_taps(0.45 / step) if step > 1 else None
+        delay = len(taps) // 2 if taps is not None else 0
+        history = np.zeros(2 * delay, dtype=np.float32)  # filter input carried across blocks
+        lead = delay  # filter outputs still to drop, centred before the first input sample
+        flushed = taps is None
+
+        consumed = 0  # input samples seen before the current block
+        next_position = 0.0  # input position of the next output sample
+        carry = np.zeros(0, dtype=np.float32)
+        while True:
+            raw = wav.readframes(min(remaining, int(source_rate * block_seconds))) if remaining else b""
+            if raw:
+                remaining -= len(raw) // (channels * sample_width)
+                samples = frames_to_mono(raw, channels, sample_width)
+            elif not flushed:
+                # Zero padding pushes the last input samples through the filter
+                samples = np.zeros(delay, dtype=np.float32)
+                flushed = True
+            else:
+                break
+            if taps is not None:
+                extended = np.concatenate([history, samples])
+                history = extended[len(samples):]
+                samples = np.convolve(extended, taps, mode="valid").astype(np.float32)
+                dropped = min(lead, len(samples))
+                samples = samples[dropped:]
+                lead -= dropped
+            block = np.concatenate([carry, samples])
+            block_start = consumed - len(carry)
+            block_end = block_start + len(block)
+            # Keep the last input sample so interpolation continues across blocks
+            count = int(np.floor((block_end - 1 - next_position) / step)) + 1
+            if count > 0:
+                # Linear interpolation between neighbouring input samples, in float32
+                positions = next_position - block_start + step * np.arange(count)
+                left = positions.astype(np.intp)
+                fraction = (positions - left).astype(np.float32)
+                right = np.minimum(left + 1, len(block) - 1)
+                resampled = block[left] * (1.0 - fraction) + block[right] * fraction
+                output.append((np.clip(resampled, -1.0, 1.0) * 32767).astype(np.int16))
+                next_position += step * count
+            carry = block[-1:]
+            consumed = block_end
+    if not output:
+        return np.zeros(0, dtype=np.int16)
+    return np.concatenate(output)
+
+
+def decode_with_ffmpeg(path, target_rate=16000):
+    """Decode any ffmpeg-readable file to mono int16 samples, or None if ffmpeg is unavailable."""
+    if shutil.which("ffmpeg") is None:
+        return None
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", path, "-ac", "1", "-ar", str(target_rate), "-f", "s16le", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+    )
+    if result.returncode != 0:
+        return None
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+
+def silence_bounds(energies, window_seconds, duration, threshold=0.01, padding_seconds=0.25):
+    """
+    Find the span between the first and last loud windows.
+
+    Args:
+        energies (numpy.ndarray): Per-window RMS energy (0-1)
+        window_seconds (float): Window length used for the energies
+        duration (float): Total duration in seconds
+        threshold (float): RMS level below which a window counts as silent
+        padding_seconds (float): Audio kept around the first and last loud windows
+
+    Returns:
+        tuple: (start, end) in seconds, or None if every window is silent
+    """
+    loud = np.flatnonzero(energies >= threshold)
+    if len(loud) == 0:
+        return None
+    start = max(0.0, loud[0] * window_seconds - padding_seconds)
+    end = min(duration, (loud[-1] + 1) * window_seconds + padding_seconds)
+    return start, end
+
+
+def encode_audio(samples, sample_rate, audio_format="wav"):
+    """
+    Encode mono int16 samples for upload.
+
+    Args:
+        samples (numpy.ndarray): Mono int16 samples
+        sample_rate (int): Sample rate
+        audio_format (str): "wav", or a compressed format ffmpeg can write (e.g. "flac");
+            falls back to WAV when ffmpeg is unavailable
+
+    Returns:
+        tuple: (encoded bytes, format actually used)
+    """
+    if audio_format != "wav" and shutil.which("ffmpeg") is not None:
+        result = subprocess.run(
+            ["ffmpeg", "-v", "error", "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "-",
+             "-f", audio_format, "-"],
+            input=np.ascontiguousarray(samples, dtype=np.int16).tobytes(),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+        )
+        if result.returncode == 0 and result.stdout:
+            return result.stdout, audio_format
+    return encode_wav(samples, sample_rate), "wav"
+
+
+def encode_wav(samples, sample_rate):
+    """Encode mono int16 samples as WAV bytes."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(np.ascontiguousarray(samples, dtype=np.int16).tobytes())
+    return buffer.getvalue()
+
+
+def _normalize_word(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def stitch_transcripts(texts, max_overlap_words=40, min_overlap_words=2):
+    """
+    Join chunk transcripts, dropping words repeated across the chunk overlap.
+
+    Args:
+        texts (List[str]): Transcripts of consecutive, overlapping chunks
+        max_overlap_words (int): Longest overlap to look for
+        min_overlap_words (int): Shortest overlap treated as a duplicate
+
+    Returns:
+        str: Combined transcript
+    """
+    words = []
+    for text in texts:
+        next_words = text.split()
+        if not next_words:
+            continue
+        tail = [_normalize_word(w) for w in words[-max_overlap_words:]]
+        head = [_normalize_word(w) for w in next_words[:max_overlap_words]]
+        overlap = 0
+        for size in range(min(len(tail), len(head)), min_overlap_words - 1, -1):
+            if tail[-size:] == head[:size]:
+                overlap = size
+                break
+        words.extend(next_words[overlap:])
+    return " ".join(words)
@@ -0,0 +1,132 @@
+"""
+Benchmark peak memory and wall time of uploading a large WAV recording for transcription.
+
+Uploads go to a local sink server standing in for the Groq API, which reads
+the request body in chunks and discards it. Each row runs in its own
+process so its peak RSS is measured on its own:
+
+    path             the file path, streamed as-is in one upload
+    file             an open file object, streamed as-is in one upload
+    path, chunked    the file path, split on silence and uploaded in parallel chunks
+    path, preprocess the file path, downmixed, resampled and trimmed, then chunked
+                     (only with --preprocess; file objects are never pre-processed)
+
+    python benchmarks/bench_audio_upload.py                      # 500 MB WAV
+    python benchmarks/bench_audio_upload.py --mb 100 --preprocess # add the pre-processing row
+"""
+
+import os
+import sys
+import time
+import wave
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class SinkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().strip() or b"0", 16)
+                self.rfile.read(size + 2)
+                if size == 0:
+                    break
+        else:
+            remaining = int(self.headers.get("Content-Length", 0))
+            while remaining:
+                remaining -= len(self.rfile.read(min(remaining, 1 << 20)))
+        body = b"transcript"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_wav(path, megabytes, sample_rate=44100):
+    """Write a stereo 16-bit WAV of roughly the given size, one second at a time."""
+    rng = np.random.default_rng(0)
+    seconds = int(megabytes * 1e6 / (sample_rate * 4))
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        for _ in range(seconds):
+            wav.writeframes(rng.integers(-8000, 8000, size=(sample_rate, 2), dtype=np.int16).tobytes())
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def run_once(path, mode, preprocess, chunking):
+    """Transcribe one file in this process and print wall time and peak RSS."""
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ["AUDIO_PREPROCESSING"] = "true" if preprocess else "false"
+    os.environ["TRANSCRIPTION_CHUNKING"] = "true" if chunking else "false"
+    os.environ["AUDIO_UPLOAD_FORMAT"] = "wav"
+    os.environ["CONTENT_CACHE_ENABLED"] = "false"
+    from groq import Groq
+    from transcription import TranscriptionService
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SinkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    service = TranscriptionService()
+    service.client = Groq(api_key="benchmark", base_url=f"http://127.0.0.1:{server.server_address[1]}", max_retries=0)
+
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == "path":
+        service.transcribe(path)
+    else:
+        with open(path, "rb") as audio_file:
+            service.transcribe(audio_file)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    label = ", ".join([mode] + ["chunked"] * (chunking and not preprocess) + ["preprocess"] * preprocess)
+    print(f"{label:<18}{elapsed:>10.2f}{baseline:>16.0f}{peak_rss_mb():>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mb", type=float, default=500, help="size of the generated WAV file")
+    parser.add_argument("--preprocess", action="store_true", help="also measure local pre-processing")
+    parser.add_argument("--run", nargs=4, metavar=("PATH", "MODE", "PREPROCESS", "CHUNKING"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        path, mode, preprocess, chunking = args.run
+        run_once(path, mode, preprocess == "yes", chunking == "yes")
+        return
+
+    rows = [("path", "no", "no"), ("file", "no", "no"), ("path", "no", "yes")]
+    if args.preprocess:
+        rows.append(("path", "yes", "yes"))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "consultation.wav")
+        write_wav(path, args.mb)
+        print(f"{os.path.getsize(path) / 1e6:.0f} MB WAV")
+        print(f"{'input':<18}{'seconds':>10}{'baseline MB':>16}{'peak RSS MB':>14}")
+        for mode, preprocess, chunking in rows:
+            command = [sys.executable, os.path.abspath(__file__), "--run", path, mode, preprocess, chunking]
+            subprocess.run(command, check=True)
+
+
+if __name__ == "__main__":
+    main()
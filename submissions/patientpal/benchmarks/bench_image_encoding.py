@@ -0,0 +1,116 @@
+"""
+Benchmark peak memory of encoding a phone photo for OCR against a stubbed Groq client.
+
+Compares reading the whole file and base64-encoding it with an f-string against
+encode_data_url on a memory-mapped file, then runs ImageProcessingService.extract_text
+from a path and from an in-memory upload, with and without pre-processing.
+Peaks are Python allocations traced by tracemalloc; Pillow's own buffers are not included.
+
+    python benchmarks/bench_image_encoding.py
+    python benchmarks/bench_image_encoding.py --megabytes 20
+"""
+
+import io
+import os
+import sys
+import base64
+import argparse
+import tempfile
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_processing import ImageProcessingService, encode_data_url, open_image_buffer
+
+
+class StubCompletions:
+    """Stands in for client.chat.completions, checking the data URL it receives."""
+
+    def create(self, messages, **kwargs):
+        url = messages[-1]["content"][1]["image_url"]["url"]
+        assert url.startswith("data:image/")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Take metformin 500mg"))])
+
+
+def write_photo(path, megabytes):
+    """Write a noisy JPEG of roughly the requested size, like an uncompressed phone photo."""
+    rng = np.random.default_rng(0)
+    side = 1024
+    while True:
+        pixels = rng.integers(0, 256, size=(side * 3 // 4, side, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(path, "JPEG", quality=95)
+        if os.path.getsize(path) >= megabytes * 1024 * 1024:
+            return
+        side = int(side * 1.25)
+
+
+def build_service(preprocessing):
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ["IMAGE_PREPROCESSING"] = "true" if preprocessing else "false"
+    os.environ["LOCAL_OCR_ENABLED"] = "false"
+    os.environ["CONTENT_CACHE_ENABLED"] = "false"
+    service = ImageProcessingService()
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=StubCompletions()))
+    return service
+
+
+def read_and_encode(path):
+    """The previous approach: read the file, then base64-encode and format it."""
+    with open(path, "rb") as f:
+        image_data = f.read()
+    return f"data:image/jpeg;base64,{base64.b64encode(image_data).decode('utf-8')}"
+
+
+def map_and_encode(path):
+    with open_image_buffer(path) as image_data:
+        return encode_data_url(image_data, "image/jpeg")
+
+
+def peak_megabytes(function, *args):
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--megabytes", type=float, default=10, help="approximate photo size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "photo.jpg")
+        write_photo(path, args.megabytes)
+        size = os.path.getsize(path) / (1024 * 1024)
+        # Filled by write() so the stream owns its buffer, as with an uploaded file
+        upload = io.BytesIO()
+        with open(path, "rb") as f:
+            upload.write(f.read())
+        upload.seek(0)
+        assert read_and_encode(path) == map_and_encode(path)
+
+        raw_service = build_service(preprocessing=False)
+        prepared_service = build_service(preprocessing=True)
+        runs = [
+            ("read + b64encode", read_and_encode, path),
+            ("mmap + encode_data_url", map_and_encode, path),
+            ("extract_text(path)", raw_service.extract_text, path),
+            ("extract_text(BytesIO)", raw_service.extract_text, upload),
+            ("preprocessed(path)", prepared_service.extract_text, path),
+        ]
+
+        print(f"photo: {size:.1f} MB")
+        print(f"{'path':<26}{'peak MB':>10}{'x photo':>10}")
+        for name, function, argument in runs:
+            peak = peak_megabytes(function, argument)
+            print(f"{name:<26}{peak:>10.1f}{peak / size:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
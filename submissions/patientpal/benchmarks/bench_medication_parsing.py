@@ -0,0 +1,77 @@
+"""
+Benchmark medication parsing modes against a stubbed Groq client with injected latency.
+
+Every line is phrased so the rule-based parser declines it, so each one costs
+an LLM round-trip: serial, concurrent (MEDICATION_PARSE_CONCURRENCY) or batched.
+
+    python benchmarks/bench_medication_parsing.py
+    python benchmarks/bench_medication_parsing.py --lines 10 --latency 0.3 --concurrency 1 4 10
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from medication import MedicationSchedulingService
+from orchestrator import AgnoOrchestrator
+
+
+class SlowCompletions:
+    """Stands in for client.chat.completions, sleeping before each reply."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def create(self, messages, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        prompt = messages[-1]["content"]
+        lines = [line.split(". ", 1)[1] for line in prompt.splitlines()[1:]]
+        if lines:
+            content = {"medications": [
+                {"index": i, "name": line.split()[1], "dosage": "1 tablet", "frequency": "once daily", "timing": "morning"}
+                for i, line in enumerate(lines, start=1)
+            ]}
+        else:
+            content = {"name": prompt.split()[5], "dosage": "1 tablet", "frequency": "once daily", "timing": "morning"}
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(content)))])
+
+
+def build_orchestrator(latency, mode, concurrency):
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    os.environ["MEDICATION_PARSE_MODE"] = mode
+    os.environ["MEDICATION_PARSE_CONCURRENCY"] = str(concurrency)
+    service = MedicationSchedulingService()
+    completions = SlowCompletions(latency)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return AgnoOrchestrator(None, None, None, None, service, None), completions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per stubbed LLM request")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 10])
+    args = parser.parse_args()
+
+    lines = [f"the drug{i} the doctor mentioned, as usual" for i in range(args.lines)]
+    runs = [("concurrent", concurrency) for concurrency in args.concurrency] + [("batch", 1)]
+
+    print(f"{'mode':<12}{'concurrency':>12}{'requests':>10}{'seconds':>10}")
+    for mode, concurrency in runs:
+        orchestrator, completions = build_orchestrator(args.latency, mode, concurrency)
+        started = time.perf_counter()
+        medications = orchestrator._parse_medications(lines)
+        elapsed = time.perf_counter() - started
+        assert [medication.name for medication in medications] == [f"drug{i}" for i in range(args.lines)]
+        print(f"{mode:<12}{concurrency:>12}{completions.calls:>10}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
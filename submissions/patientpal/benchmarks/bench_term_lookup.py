@@ -0,0 +1,72 @@
+"""
+Benchmark term-explanation lookups as a user's stored explanations grow.
+
+Measures Mem0Service.get_term_explanations, which runs on every term click,
+against the simulated stores. Latency should stay flat as the count grows.
+
+    python benchmarks/bench_term_lookup.py
+    python benchmarks/bench_term_lookup.py --sizes 100 1000 10000 100000 --store memory
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory import Mem0Service
+
+
+def build_service(store, count, db_path):
+    os.environ.pop("MEM0_API_KEY", None)
+    os.environ["MEM0_SIMULATION_STORE"] = store
+    os.environ["MEM0_SIMULATION_DB"] = db_path
+    os.environ["MEM0_WRITE_BEHIND"] = "false"
+    service = Mem0Service()
+
+    start = datetime.datetime(2026, 1, 1)
+    for i in range(count):
+        # Bypass store_term_explanation so records get distinct, ordered timestamps quickly
+        service._store.add({
+            "id": f"e{i}",
+            "userId": "patient",
+            "timestamp": (start + datetime.timedelta(seconds=i)).isoformat(),
+            "term": f"Term {i}",
+            "explanation": "...",
+            "sources": [],
+            "type": "explanation"
+        })
+    return service
+
+
+def time_lookups(service, count, lookups):
+    terms = [f"TERM {(i * 7919) % count}" for i in range(lookups)]
+    started = time.perf_counter()
+    for term in terms:
+        assert service.get_term_explanations("patient", term)
+    return (time.perf_counter() - started) / lookups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--store", choices=["memory", "sqlite", "both"], default="both")
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    stores = ["memory", "sqlite"] if args.store == "both" else [args.store]
+    print(f"{'store':<8}{'explanations':>14}{'per lookup (us)':>18}")
+    for store in stores:
+        for count in args.sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                service = build_service(store, count, os.path.join(directory, "memory.db"))
+                per_lookup = time_lookups(service, count, args.lookups)
+                service.close()
+            print(f"{store:<8}{count:>14}{per_lookup * 1e6:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Content-addressed result cache for PatientPal.
+Keys uploads by a streamed SHA-256 of their bytes so re-submitted files skip remote processing.
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+
+
+def hash_content(source, chunk_size=1024 * 1024):
+    """
+    Compute the SHA-256 of a file without loading it into memory.
+
+    Args:
+        source: Path, or a seekable binary file-like object (its position is restored)
+        chunk_size (int): Bytes read per step
+
+    Returns:
+        str: Hex digest, or None if the source cannot be hashed without consuming it
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    try:
+        position = source.tell()
+    except (AttributeError, OSError):
+        return None
+    if hasattr(source, "seekable") and not source.seekable():
+        return None
+    for chunk in iter(lambda: source.read(chunk_size), b""):
+        digest.update(chunk)
+    source.seek(position)
+    return digest.hexdigest()
+
+
+class ContentCache:
+    def __init__(self, namespace, cache_dir=None, max_bytes=None):
+        """
+        Initialize a size-bounded on-disk text cache.
+
+        Args:
+            namespace (str): Sub-directory separating caches (include anything that changes results)
+            cache_dir (str, optional): Root directory; defaults to CONTENT_CACHE_DIR or data/cache
+            max_bytes (int, optional): Size limit for this namespace; defaults to
+                CONTENT_CACHE_MAX_BYTES or 100 MB. Least recently used entries are evicted first.
+        """
+        root = cache_dir or os.getenv("CONTENT_CACHE_DIR", os.path.join("data", "cache"))
+        self.directory = os.path.join(root, namespace)
+        self.max_bytes = max_bytes or int(os.getenv("CONTENT_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.is_file())
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def get(self, key):
+        """
+        Look up a cached result.
+
+        Args:
+            key (str): Content hash
+
+        Returns:
+            str: Cached text, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+            os.utime(path)  # mark as recently used
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def set(self, key, text):
+        """
+        Store a result, evicting least recently used entries past the size limit.
+
+        Args:
+            key (str): Content hash
+            text (str): Result to cache
+        """
+        data = text.encode("utf-8")
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            try:
+                self._size -= os.path.getsize(path)
+            except OSError:
+                pass
+            os.replace(tmp_path, path)
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.is_file() and entry.name.endswith(".txt")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        for entry in entries:
+            if self._size <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.unlink(entry.path)
+                self._size -= size
+            except OSError:
+                continue
+
+    def stats(self):
+        """Return hit/miss counters and current size in bytes."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size_bytes": self._size}
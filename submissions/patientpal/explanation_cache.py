@@ -0,0 +1,238 @@
+"""
+Shared explanation cache for PatientPal.
+Reuses term explanations across users so common terms skip the LLM round-trip.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def normalize_term(term):
+    """Normalize a term for cache keys (collapse whitespace, case-fold)."""
+    return " ".join(term.split()).casefold()
+
+
+def context_fingerprint(context):
+    """Short, stable fingerprint of the context a term was used in."""
+    if not context:
+        return ""
+    normalized = " ".join(context.split()).casefold()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+class InMemoryCacheBackend:
+    """Bounded in-process LRU backend."""
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (value, stored_at) for key and mark it recently used, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, stored_at):
+        """Store a value and return the number of entries evicted."""
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """Bounded on-disk LRU backend that survives restarts."""
+
+    def __init__(self, path, max_entries=5000):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS explanation_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "stored_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_explanation_cache_last_access "
+            "ON explanation_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM explanation_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE explanation_cache SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            return json.loads(row[0]), row[1]
+
+    def set(self, key, value, stored_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO explanation_cache (key, value, stored_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), stored_at, time.time())
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM explanation_cache").fetchone()[0]
+            evicted = max(0, count - self.max_entries)
+            if evicted:
+                self._conn.execute(
+                    "DELETE FROM explanation_cache WHERE key IN ("
+                    "SELECT key FROM explanation_cache ORDER BY last_access LIMIT ?)",
+                    (evicted,)
+                )
+            self._conn.commit()
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM explanation_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM explanation_cache")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM explanation_cache").fetchone()[0]
+
+
+class ExplanationCache:
+    def __init__(self, backend=None, ttl_seconds=None, use_context=None):
+        """
+        Initialize the shared explanation cache.
+
+        Settings not passed explicitly are read from the environment:
+        EXPLANATION_CACHE_BACKEND ("memory" or "sqlite"), EXPLANATION_CACHE_PATH,
+        EXPLANATION_CACHE_MAX_ENTRIES, EXPLANATION_CACHE_TTL_HOURS and
+        EXPLANATION_CACHE_USE_CONTEXT.
+
+        Args:
+            backend: Storage backend; defaults to the one selected by the environment
+            ttl_seconds (float, optional): Age after which an entry is treated as a miss
+            use_context (bool, optional): Include a context fingerprint in the cache key.
+                By default entries are keyed on the term alone and hold context-free
+                explanations shared by every user; explanations generated for a
+                patient's context are then never stored, since they may describe
+                that patient to others.
+        """
+        if backend is None:
+            max_entries = int(os.getenv("EXPLANATION_CACHE_MAX_ENTRIES", "5000"))
+            if os.getenv("EXPLANATION_CACHE_BACKEND", "memory").lower() == "sqlite":
+                path = os.getenv("EXPLANATION_CACHE_PATH", os.path.join("data", "explanation_cache.db"))
+                backend = SQLiteCacheBackend(path, max_entries=max_entries)
+            else:
+                backend = InMemoryCacheBackend(max_entries=max_entries)
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("EXPLANATION_CACHE_TTL_HOURS", "168")) * 3600
+        if use_context is None:
+            use_context = os.getenv("EXPLANATION_CACHE_USE_CONTEXT", "false").lower() in ("1", "true", "yes")
+
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.use_context = use_context
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+
+    def make_key(self, term, context=None):
+        """Build the cache key for a term (and its context, if enabled)."""
+        key = normalize_term(term)
+        if self.use_context:
+            key += "|" + context_fingerprint(context)
+        return key
+
+    def get(self, term, context=None):
+        """
+        Look up a cached explanation.
+
+        Args:
+            term (str): The medical term
+            context (str, optional): Context in which the term was used
+
+        Returns:
+            dict: Cached explanation data, or None on a miss
+        """
+        key = self.make_key(term, context)
+        entry = self.backend.get(key)
+        if entry is not None and time.time() - entry[1] > self.ttl_seconds:
+            self.backend.delete(key)
+            entry = None
+
+        with self._stats_lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry[0] if entry is not None else None
+
+    def set(self, term, explanation_data, context=None):
+        """
+        Cache an explanation.
+
+        Args:
+            term (str): The medical term
+            explanation_data (dict): Contains explanation and sources
+            context (str, optional): Context in which the term was used
+        """
+        if context and not self.use_context:
+            # Keyed on the term alone, this would be served to every other patient
+            return
+        value = {
+            "explanation": explanation_data.get("explanation", ""),
+            "sources": explanation_data.get("sources", [])
+        }
+        evicted = self.backend.set(self.make_key(term, context), value, time.time())
+        if evicted:
+            with self._stats_lock:
+                self.evictions += evicted
+
+    def stats(self):
+        """Return hit/miss counters and current size."""
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self.backend)
+            }
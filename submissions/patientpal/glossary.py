@@ -0,0 +1,155 @@
+"""
+Offline medical glossary for PatientPal.
+Answers common term explanations from a bundled dictionary, tolerating misspellings, before any LLM call.
+"""
+
+import os
+import re
+import json
+import bisect
+from array import array
+from collections import defaultdict
+
+from explanation_cache import normalize_term
+
+DEFAULT_GLOSSARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", "medical_glossary.json")
+
+# Fuzzy matches need this many characters; shorter keys (often abbreviations) must match exactly
+MIN_FUZZY_LENGTH = 5
+
+
+def trigrams(key):
+    """Character trigrams of a key, padded so word starts and ends count."""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def is_single_typo(a, b):
+    """
+    Whether two keys differ by one dropped or added character, or one swap of adjacent characters.
+
+    Single-letter substitutions are not accepted, because that is how distinct
+    terms differ (arthritis / arteritis, dysphagia / dysphasia), and neither
+    is any difference in digits (type 2 / type 3).
+    """
+    if a == b or re.sub(r"\D", "", a) != re.sub(r"\D", "", b):
+        return False
+    if len(a) == len(b):
+        diffs = [i for i in range(len(a)) if a[i] != b[i]]
+        return (len(diffs) == 2 and diffs[1] == diffs[0] + 1
+                and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]])
+    if abs(len(a) - len(b)) != 1:
+        return False
+    shorter, longer = sorted((a, b), key=len)
+    i = 0
+    while i < len(shorter) and shorter[i] == longer[i]:
+        i += 1
+    return shorter[i:] == longer[i + 1:]
+
+
+class MedicalGlossary:
+    def __init__(self, path=None, min_similarity=None):
+        """
+        Load the glossary and build its lookup indexes.
+
+        Args:
+            path (str, optional): Glossary JSON file; defaults to GLOSSARY_PATH or the bundled file
+            min_similarity (float, optional): Trigram similarity (0-1) a fuzzy candidate needs;
+                defaults to GLOSSARY_MIN_SIMILARITY or 0.5
+        """
+        path = path or os.getenv("GLOSSARY_PATH") or DEFAULT_GLOSSARY_PATH
+        self.min_similarity = min_similarity or float(os.getenv("GLOSSARY_MIN_SIMILARITY", "0.5"))
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.name = data.get("name", "Medical glossary")
+        self.version = data.get("version", "unknown")
+        self.entries = data["entries"]
+
+        # Every term and alias is a key pointing at its entry
+        key_entries = {}
+        for index, entry in enumerate(self.entries):
+            for name in [entry["term"]] + entry.get("aliases", []):
+                key_entries.setdefault(normalize_term(name), index)
+        self.keys = sorted(key_entries)
+        self.key_entries = array("I", (key_entries[key] for key in self.keys))
+        self._exact = {key: position for position, key in enumerate(self.keys)}
+
+        postings = defaultdict(list)
+        for position, key in enumerate(self.keys):
+            if len(key) >= MIN_FUZZY_LENGTH:
+                for gram in trigrams(key):
+                    postings[gram].append(position)
+        self._trigrams = {gram: array("I", positions) for gram, positions in postings.items()}
+        self._trigram_counts = array("H", (len(trigrams(key)) for key in self.keys))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, term):
+        """
+        Find the entry for a term, allowing for small misspellings.
+
+        Args:
+            term (str): Term to look up
+
+        Returns:
+            tuple: (entry dict, match type "exact" or "fuzzy"), or None if not found
+        """
+        key = normalize_term(term)
+        position = self._exact.get(key)
+        if position is not None:
+            return self.entries[self.key_entries[position]], "exact"
+        # Plurals only for words, so an abbreviation like "cts" is not read as "ct"
+        if key.endswith("s") and len(key) - 1 >= MIN_FUZZY_LENGTH and key[:-1] in self._exact:
+            return self.entries[self.key_entries[self._exact[key[:-1]]]], "exact"
+
+        if len(key) < MIN_FUZZY_LENGTH:
+            return None
+        position = self._fuzzy_position(key)
+        if position is None:
+            return None
+        return self.entries[self.key_entries[position]], "fuzzy"
+
+    def _fuzzy_position(self, key):
+        grams = trigrams(key)
+        shared = defaultdict(int)
+        for gram in grams:
+            for position in self._trigrams.get(gram, ()):
+                shared[position] += 1
+
+        # Rank candidates by Dice similarity, then confirm the difference is a single typo
+        candidates = sorted(
+            ((2.0 * count / (len(grams) + self._trigram_counts[position]), position)
+             for position, count in shared.items()),
+            reverse=True
+        )
+        matches = {}
+        for similarity, position in candidates[:5]:
+            if similarity < self.min_similarity:
+                break
+            if is_single_typo(key, self.keys[position]):
+                matches.setdefault(self.key_entries[position], position)
+
+        # Near-identical terms can mean opposite things, so a tie between different entries is no match
+        if len(matches) != 1:
+            return None
+        return next(iter(matches.values()))
+
+    def prefix_search(self, prefix, limit=10):
+        """
+        List glossary terms and aliases starting with a prefix, for suggestions.
+
+        Args:
+            prefix (str): Beginning of a term
+            limit (int): Maximum number of results
+
+        Returns:
+            List[str]: Matching keys in alphabetical order
+        """
+        prefix = normalize_term(prefix)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_left(self.keys, prefix + "￿", start)
+        return self.keys[start:min(end, start + limit)]
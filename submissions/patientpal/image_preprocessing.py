@@ -0,0 +1,170 @@
+"""
+Image helpers for PatientPal OCR.
+Detects the real format of uploads, shrinks photos of notes to a size the vision model reads just as well
+and splits PDFs into pages.
+"""
+
+import io
+
+from PIL import Image, ImageOps
+
+try:
+    import pypdfium2
+except ImportError:  # optional: PDFs cannot be ingested without it
+    pypdfium2 = None
+
+# Leading bytes of the formats the vision model accepts
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+)
+
+ENCODE_FORMATS = {"jpeg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+MIN_JPEG_QUALITY = 40
+
+
+def detect_mime_type(image_data, default="image/jpeg"):
+    """
+    Identify an image's MIME type from its leading bytes.
+
+    Args:
+        image_data: Bytes-like object holding the image
+        default (str): Returned when the format is not recognised
+
+    Returns:
+        str: MIME type
+    """
+    header = bytes(image_data[:16])
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return mime_type
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return default
+
+
+def preprocess_image(image_data, max_dimension=2048, grayscale=True, output_format="jpeg",
+                     quality=85, max_bytes=None):
+    """
+    Auto-orient, optionally grayscale, downsize and re-encode an image for OCR.
+
+    Args:
+        image_data: Bytes-like object holding the image
+        max_dimension (int): Longest side after resizing; smaller images are not upscaled
+        grayscale (bool): Drop colour, which text recognition does not need
+        output_format (str): "jpeg", "png" or "webp"
+        quality (int): Starting JPEG/WebP quality
+        max_bytes (int, optional): Size target; quality, then resolution, is lowered until met
+
+    Returns:
+        tuple: (encoded bytes, MIME type), or None if Pillow cannot decode the image
+    """
+    output_format = output_format.lower()
+    if output_format not in ENCODE_FORMATS:
+        raise ValueError(f"Unsupported image format: {output_format}")
+
+    try:
+        with Image.open(io.BytesIO(image_data)) as opened:
+            # JPEGs can be decoded at reduced scale, skipping most of the work for large photos
+            opened.draft("L" if grayscale else "RGB", (max_dimension, max_dimension))
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+    except (OSError, Image.DecompressionBombError, SyntaxError):
+        return None
+
+    if grayscale:
+        image = image.convert("L")
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    if max(image.size) > max_dimension:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    while True:
+        encoded = _encode(image, output_format, quality)
+        if max_bytes is None or len(encoded) <= max_bytes:
+            break
+        if output_format != "png" and quality > MIN_JPEG_QUALITY:
+            quality = max(MIN_JPEG_QUALITY, quality - 10)
+        elif min(image.size) > 512:
+            image = image.resize((int(image.width * 0.75), int(image.height * 0.75)), Image.LANCZOS)
+        else:
+            break
+
+    return encoded, ENCODE_FORMATS[output_format]
+
+
+def _encode(image, output_format, quality):
+    buffer = io.BytesIO()
+    if output_format == "png":
+        image.save(buffer, format="PNG", optimize=True)
+    else:
+        image.save(buffer, format=output_format.upper(), quality=quality, optimize=output_format == "jpeg")
+    return buffer.getvalue()
+
+
+def is_pdf(source):
+    """Check whether a path or file-like object holds a PDF."""
+    if isinstance(source, str):
+        if source.lower().endswith(".pdf"):
+            return True
+        try:
+            with open(source, "rb") as f:
+                return f.read(5) == b"%PDF-"
+        except OSError:
+            return False
+    try:
+        position = source.tell()
+        header = source.read(5)
+        source.seek(position)
+    except (AttributeError, OSError):
+        return False
+    return header == b"%PDF-"
+
+
+def iter_pdf_pages(source, dpi=200, min_text_chars=50):
+    """
+    Yield the pages of a PDF one at a time.
+
+    Pages with an embedded text layer are returned as text and need no OCR;
+    scanned pages are rendered to grayscale PNG only when reached.
+
+    Args:
+        source: Path or seekable binary file-like object
+        dpi (int): Render resolution for scanned pages
+        min_text_chars (int): Text layer length below which a page counts as scanned
+
+    Yields:
+        tuple: ("text", str) or ("image", PNG bytes)
+    """
+    if pypdfium2 is None:
+        raise ValueError("PDF support requires the pypdfium2 package")
+
+    pdf = pypdfium2.PdfDocument(source)
+    try:
+        for index in range(len(pdf)):
+            page = pdf[index]
+            try:
+                textpage = page.get_textpage()
+                try:
+                    text = textpage.get_text_range().strip()
+                finally:
+                    textpage.close()
+                if len(text) >= min_text_chars:
+                    yield "text", text
+                    continue
+
+                image = page.render(scale=dpi / 72.0, grayscale=True).to_pil()
+                buffer = io.BytesIO()
+                image.save(buffer, format="PNG")
+                yield "image", buffer.getvalue()
+            finally:
+                page.close()
+    finally:
+        pdf.close()
@@ -1,9 +1,93 @@
+import io
 import os
-import tempfile
-import base64
+import time
+import mmap
+import binascii
+import contextlib
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from groq import Groq
 
+from content_cache import ContentCache, hash_content
+from image_preprocessing import detect_mime_type, preprocess_image, is_pdf, iter_pdf_pages
+from local_ocr import LocalOCR
+
+# Bytes encoded per step; a multiple of 3 so chunks concatenate without padding
+ENCODE_CHUNK_SIZE = 3 * 256 * 1024
+
+
+@contextlib.contextmanager
+def open_image_buffer(image_file):
+    """
+    Expose an image's bytes as a buffer without copying them.
+    
+    Paths and real files are memory-mapped; in-memory streams are viewed in place.
+    Other file-like objects are read once.
+    """
+    if isinstance(image_file, str):
+        with open(image_file, "rb") as f:
+            with _map_file(f) as buffer:
+                yield buffer
+        return
+    
+    if hasattr(image_file, "getbuffer"):
+        with image_file.getbuffer() as view, view[image_file.tell():] as remaining:
+            yield remaining
+        return
+    
+    try:
+        image_file.fileno()
+    except (AttributeError, OSError, ValueError):
+        yield image_file.read()
+        return
+    with _map_file(image_file) as buffer:
+        yield buffer
+
+
+@contextlib.contextmanager
+def _map_file(f):
+    size = os.fstat(f.fileno()).st_size
+    if size == 0:
+        yield b""
+        return
+    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield mapped
+    finally:
+        mapped.close()
+
+
+def encode_data_url(image_data, mime_type):
+    """
+    Base64-encode image bytes into a data URL.
+    
+    The image is encoded in chunks into one preallocated buffer, so no
+    full-size intermediate encodings are built. Decoding that buffer to the
+    str the request body needs makes one more full copy of the payload.
+    
+    Args:
+        image_data: Bytes-like object (bytes, memoryview or mmap)
+        mime_type (str): MIME type for the data URL
+        
+    Returns:
+        str: data URL
+    """
+    prefix = f"data:{mime_type};base64,".encode("ascii")
+    size = len(image_data)
+    url = bytearray(len(prefix) + 4 * ((size + 2) // 3))
+    url[:len(prefix)] = prefix
+    
+    position = len(prefix)
+    with memoryview(image_data) as view:
+        for offset in range(0, size, ENCODE_CHUNK_SIZE):
+            encoded = binascii.b2a_base64(view[offset:offset + ENCODE_CHUNK_SIZE], newline=False)
+            url[position:position + len(encoded)] = encoded
+            position += len(encoded)
+    
+    return url.decode("ascii")
+
+
 class ImageProcessingService:
     def __init__(self):
         api_key = os.getenv("GROQ_API_KEY")
@@ -11,40 +95,219 @@ class ImageProcessingService:
             raise ValueError("GROQ_API_KEY environment variable is not set")
         self.client = Groq(api_key=api_key)
         self.model_name = "meta-llama/llama-4-scout-17b-16e-instruct"
+        
+        # Photos are auto-oriented, downsized and re-encoded locally before upload
+        self.preprocessing_enabled = os.getenv("IMAGE_PREPROCESSING", "true").lower() in ("1", "true", "yes")
+        self.max_dimension = int(os.getenv("IMAGE_MAX_DIMENSION", "2048"))
+        self.grayscale = os.getenv("IMAGE_GRAYSCALE", "true").lower() in ("1", "true", "yes")
+        self.upload_format = os.getenv("IMAGE_UPLOAD_FORMAT", "jpeg").lower()
+        self.quality = int(os.getenv("IMAGE_QUALITY", "85"))
+        self.max_upload_bytes = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(1024 * 1024))) or None
+        self.last_preprocessing_stats = None
+        
+        # Clean printed notes are read locally; poor results escalate to the vision model
+        self.local_ocr = None
+        if os.getenv("LOCAL_OCR_ENABLED", "true").lower() in ("1", "true", "yes"):
+            self.local_ocr = LocalOCR(
+                min_confidence=float(os.getenv("LOCAL_OCR_MIN_CONFIDENCE", "0.80")),
+                language=os.getenv("LOCAL_OCR_LANGUAGE", "eng")
+            )
+            if not self.local_ocr.available:
+                print("Local OCR disabled: pytesseract or the tesseract binary is not installed")
+                self.local_ocr = None
+        # Multi-page documents are OCRed a few pages at a time
+        self.page_workers = int(os.getenv("IMAGE_PAGE_WORKERS", "4"))
+        self.pdf_render_dpi = int(os.getenv("PDF_RENDER_DPI", "200"))
+        self.pdf_min_text_chars = int(os.getenv("PDF_MIN_TEXT_CHARS", "50"))
+        
+        self.ocr_stats = {"local": 0, "remote": 0, "local_seconds": 0.0, "remote_seconds": 0.0, "escalated_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+        
+        # Re-submitted images are answered from a content-addressed cache
+        self.cache = None
+        if os.getenv("CONTENT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"):
+            namespace = "ocr-" + self.model_name.replace("/", "_")
+            if self.preprocessing_enabled:
+                namespace += (
+                    f"-{self.max_dimension}{'g' if self.grayscale else 'c'}"
+                    f"-{self.upload_format}{self.quality}-{self.max_upload_bytes or 0}"
+                )
+            if self.local_ocr is not None:
+                namespace += f"-tesseract-{self.local_ocr.language}-{self.local_ocr.min_confidence:g}"
+            self.cache = ContentCache(namespace)
     
     def extract_text(self, image_file):
-        if isinstance(image_file, str):
-            tmp_path = image_file
-            need_cleanup = False
-        else:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as tmp_file:
-                tmp_file.write(image_file.read())
-                tmp_path = tmp_file.name
-            need_cleanup = True
-        
-        try:
-            with open(tmp_path, "rb") as image_file_content:
-                image_data = image_file_content.read()
-                
-            encoded_image = base64.b64encode(image_data).decode("utf-8")
+        cache_key = hash_content(image_file) if self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        extracted_text = self._extract_text_uncached(image_file)
+        
+        if cache_key is not None and extracted_text:
+            self.cache.set(cache_key, extracted_text)
+        return extracted_text
+    
+    def extract_document(self, source):
+        """
+        Extract text from a single image, a PDF, or a list of images and PDFs.
+        
+        Args:
+            source: Path or file-like object, or a list of them in page order
             
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are a medical OCR service. Extract text content from the image of medical consultation notes. Format it cleanly with proper line breaks for different sections."},
-                    {"role": "user", "content": [
-                        {"type": "text", "text": "Extract all text from this medical consultation note image:"},
-                        {"type": "image_url", "image_url": {
-                            "url": f"data:image/jpeg;base64,{encoded_image}"
-                        }}
-                    ]}
-                ],
-            )
+        Returns:
+            str: Text of all pages in order, separated by blank lines
+        """
+        if isinstance(source, (list, tuple)):
+            if len(source) == 1:
+                return self.extract_document(source[0])
+            return self.extract_pages(self._iter_pages(source))
+        if is_pdf(source):
+            return self.extract_pages(self._iter_pages([source]))
+        return self.extract_text(source)
+    
+    def _iter_pages(self, sources):
+        """Yield ("text", str) or ("image", source) pages, rendering PDF pages only when reached."""
+        for source in sources:
+            if is_pdf(source):
+                yield from iter_pdf_pages(source, self.pdf_render_dpi, self.pdf_min_text_chars)
+            else:
+                yield "image", source
+    
+    def extract_pages(self, pages):
+        """
+        OCR pages concurrently while keeping their order.
+        
+        Pages are pulled from the iterator only as workers free up, so at most
+        twice the pool size are held in memory at once.
+        
+        Args:
+            pages: Iterable of ("text", str) or ("image", path, file-like object or bytes)
             
-            extracted_text = response.choices[0].message.content
+        Returns:
+            str: Page texts joined in order
+        """
+        def ocr_page(page):
+            kind, content = page
+            if kind == "text":
+                return content
+            if isinstance(content, (bytes, bytearray)):
+                content = io.BytesIO(content)
+            return self.extract_text(content) or ""
+        
+        workers = max(1, self.page_workers)
+        futures = []
+        pages = iter(pages)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                # Wait for a free slot before pulling the next page, not after
+                in_flight = [future for future in futures if not future.done()]
+                if len(in_flight) >= 2 * workers:
+                    in_flight[0].result()
+                page = next(pages, None)
+                if page is None:
+                    break
+                futures.append(executor.submit(ocr_page, page))
+            texts = [future.result() for future in futures]
+        
+        return "\n\n".join(text.strip() for text in texts if text and text.strip())
+    
+    def _extract_text_uncached(self, image_file):
+        with open_image_buffer(image_file) as image_data:
+            if self.local_ocr is not None:
+                # Tesseract reads the original; the downsized, lossy copy is only for upload
+                started = time.perf_counter()
+                local_text, confidence = self.local_ocr.recognize(image_data)
+                elapsed = time.perf_counter() - started
+                if local_text is not None:
+                    self._count_ocr("local", elapsed)
+                    return local_text
+                # Time spent on a rejected local attempt is added to the remote path
+                self._count_ocr("escalated", elapsed)
+                print(f"Local OCR confidence {confidence:.2f} too low, using the vision model")
             
-            return extracted_text
+            prepared, mime_type = self._prepare_image(image_data)
+            image_url = encode_data_url(prepared, mime_type)
+        
+        started = time.perf_counter()
+        response = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": "You are a medical OCR service. Extract text content from the image of medical consultation notes. Format it cleanly with proper line breaks for different sections."},
+                {"role": "user", "content": [
+                    {"type": "text", "text": "Extract all text from this medical consultation note image:"},
+                    {"type": "image_url", "image_url": {
+                        "url": image_url
+                    }}
+                ]}
+            ],
+        )
+        self._count_ocr("remote", time.perf_counter() - started)
+        
+        extracted_text = response.choices[0].message.content
+        
+        return extracted_text
+    
+    def _count_ocr(self, path, seconds):
+        with self._stats_lock:
+            if path != "escalated":
+                self.ocr_stats[path] += 1
+            self.ocr_stats[f"{path}_seconds"] += seconds
+    
+    def get_ocr_stats(self):
+        """
+        Get counters for where images were read and the latency saved locally.
+        
+        Returns:
+            dict: Local and remote counts, local hit rate and estimated seconds saved
+                  (average remote latency per local hit, minus all local OCR time)
+        """
+        with self._stats_lock:
+            stats = dict(self.ocr_stats)
+        total = stats["local"] + stats["remote"]
+        average_remote = stats["remote_seconds"] / stats["remote"] if stats["remote"] else 0.0
+        return {
+            **stats,
+            "local_rate": stats["local"] / total if total else 0.0,
+            "average_remote_seconds": average_remote,
+            "latency_saved_seconds": (
+                stats["local"] * average_remote - stats["local_seconds"] - stats["escalated_seconds"]
+            )
+        }
+    
+    def _prepare_image(self, image_data):
+        """
+        Pre-process the image when enabled.
+        
+        Records byte savings and timings in last_preprocessing_stats.
+        
+        Returns:
+            tuple: (image bytes to use, MIME type)
+        """
+        if not self.preprocessing_enabled:
+            return image_data, detect_mime_type(image_data)
+        
+        started = time.perf_counter()
+        processed = preprocess_image(
+            image_data, self.max_dimension, self.grayscale, self.upload_format,
+            self.quality, self.max_upload_bytes
+        )
+        if processed is None:
+            # Not decodable by Pillow; use the original bytes as they are
+            return image_data, detect_mime_type(image_data)
         
-        finally:
-            if need_cleanup:
-                os.unlink(tmp_path)
+        encoded, mime_type = processed
+        original_bytes = len(image_data)
+        self.last_preprocessing_stats = {
+            "original_bytes": original_bytes,
+            "uploaded_bytes": len(encoded),
+            "saved_bytes": original_bytes - len(encoded),
+            "preprocessing_seconds": time.perf_counter() - started
+        }
+        print(
+            f"Image pre-processing: {original_bytes} -> {len(encoded)} bytes "
+            f"({100.0 * (1 - len(encoded) / max(1, original_bytes)):.0f}% smaller) "
+            f"in {self.last_preprocessing_stats['preprocessing_seconds']:.2f}s"
+        )
+        return encoded, mime_type
@@ -0,0 +1,124 @@
+"""
+Local OCR for PatientPal.
+Reads clean printed notes with Tesseract so only hard images need the remote vision model.
+"""
+
+import io
+import re
+import shutil
+
+from PIL import Image, ImageOps
+
+try:
+    import pytesseract
+except ImportError:  # optional: without it every image goes to the vision model
+    pytesseract = None
+
+# Characters expected in consultation notes; anything else is usually OCR noise
+EXPECTED_CHARS = re.compile(r"[A-Za-z0-9\s.,;:()/%+\-'\"&µ°]")
+WORD_PATTERN = re.compile(r"^[A-Za-z]+(?:['\-][A-Za-z]+)*[.,;:]?$|^[\d.,/:%-]+[A-Za-z]{0,4}[.,;:]?$")
+MIN_WORDS = 3
+
+
+def tesseract_available():
+    """Check that pytesseract and the tesseract binary are both installed."""
+    if pytesseract is None:
+        return False
+    command = getattr(pytesseract.pytesseract, "tesseract_cmd", "tesseract")
+    return shutil.which(command) is not None
+
+
+def character_quality(text):
+    """
+    Score how much of the text looks like real words rather than OCR noise.
+
+    Args:
+        text (str): Recognised text
+
+    Returns:
+        float: 0-1, the product of the expected-character ratio and the well-formed-word ratio
+    """
+    stripped = "".join(text.split())
+    words = text.split()
+    if not stripped or not words:
+        return 0.0
+    expected = sum(1 for ch in stripped if EXPECTED_CHARS.match(ch)) / len(stripped)
+    well_formed = sum(1 for word in words if WORD_PATTERN.match(word)) / len(words)
+    return expected * well_formed
+
+
+def words_to_text(data):
+    """Rebuild line-broken text from pytesseract.image_to_data output."""
+    lines = []
+    current_key = None
+    current_words = []
+    for i, word in enumerate(data["text"]):
+        word = word.strip()
+        if not word or float(data["conf"][i]) < 0:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if key != current_key:
+            if current_words:
+                lines.append(" ".join(current_words))
+            if current_key is not None and key[:2] != current_key[:2]:
+                lines.append("")  # blank line between paragraphs
+            current_key = key
+            current_words = []
+        current_words.append(word)
+    if current_words:
+        lines.append(" ".join(current_words))
+    return "\n".join(lines)
+
+
+class LocalOCR:
+    def __init__(self, min_confidence=0.80, language="eng"):
+        """
+        Initialize the local OCR engine.
+
+        Args:
+            min_confidence (float): Score below which a result is rejected
+            language (str): Tesseract language code(s), e.g. "eng" or "eng+fra"
+        """
+        self.min_confidence = min_confidence
+        self.language = language
+        self.available = tesseract_available()
+
+    def recognize(self, image_data):
+        """
+        Run OCR locally and score the result.
+
+        Args:
+            image_data: Bytes-like object holding the image, ideally the original
+                rather than a downsized or lossy copy
+
+        Returns:
+            tuple: (text, confidence); text is None when the result is too poor to use
+        """
+        if not self.available:
+            return None, 0.0
+
+        try:
+            with Image.open(io.BytesIO(image_data)) as opened:
+                image = ImageOps.exif_transpose(opened)
+                data = pytesseract.image_to_data(
+                    image, lang=self.language, output_type=pytesseract.Output.DICT
+                )
+        except (OSError, pytesseract.TesseractError):
+            return None, 0.0
+
+        # Mean word confidence weighted by word length, so stray symbols count little
+        weighted = [
+            (len(word.strip()), float(conf) / 100.0)
+            for word, conf in zip(data["text"], data["conf"])
+            if word.strip() and float(conf) >= 0
+        ]
+        if len(weighted) < MIN_WORDS:
+            return None, 0.0
+        total = sum(length for length, _ in weighted)
+        word_confidence = sum(length * conf for length, conf in weighted) / total
+
+        text = words_to_text(data)
+        confidence = word_confidence * character_quality(text)
+        if confidence < self.min_confidence:
+            return None, confidence
+        return text, confidence
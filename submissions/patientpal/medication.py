@@ -8,9 +8,14 @@ import os
 import schedule
 import time
 import datetime
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from groq import Groq
+from groq import Groq, APIError, APITimeoutError
+from medication_parser import RuleBasedMedicationParser
+from schedule_engine import LocalScheduleEngine, SCHEDULE_KEYS
 
 class Medication(BaseModel):
     name: str
@@ -23,6 +28,25 @@ class MedicationSchedule(BaseModel):
     medications: List[Medication]
     daily_schedule: dict
 
+
+# Values for fields a summary may leave out or null, filled before validation
+MEDICATION_FIELD_DEFAULTS = {"timing": "as directed"}
+
+
+def format_medication_line(medication):
+    """Format a medication as one line of the medication input box."""
+    parts = [medication.name, medication.dosage, medication.frequency]
+    if medication.timing and medication.timing != "as directed":
+        parts.append(medication.timing)
+    line = " ".join(part.strip() for part in parts if part and part.strip())
+    if medication.instructions:
+        line += f" ({medication.instructions.strip()})"
+    return line
+
+
+def _parse_cache_key(medication_text):
+    return " ".join(medication_text.split()).casefold()
+
 class MedicationSchedulingService:
     def __init__(self):
         """Initialize the medication scheduling service."""
@@ -32,16 +56,107 @@ class MedicationSchedulingService:
         self.client = Groq(api_key=api_key)
         self.schedules = {}  # Store user medication schedules
         
-    def parse_medication_input(self, medication_text):
+        self.rule_parser = RuleBasedMedicationParser(
+            min_confidence=float(os.getenv("MEDICATION_FAST_PATH_MIN_CONFIDENCE", "0.75"))
+        )
+        self.schedule_engine = LocalScheduleEngine()
+        self.parse_stats = {"cached": 0, "fast_path": 0, "llm": 0}
+        self._stats_lock = threading.Lock()
+        
+        # Lines whose structure is already known (e.g. extracted with the summary) skip parsing
+        self.parse_cache = OrderedDict()
+        self.parse_cache_size = int(os.getenv("MEDICATION_PARSE_CACHE_SIZE", "1000"))
+        
+    def _count_parse(self, path, count=1):
+        with self._stats_lock:
+            self.parse_stats[path] += count
+    
+    def get_parse_stats(self):
+        """
+        Get counters for how medication lines were parsed.
+        
+        Returns:
+            dict: Cached, fast-path and LLM counts plus the fast-path hit rate
+        """
+        with self._stats_lock:
+            total = sum(self.parse_stats.values())
+            return {
+                **self.parse_stats,
+                "fast_path_rate": self.parse_stats["fast_path"] / total if total else 0.0
+            }
+    
+    def prime_parse_cache(self, medications):
+        """
+        Remember already-structured medications so their input lines parse instantly.
+        
+        Args:
+            medications (list): Medication objects or dicts with Medication fields;
+                missing or null fields with a default (e.g. timing) are filled in
+            
+        Returns:
+            tuple: (validated Medication list, formatted input lines), in order,
+                   or None if any entry is still invalid
+        """
+        validated = []
+        for item in medications or []:
+            try:
+                if isinstance(item, Medication):
+                    medication = item
+                else:
+                    fields = {key: value for key, value in item.items() if value is not None}
+                    medication = Medication(**{**MEDICATION_FIELD_DEFAULTS, **fields})
+            except (AttributeError, TypeError, ValueError):
+                return None
+            validated.append(medication)
+        
+        lines = []
+        for medication in validated:
+            line = format_medication_line(medication)
+            with self._stats_lock:
+                self.parse_cache[_parse_cache_key(line)] = medication
+                self.parse_cache.move_to_end(_parse_cache_key(line))
+                while len(self.parse_cache) > self.parse_cache_size:
+                    self.parse_cache.popitem(last=False)
+            lines.append(line)
+        return validated, lines
+    
+    def _parse_locally(self, medication_text):
+        """Parse from the cache or with the rule-based parser; returns None when neither applies."""
+        with self._stats_lock:
+            cached = self.parse_cache.get(_parse_cache_key(medication_text))
+        if cached is not None:
+            self._count_parse("cached")
+            return cached.copy()
+        
+        fields, _ = self.rule_parser.parse(medication_text)
+        if fields is None:
+            return None
+        self._count_parse("fast_path")
+        return Medication(**fields)
+    
+    def parse_medication_input(self, medication_text, timeout=None):
         """
         Parse medication details from user input.
         
+        Common phrasing is parsed locally; the LLM is only used when the
+        rule-based parser is not confident.
+        
         Args:
             medication_text (str): Text description of medication
+            timeout (float, optional): Request timeout in seconds
             
         Returns:
             Medication: Structured medication information
         """
+        medication = self._parse_locally(medication_text)
+        if medication is not None:
+            return medication
+        
+        self._count_parse("llm")
+        return self._parse_with_llm(medication_text, timeout)
+    
+    def _parse_with_llm(self, medication_text, timeout=None):
+        """Parse a single medication description with the LLM."""
         system_prompt = """
         You are a medication parsing assistant. Extract structured medication information from the text.
         
@@ -55,14 +170,20 @@ class MedicationSchedulingService:
         }
         """
         
-        response = self.client.chat.completions.create(
-            model="llama3-8b-8192",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Parse this medication information: {medication_text}"}
-            ],
-            response_format={"type": "json_object"}
-        )
+        try:
+            response = self.client.chat.completions.create(
+                model="llama3-8b-8192",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": f"Parse this medication information: {medication_text}"}
+                ],
+                response_format={"type": "json_object"},
+                timeout=timeout
+            )
+        except APITimeoutError:
+            raise ValueError(f"Timed out parsing medication information: {medication_text}")
+        except APIError as e:
+            raise ValueError(f"Failed to parse medication information: {e}")
         
         try:
             result = json.loads(response.choices[0].message.content)
@@ -70,16 +191,166 @@ class MedicationSchedulingService:
         except json.JSONDecodeError:
             raise ValueError("Failed to parse medication information")
     
+    def parse_medication_inputs(self, medication_texts, timeout=None, concurrency=4):
+        """
+        Parse several medication descriptions with a single LLM request.
+        
+        Lines the rule-based parser handles never reach the LLM. Items missing
+        from the batch response or failing validation are parsed individually,
+        up to `concurrency` at a time and all within one further `timeout`;
+        items that still fail, including on API errors, are skipped.
+        
+        Args:
+            medication_texts (List[str]): Text descriptions of medications
+            timeout (float, optional): Request timeout in seconds
+            concurrency (int): Maximum concurrent single-line fallback requests
+            
+        Returns:
+            List[Medication]: Structured medication information in input order
+        """
+        if not medication_texts:
+            return []
+        
+        parsed = [self._parse_locally(text) for text in medication_texts]
+        pending = [i for i, medication in enumerate(parsed) if medication is None]
+        if pending:
+            self._count_parse("llm", len(pending))
+            llm_parsed = self._parse_batch_with_llm([medication_texts[i] for i in pending], timeout)
+            for i, medication in zip(pending, llm_parsed):
+                parsed[i] = medication
+        
+        missing = [i for i, medication in enumerate(parsed) if medication is None]
+        if missing:
+            for i, medication in zip(missing, self._parse_each_with_llm(
+                    [medication_texts[i] for i in missing], timeout, concurrency)):
+                parsed[i] = medication
+        
+        return [medication for medication in parsed if medication is not None]
+    
+    def _parse_each_with_llm(self, medication_texts, timeout=None, concurrency=4):
+        """
+        Parse medication descriptions with one LLM request each, concurrently.
+        
+        Requests still unfinished `timeout` seconds after the first one starts
+        are abandoned.
+        
+        Returns:
+            list: Medication or None per input, in input order
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        
+        def parse(medication_text):
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+            try:
+                return self._parse_with_llm(medication_text, remaining)
+            except ValueError as e:
+                print(f"Error parsing medication: {e}")
+                return None
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(medication_texts))))
+        try:
+            futures = [executor.submit(parse, text) for text in medication_texts]
+            wait(futures, timeout=timeout)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        results = []
+        for medication_text, future in zip(medication_texts, futures):
+            if not future.done() or future.cancelled():
+                print(f"Timed out parsing medication information: {medication_text}")
+                results.append(None)
+            else:
+                results.append(future.result())
+        return results
+    
+    def _parse_batch_with_llm(self, medication_texts, timeout=None):
+        """
+        Parse medication descriptions with one JSON-mode request.
+        
+        Returns:
+            list: Medication or None per input, in input order
+        """
+        system_prompt = """
+        You are a medication parsing assistant. Extract structured medication information from each numbered line.
+        
+        Format your response as JSON with the following structure, one entry per input line:
+        {
+          "medications": [
+            {
+              "index": 1,
+              "name": "Medication name",
+              "dosage": "Dosage amount",
+              "frequency": "How often to take",
+              "timing": "When to take (e.g., morning, with meals)",
+              "instructions": "Any special instructions"
+            }
+          ]
+        }
+        """
+        
+        numbered_lines = "\n".join(f"{i}. {text}" for i, text in enumerate(medication_texts, start=1))
+        
+        parsed = [None] * len(medication_texts)
+        try:
+            response = self.client.chat.completions.create(
+                model="llama3-8b-8192",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": f"Parse this medication information:\n{numbered_lines}"}
+                ],
+                response_format={"type": "json_object"},
+                timeout=timeout
+            )
+            items = json.loads(response.choices[0].message.content).get("medications")
+        except (APIError, json.JSONDecodeError, AttributeError) as e:
+            print(f"Batch medication parsing failed, parsing individually: {e}")
+            items = []
+        if not isinstance(items, list):
+            items = []
+        
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            index = item.pop("index", position + 1)
+            if not isinstance(index, int) or not 1 <= index <= len(medication_texts) or parsed[index - 1]:
+                continue
+            try:
+                parsed[index - 1] = Medication(**item)
+            except ValueError:
+                continue
+        
+        return parsed
+    
     def generate_schedule(self, medications):
         """
         Generate a structured daily medication schedule.
         
+        Medications are scheduled locally from their frequency and timing;
+        only entries the schedule engine cannot interpret are sent to the LLM.
+        
         Args:
             medications (List[Medication]): List of medications
             
         Returns:
             dict: Structured daily schedule
         """
+        daily_schedule, unscheduled = self.schedule_engine.build_schedule(medications)
+        
+        if unscheduled:
+            llm_schedule = self._generate_schedule_with_llm(unscheduled)
+            for key in SCHEDULE_KEYS + ["weeklySchedule"]:
+                entries = llm_schedule.get(key)
+                if isinstance(entries, list):
+                    daily_schedule[key].extend(entries)
+        
+        return daily_schedule
+    
+    def _generate_schedule_with_llm(self, medications):
+        """Ask the LLM to schedule medications the local engine could not interpret."""
         system_prompt = """
         You are a medication scheduling assistant. Create a daily schedule for medications.
         
@@ -90,8 +361,13 @@ class MedicationSchedulingService:
           ],
           "afternoonSchedule": [...],
           "eveningSchedule": [...],
-          "nightSchedule": [...]
+          "nightSchedule": [...],
+          "weeklySchedule": [
+            {"name": "Med2", "dosage": "15mg", "time": "Mondays, 8:00 AM", "instructions": "with food"}
+          ]
         }
+        Only medications taken every day go in the daily lists; put weekly or other
+        non-daily medications in weeklySchedule with the days in "time".
         """
         
         medications_json = json.dumps([med.dict() for med in medications])
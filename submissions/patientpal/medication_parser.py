@@ -0,0 +1,292 @@
+"""
+Rule-based medication parser for PatientPal.
+Parses common prescription phrasing locally so only unusual input needs the LLM.
+"""
+
+import re
+
+# (pattern, canonical frequency, doses per day, interval in hours, implied timing)
+FREQUENCY_RULES = [
+    (r"\b(?:every|q)\s*(\d{1,2})\s*(?:hours?|hrs?|h)\b", None, None, None, None),
+    (r"\b(?:four times (?:a |per )?day|four times daily|4 times (?:a |per )?day|4 times daily|4x daily|q\.?i\.?d\.?)", "four times daily", 4, None, None),
+    (r"\b(?:three times (?:a |per )?day|three times daily|thrice daily|3 times (?:a |per )?day|3 times daily|3x daily|t\.?i\.?d\.?)", "three times daily", 3, None, None),
+    (r"\b(?:twice (?:a |per )?day|twice daily|two times (?:a |per )?day|two times daily|2 times (?:a |per )?day|2 times daily|2x daily|b\.?i\.?d\.?)", "twice daily", 2, None, None),
+    (r"\b(?:q\.?h\.?s\.?|at bedtime|before bed(?:time)?|nightly|every night)", "once daily", 1, None, "at bedtime"),
+    (r"\b(?:q\.?a\.?m\.?|every morning)", "once daily", 1, None, "in the morning"),
+    (r"\b(?:as needed|when needed|if needed|p\.?r\.?n\.?)", "as needed", None, None, None),
+    (r"\b(?:once (?:a |per )?day|once daily|every day|daily|q\.?d\.?|o\.?d\.?)", "once daily", 1, None, None),
+]
+
+# Any mention of a dosing period longer than a day; such text is never scheduled daily
+NON_DAILY_PATTERN = re.compile(
+    r"\b(?:weeks?|weekly|fortnights?|fortnightly|months?|monthly|every other day|alternate days|q\.?o\.?d\.?)(?![a-z])",
+    re.IGNORECASE
+)
+# The only non-daily frequency parsed locally; anything else goes to the LLM
+ONCE_WEEKLY_PATTERN = re.compile(r"\b(?:once (?:a |per |every )?week|once weekly|every week|weekly)(?![a-z])", re.IGNORECASE)
+# A dose count no daily rule understood, e.g. the "5 times" in "5 times daily"
+UNMATCHED_COUNT_PATTERN = re.compile(r"(?:\btimes|\d\s*x)\s*$", re.IGNORECASE)
+SEVERAL_PER_WEEK_PATTERN = re.compile(
+    r"\b(?:twice|\w+ times|\d+\s*x)\s+(?:a |per |each |every )?week", re.IGNORECASE
+)
+
+# (pattern, canonical timing)
+TIMING_RULES = [
+    (r"\b(?:on an empty stomach)\b", "on an empty stomach"),
+    (r"\b(?:before (?:meals|food|eating)|a\.c\.)", "before meals"),
+    (r"\b(?:after (?:meals|food|eating)|p\.c\.)", "after meals"),
+    (r"\b(?:with (?:meals|food))\b", "with meals"),
+    (r"\b(?:with|before|after) (?:breakfast|lunch|dinner|supper)\b", None),
+    (r"\b(?:in the morning|mornings?)\b", "in the morning"),
+    (r"\b(?:in the afternoon|afternoons?)\b", "in the afternoon"),
+    (r"\b(?:in the evening|evenings?)\b", "in the evening"),
+    (r"\b(?:at night|at bedtime|before bed(?:time)?|nights?)\b", "at bedtime"),
+]
+
+# Canonical timings that each name one time of day, i.e. one dose
+TIME_OF_DAY_TIMINGS = ("in the morning", "in the afternoon", "in the evening", "at bedtime")
+
+DOSAGE_PATTERN = re.compile(
+    r"\b(\d+(?:\.\d+)?)\s*(mg|mcg|µg|g|ml|iu|units?|%)(?![a-z])", re.IGNORECASE
+)
+QUANTITY_PATTERN = re.compile(
+    r"\b(\d+(?:\.\d+)?|one|two|half)\s*(tablets?|tabs?|capsules?|caps?|pills?|puffs?|drops?|sprays?)\b",
+    re.IGNORECASE
+)
+DURATION_PATTERN = re.compile(r"\bfor (\d+|a|one|two) (days?|weeks?|months?)\b", re.IGNORECASE)
+NAME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9\-/]*(?: [A-Za-z0-9\-/]+){0,3}$")
+
+LEADING_VERBS = {"take", "use", "apply", "inhale", "give"}
+# Words that change or cancel a prescription rather than describe one; such lines go to the LLM
+CHANGE_WORDS = {
+    "stop", "stopped", "discontinue", "discontinued", "cease", "hold", "held", "pause", "suspend",
+    "not", "don't", "dont", "no", "never", "avoid", "skip", "instead", "increase", "increased",
+    "decrease", "decreased", "reduce", "reduced", "double", "halve", "taper", "switch", "change",
+    "replace", "start", "restart", "resume", "until", "then"
+}
+# Drug names are rarely longer than this; extra words before the dosage lower the confidence
+NAME_WORDS_EXPECTED = 2
+# Shorter "every N hours" intervals are not ordinary outpatient dosing
+MIN_INTERVAL_HOURS = 4
+FILLER_WORDS = {
+    "take", "by", "mouth", "orally", "po", "and", "a", "the", "of", "per", "at", "to",
+    "tablet", "tablets", "capsule", "capsules", "dose", "doses", "each", "with"
+}
+
+DEFAULT_TIMING = {
+    1: "in the morning",
+    2: "morning and evening",
+    3: "morning, afternoon and evening",
+    4: "morning, midday, evening and bedtime",
+}
+
+_COMPILED_FREQUENCY_RULES = [
+    (re.compile(rule[0] + r"(?![a-z])", re.IGNORECASE),) + rule[1:] for rule in FREQUENCY_RULES
+]
+_COMPILED_TIMING_RULES = [
+    (re.compile(pattern + r"(?![a-z])", re.IGNORECASE), timing) for pattern, timing in TIMING_RULES
+]
+
+
+def _without_durations(text):
+    # "for 2 weeks" is a course length, not a dosing period
+    return DURATION_PATTERN.sub(lambda match: " " * len(match.group(0)), text)
+
+
+def mentions_non_daily(text):
+    """Whether text mentions a dosing period longer than a day (week, month, every other day)."""
+    return NON_DAILY_PATTERN.search(_without_durations(text)) is not None
+
+
+def match_frequency(text):
+    """
+    Find the dosing frequency described in a piece of text.
+
+    Non-daily phrasing is checked first: only a plain "once weekly" is
+    recognised, and weekly text that also has a daily cue or several doses a
+    week is left unmatched. Text matching daily rules that disagree is left
+    unmatched too, so the caller falls back to the LLM.
+
+    Args:
+        text (str): Medication description or frequency phrase
+
+    Returns:
+        dict: canonical frequency, doses_per_day, interval_hours, implied timing,
+              the first matched span, all matched spans and the index of the
+              rule behind each span, or None if no rule matches or the text is
+              ambiguous
+    """
+    cue_text = _without_durations(text)
+    if NON_DAILY_PATTERN.search(cue_text):
+        weekly = ONCE_WEEKLY_PATTERN.search(cue_text)
+        if weekly is None or SEVERAL_PER_WEEK_PATTERN.search(cue_text):
+            return None
+        remainder = cue_text[:weekly.start()] + " " * len(weekly.group(0)) + cue_text[weekly.end():]
+        if NON_DAILY_PATTERN.search(remainder) or _match_daily(remainder) is not None:
+            return None
+        return {
+            "frequency": "once weekly",
+            "doses_per_day": None,
+            "interval_hours": None,
+            "timing": None,
+            "span": weekly.span(),
+            "spans": [weekly.span()],
+            "rules": [None]
+        }
+    return _match_daily(text)
+
+
+def _match_daily(text):
+    found = None
+    spans = []
+    rules = []
+    for rule, (pattern, canonical, doses_per_day, interval_hours, implied_timing) in enumerate(_COMPILED_FREQUENCY_RULES):
+        for match in pattern.finditer(text):
+            if any(start < match.end() and match.start() < end for start, end in spans):
+                continue
+            if UNMATCHED_COUNT_PATTERN.search(text[:match.start()]):
+                return None
+            spans.append(match.span())
+            rules.append(rule)
+            if canonical is None:
+                interval_hours = int(match.group(1))
+                if not MIN_INTERVAL_HOURS <= interval_hours <= 24:
+                    return None
+                canonical = f"every {interval_hours} hours"
+                doses_per_day = 24 // interval_hours
+            if found is None:
+                found = {
+                    "frequency": canonical,
+                    "doses_per_day": doses_per_day,
+                    "interval_hours": interval_hours,
+                    "timing": implied_timing,
+                    "span": match.span(),
+                    "spans": spans,
+                    "rules": rules
+                }
+            elif found["frequency"] != canonical:
+                # e.g. "twice daily at bedtime"
+                return None
+    return found
+
+
+def match_timing(text):
+    """
+    Find when a medication should be taken (meals, time of day).
+
+    Args:
+        text (str): Medication description or timing phrase
+
+    Returns:
+        tuple: (canonical timing, list of matched spans); timing is None if nothing matched
+    """
+    timings = []
+    spans = []
+    for pattern, canonical in _COMPILED_TIMING_RULES:
+        for match in pattern.finditer(text):
+            if any(start < match.end() and match.start() < end for start, end in spans):
+                continue
+            timings.append(canonical or match.group(0).lower())
+            spans.append(match.span())
+    if not timings:
+        return None, []
+    return ", ".join(dict.fromkeys(timings)), spans
+
+
+class RuleBasedMedicationParser:
+    def __init__(self, min_confidence=0.75):
+        """
+        Initialize the rule-based parser.
+
+        Args:
+            min_confidence (float): Confidence below which a parse is rejected
+        """
+        self.min_confidence = min_confidence
+
+    def parse(self, medication_text):
+        """
+        Parse a medication description without calling the LLM.
+
+        Args:
+            medication_text (str): Text description of medication
+
+        Returns:
+            tuple: (fields dict matching the Medication model, confidence); fields is
+                   None when the text could not be parsed with enough confidence
+        """
+        text = " ".join(medication_text.split())
+        if not text:
+            return None, 0.0
+        if any(word in CHANGE_WORDS for word in re.split(r"[^\w']+", text.lower())):
+            return None, 0.0
+
+        consumed = []
+
+        # Several doses on one line ("40mg daily then 30mg daily", "500mg am, 1000mg pm")
+        # would collapse into one; leave tapers and split doses to the LLM.
+        dosage_matches = list(DOSAGE_PATTERN.finditer(text))
+        if len(dosage_matches) != 1 or len(QUANTITY_PATTERN.findall(text)) > 1:
+            return None, 0.0
+        dosage_match = dosage_matches[0]
+        dosage = f"{dosage_match.group(1)}{dosage_match.group(2).lower()}"
+        consumed.append(dosage_match.span())
+
+        quantity_match = QUANTITY_PATTERN.search(text)
+        if quantity_match:
+            dosage += f" ({quantity_match.group(1)} {quantity_match.group(2).lower()})"
+            consumed.append(quantity_match.span())
+
+        frequency = match_frequency(text)
+        if frequency is None or len(set(frequency["rules"])) != len(frequency["rules"]):
+            # The same frequency stated twice belongs to two different doses
+            return None, 0.0
+        consumed.extend(frequency["spans"])
+
+        timing, timing_spans = match_timing(text)
+        if timing is not None and frequency["doses_per_day"] is not None:
+            # "daily in the morning and at night" names more doses than the frequency allows
+            times_of_day = [phrase for phrase in timing.split(", ") if phrase in TIME_OF_DAY_TIMINGS]
+            if len(times_of_day) > frequency["doses_per_day"]:
+                return None, 0.0
+        consumed.extend(timing_spans)
+        if timing is None:
+            timing = frequency["timing"] or DEFAULT_TIMING.get(frequency["doses_per_day"], "as directed")
+
+        instructions = []
+        duration_match = DURATION_PATTERN.search(text)
+        if duration_match:
+            instructions.append(duration_match.group(0))
+            consumed.append(duration_match.span())
+
+        name_words = text[:dosage_match.start()].strip(" ,;:-").split()
+        while name_words and name_words[0].lower() in LEADING_VERBS:
+            name_words.pop(0)
+        name = " ".join(name_words)
+        if not NAME_PATTERN.match(name):
+            return None, 0.0
+
+        # Words not explained by any rule lower the confidence.
+        remainder = list(text[dosage_match.end():])
+        offset = dosage_match.end()
+        for start, end in consumed:
+            for i in range(max(start, offset), end):
+                remainder[i - offset] = " "
+        leftover = [
+            word for word in re.split(r"[\s,;.()]+", "".join(remainder))
+            if word and word.lower() not in FILLER_WORDS
+        ]
+        if leftover:
+            instructions.append(" ".join(leftover))
+
+        unexplained = len(leftover) + max(0, len(name_words) - NAME_WORDS_EXPECTED)
+        confidence = max(0.0, 1.0 - 0.15 * unexplained)
+        if confidence < self.min_confidence:
+            return None, confidence
+
+        return {
+            "name": name,
+            "dosage": dosage,
+            "frequency": frequency["frequency"],
+            "timing": timing,
+            "instructions": "; ".join(instructions) or None
+        }, confidence
@@ -0,0 +1,233 @@
+"""
+HTTP client for the Mem0 platform API used by PatientPal.
+Reuses pooled keep-alive connections, queues writes for a background flusher and
+retries with backoff. The API has no bulk add, so each record is still its own POST.
+"""
+
+import os
+import json
+import time
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+from explanation_cache import normalize_term
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _is_rejected(error):
+    """Whether a request failed because the API rejected it, so retrying cannot help."""
+    response = getattr(error, "response", None)
+    return response is not None and 400 <= response.status_code < 500 and response.status_code != 429
+
+
+class Mem0Client:
+    def __init__(self, api_key, base_url=None, flush_threshold=None, flush_interval=None,
+                 max_retries=None, backoff_seconds=None, timeout=None, pool_size=None):
+        """
+        Initialize the Mem0 client.
+
+        Settings not passed explicitly are read from MEM0_API_URL, MEM0_FLUSH_THRESHOLD,
+        MEM0_FLUSH_INTERVAL, MEM0_MAX_RETRIES, MEM0_BACKOFF_SECONDS, MEM0_TIMEOUT
+        and MEM0_POOL_SIZE.
+
+        Args:
+            api_key (str): Mem0 API key
+            base_url (str, optional): API root, e.g. a local stand-in server
+            flush_threshold (int, optional): Pending writes that trigger an early flush
+            flush_interval (float, optional): Seconds between background flushes
+            max_retries (int, optional): Retries per request after the first attempt
+            backoff_seconds (float, optional): Base delay for exponential backoff
+            timeout (float, optional): Per-request timeout in seconds
+            pool_size (int, optional): Maximum pooled connections
+        """
+        self.base_url = (base_url or os.getenv("MEM0_API_URL", "https://api.mem0.ai")).rstrip("/")
+        self.flush_threshold = flush_threshold or int(os.getenv("MEM0_FLUSH_THRESHOLD", "20"))
+        self.flush_interval = flush_interval or float(os.getenv("MEM0_FLUSH_INTERVAL", "2"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("MEM0_MAX_RETRIES", "3"))
+        self.backoff_seconds = backoff_seconds or float(os.getenv("MEM0_BACKOFF_SECONDS", "0.5"))
+        self.timeout = timeout or float(os.getenv("MEM0_TIMEOUT", "10"))
+        pool_size = pool_size or int(os.getenv("MEM0_POOL_SIZE", "10"))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Token {api_key}",
+            "Content-Type": "application/json"
+        })
+
+        self._pending = []
+        self._in_flight = []  # records taken by the running flush, until it finishes
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="mem0-flusher", daemon=True)
+        self._flusher.start()
+
+    def _request(self, method, path, **kwargs):
+        """Send a request, retrying connection errors and retryable status codes."""
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response
+                error = requests.HTTPError(f"{response.status_code} from {url}", response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            if attempt == self.max_retries:
+                raise error
+            delay = self.backoff_seconds * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay / 2))
+
+    @staticmethod
+    def _to_memory(record):
+        """Convert a PatientPal record into a Mem0 add-memory payload."""
+        if record["type"] == "explanation":
+            content = f"{record['term']}: {record['explanation']}"
+        elif record["type"] == "consultation":
+            content = record["summary"]
+        else:
+            content = json.dumps(record["medications"])
+
+        metadata = {"type": record["type"], "record": record}
+        if record["type"] == "explanation":
+            metadata["term_key"] = normalize_term(record["term"])
+        return {
+            "messages": [{"role": "user", "content": content}],
+            "user_id": record["userId"],
+            "metadata": metadata,
+            "infer": False
+        }
+
+    def add(self, record):
+        """
+        Queue a record for the next background flush.
+
+        Args:
+            record (dict): Record with id, userId, timestamp and type
+        """
+        with self._condition:
+            self._pending.append(record)
+            if len(self._pending) >= self.flush_threshold:
+                self._condition.notify()
+
+    def flush(self):
+        """
+        Write all queued records, one request each, over the pooled session.
+
+        Records rejected by the API (a 4xx other than 429) are logged and dropped;
+        records that still fail transiently after retries stay queued for the
+        next flush.
+
+        Returns:
+            int: Number of records written
+        """
+        with self._flush_lock:
+            with self._condition:
+                records, self._pending = self._pending, []
+                self._in_flight = records
+            try:
+                return self._write_records(records)
+            finally:
+                with self._condition:
+                    self._in_flight = []
+
+    def _write_records(self, records):
+        written = 0
+        for position, record in enumerate(records):
+            try:
+                self._request("POST", "/v1/memories/", json=self._to_memory(record))
+            except requests.RequestException as e:
+                if _is_rejected(e):
+                    print(f"Warning: Mem0 rejected record {record.get('id')}, dropping it: {e}")
+                    continue
+                print(f"Warning: Mem0 write failed, will retry on next flush: {e}")
+                with self._condition:
+                    self._pending[:0] = records[position:]
+                return written
+            written += 1
+        return written
+
+    def _flush_loop(self):
+        while True:
+            with self._condition:
+                if not self._closed and len(self._pending) < self.flush_threshold:
+                    self._condition.wait(self.flush_interval)
+                if self._closed:
+                    return
+            if self._pending:
+                self.flush()
+
+    def query(self, user_id, record_type, term=None):
+        """
+        Retrieve a user's records of one type, oldest first.
+
+        All of the user's memories are fetched and filtered here by the type
+        and term stored in their metadata; the API is not asked to filter.
+        Records still queued for this user are merged in so callers read their
+        own writes without waiting for other users' writes to be sent.
+
+        Args:
+            user_id (str): Unique identifier for the user
+            record_type (str): "consultation", "medication_schedule" or "explanation"
+            term (str, optional): Only return explanations of this term
+
+        Returns:
+            list: Matching records
+        """
+        term_key = normalize_term(term) if term else None
+        # Snapshot unsent records before reading, so one sent in between is seen at least once
+        unsent = self.unsent(user_id, record_type, term)
+
+        response = self._request("GET", "/v1/memories/", params={"user_id": user_id})
+        payload = response.json()
+        memories = payload.get("results", []) if isinstance(payload, dict) else payload
+
+        records = []
+        for memory in memories:
+            metadata = memory.get("metadata") or {}
+            if metadata.get("type") != record_type or "record" not in metadata:
+                continue
+            if term_key and metadata.get("term_key") != term_key:
+                continue
+            records.append(metadata["record"])
+        stored_ids = {record["id"] for record in records}
+        records.extend(record for record in unsent if record["id"] not in stored_ids)
+        records.sort(key=lambda record: record["timestamp"])
+        return records
+
+    def unsent(self, user_id, record_type, term=None):
+        """
+        Get a user's records of one type that are queued or being written.
+
+        Args:
+            user_id (str): Unique identifier for the user
+            record_type (str): "consultation", "medication_schedule" or "explanation"
+            term (str, optional): Only return explanations of this term
+
+        Returns:
+            list: Matching records not yet confirmed by the API
+        """
+        term_key = normalize_term(term) if term else None
+        with self._condition:
+            records = self._in_flight + self._pending
+        return [
+            record for record in records
+            if record["userId"] == user_id and record["type"] == record_type
+            and (term_key is None or normalize_term(record["term"]) == term_key)
+        ]
+
+    def close(self):
+        """Stop the background flusher, write outstanding records and close the session."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._flusher.join(timeout=self.timeout)
+        self.flush()
+        self.session.close()
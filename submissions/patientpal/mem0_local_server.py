@@ -0,0 +1,77 @@
+"""
+Minimal local stand-in for the Mem0 memories API.
+Lets Mem0Client be exercised without network access, e.g.:
+
+    python mem0_local_server.py --port 8765
+    MEM0_API_URL=http://localhost:8765 MEM0_API_KEY=local python app.py
+"""
+
+import json
+import uuid
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Mem0StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled connections are reused
+    disable_nagle_algorithm = True
+    memories = []
+    lock = threading.Lock()
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/v1/memories/":
+            return self._send_json(404, {"error": "not found"})
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            return self._send_json(400, {"error": "invalid JSON"})
+        if not payload.get("user_id") or not payload.get("messages"):
+            return self._send_json(400, {"error": "user_id and messages are required"})
+        memory = {
+            "id": str(uuid.uuid4()),
+            "memory": " ".join(message["content"] for message in payload.get("messages", [])),
+            "user_id": payload.get("user_id"),
+            "metadata": payload.get("metadata") or {}
+        }
+        with self.lock:
+            self.memories.append(memory)
+        self._send_json(200, [{"id": memory["id"], "event": "ADD"}])
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/v1/memories/":
+            return self._send_json(404, {"error": "not found"})
+        user_id = parse_qs(url.query).get("user_id", [None])[0]
+        with self.lock:
+            results = [m for m in self.memories if user_id is None or m["user_id"] == user_id]
+        self._send_json(200, results)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=8765):
+    """Create the stand-in server; call serve_forever() on the result to run it."""
+    return ThreadingHTTPServer((host, port), Mem0StandInHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Mem0 API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port)
+    print(f"Mem0 stand-in listening on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -6,10 +6,18 @@ Stores and retrieves user data, medical terms, and medication schedules.
 import os
 import json
 import uuid
+import queue
+import atexit
 import datetime
+import threading
 from typing import Dict, List, Any, Optional
+
 import requests
 
+from mem0_client import Mem0Client
+from explanation_cache import normalize_term
+from memory_store import InMemoryRecordStore, SQLiteRecordStore, paginate, record_key
+
 class Mem0Service:
     def __init__(self):
         """Initialize the memory service using Mem0 API."""
@@ -19,16 +27,123 @@ class Mem0Service:
             self._use_simulation = True
         else:
             self._use_simulation = False
-            
-        self._memory_store = {}
+        
+        self._store = None
+        self._client = None
+        if self._use_simulation:
+            if os.getenv("MEM0_SIMULATION_STORE", "sqlite").lower() == "sqlite":
+                path = os.getenv("MEM0_SIMULATION_DB", os.path.join("data", "memory.db"))
+                self._store = SQLiteRecordStore(path)
+            else:
+                self._store = InMemoryRecordStore()
+        else:
+            self._client = Mem0Client(self.api_key)
+        
+        # Write-behind: store_* returns immediately, a worker thread persists
+        self._write_behind = os.getenv("MEM0_WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+        self._write_queue = queue.Queue(maxsize=int(os.getenv("MEM0_WRITE_QUEUE_SIZE", "1000")))
+        self._enqueue_timeout = float(os.getenv("MEM0_WRITE_QUEUE_TIMEOUT", "1"))
+        self._closed = False
+        # Queued records not yet written, per user, so reads see their own writes without waiting
+        self._pending_records = {}
+        self._enqueuing = 0
+        self._state = threading.Condition()
+        if self._write_behind:
+            self._writer = threading.Thread(target=self._write_loop, name="mem0-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.close)
+    
+    def _write(self, data):
+        if self._use_simulation:
+            self._store.add(data)
+        else:
+            self._client.add(data)
+    
+    def _write_loop(self):
+        while True:
+            data = self._write_queue.get()
+            try:
+                if data is None:
+                    return
+                self._write(data)
+            except Exception as e:
+                print(f"Error persisting memory record {data.get('id')}: {e}")
+            finally:
+                if data is not None:
+                    self._forget_pending(data)
+                self._write_queue.task_done()
+    
+    def _persist(self, data):
+        """
+        Persist a record, in the background when write-behind is enabled.
+        
+        When the queue is full the caller waits up to MEM0_WRITE_QUEUE_TIMEOUT
+        seconds, then writes synchronously instead.
+        """
+        if not self._write_behind:
+            self._write(data)
+            return
+        # close() waits for enqueuing callers, so nothing lands behind its stop sentinel
+        with self._state:
+            closed = self._closed
+            if not closed:
+                self._enqueuing += 1
+                self._pending_records.setdefault(data["userId"], {})[data["id"]] = data
+        if closed:
+            self._write(data)
+            return
+        try:
+            self._write_queue.put(data, timeout=self._enqueue_timeout)
+        except queue.Full:
+            print("Warning: memory write queue is full; writing synchronously.")
+            try:
+                self._write(data)
+            finally:
+                self._forget_pending(data)
+        finally:
+            with self._state:
+                self._enqueuing -= 1
+                self._state.notify_all()
+    
+    def _forget_pending(self, data):
+        with self._state:
+            records = self._pending_records.get(data["userId"])
+            if records is not None:
+                records.pop(data["id"], None)
+                if not records:
+                    del self._pending_records[data["userId"]]
+    
+    def _pending_matches(self, user_id, record_type, term=None):
+        """A user's queued records of one type."""
+        with self._state:
+            records = list(self._pending_records.get(user_id, {}).values())
+        term_key = normalize_term(term) if term else None
+        return [
+            record for record in records
+            if record["type"] == record_type and (term_key is None or normalize_term(record["term"]) == term_key)
+        ]
+    
+    def flush(self):
+        """Block until all queued writes have been persisted."""
+        if self._write_behind:
+            self._write_queue.join()
+    
+    def queue_depth(self):
+        """
+        Get the number of records waiting to be persisted.
+        
+        Returns:
+            int: Current write queue depth
+        """
+        return self._write_queue.qsize()
     
     def store_consultation(self, user_id, consultation_data):
         """
-        Store a consultation summary and terms for a user.
+        Store a consultation summary, terms and extracted medications for a user.
         
         Args:
             user_id (str): Unique identifier for the user
-            consultation_data (dict): Contains summary and terms
+            consultation_data (dict): Contains summary, terms and optionally medications
             
         Returns:
             str: ID of the stored consultation
@@ -44,14 +159,10 @@ class Mem0Service:
             "terms": consultation_data.get("terms", []),
             "type": "consultation"
         }
+        if "medications" in consultation_data:
+            data["medications"] = consultation_data["medications"]
         
-        if self._use_simulation:
-            if user_id not in self._memory_store:
-                self._memory_store[user_id] = {"consultations": [], "medications": [], "explanations": []}
-            self._memory_store[user_id]["consultations"].append(data)
-        else:
-            # mem0_client.store(data)
-            pass
+        self._persist(data)
             
         return consultation_id
     
@@ -78,13 +189,7 @@ class Mem0Service:
             "type": "medication_schedule"
         }
         
-        if self._use_simulation:
-            if user_id not in self._memory_store:
-                self._memory_store[user_id] = {"consultations": [], "medications": [], "explanations": []}
-            self._memory_store[user_id]["medications"].append(data)
-        else:
-            # mem0_client.store(data)
-            pass
+        self._persist(data)
             
         return schedule_id
     
@@ -113,73 +218,122 @@ class Mem0Service:
             "type": "explanation"
         }
         
-        if self._use_simulation:
-            if user_id not in self._memory_store:
-                self._memory_store[user_id] = {"consultations": [], "medications": [], "explanations": []}
-            self._memory_store[user_id]["explanations"].append(data)
-        else:
-            # mem0_client.store(data)
-            pass
+        self._persist(data)
             
         return explanation_id
     
-    def get_user_consultations(self, user_id):
+    def get_records_page(self, user_id, record_type, term=None, limit=None, cursor=None, since=None, until=None):
         """
-        Retrieve all consultation data for a user.
+        Retrieve one page of a user's records, newest page first.
         
         Args:
             user_id (str): Unique identifier for the user
+            record_type (str): "consultation", "medication_schedule" or "explanation"
+            term (str, optional): Only return explanations of this term
+            limit (int, optional): Maximum number of records to return
+            cursor (str, optional): next_cursor from a previous page, to fetch older records
+            since (datetime or str, optional): Only records at or after this time
+            until (datetime or str, optional): Only records before this time
             
         Returns:
-            list: List of consultation data
+            dict: "items" (oldest first within the page) and "next_cursor" (None on the last page)
         """
-        if self._use_simulation:
-            if user_id in self._memory_store:
-                return self._memory_store[user_id]["consultations"]
-            return []
+        # Snapshot queued records before reading, so a record written in between is seen at least once
+        pending = self._pending_matches(user_id, record_type, term)
+        if self._use_simulation and not pending:
+            items, next_cursor = self._store.query_page(
+                user_id, record_type, term=term, limit=limit, cursor=cursor, since=since, until=until
+            )
         else:
-            # return mem0_client.query({"userId": user_id, "type": "consultation"})
-            return []
+            records = with_pending(self._query(user_id, record_type, term), pending)
+            items, next_cursor = paginate(records, limit=limit, cursor=cursor, since=since, until=until)
+        return {"items": items, "next_cursor": next_cursor}
     
-    def get_user_medication_schedules(self, user_id):
+    def _query(self, user_id, record_type, term=None):
+        if self._use_simulation:
+            return self._store.query(user_id, record_type, term=term)
+        try:
+            return self._client.query(user_id, record_type, term=term)
+        except requests.RequestException as e:
+            print(f"Warning: Mem0 query failed, returning only unsent records: {e}")
+            return self._client.unsent(user_id, record_type, term=term)
+    
+    def _get_records(self, user_id, record_type, term=None, limit=None, cursor=None, since=None, until=None):
+        if limit is None and cursor is None and since is None and until is None:
+            pending = self._pending_matches(user_id, record_type, term)
+            return with_pending(self._query(user_id, record_type, term), pending)
+        page = self.get_records_page(user_id, record_type, term, limit, cursor, since, until)
+        return page["items"]
+    
+    def get_user_consultations(self, user_id, limit=None, cursor=None, since=None, until=None):
         """
-        Retrieve all medication schedules for a user.
+        Retrieve consultation data for a user.
         
         Args:
             user_id (str): Unique identifier for the user
+            limit (int, optional): Return only the latest `limit` consultations
+            cursor (str, optional): Page cursor from get_records_page
+            since (datetime or str, optional): Only consultations at or after this time
+            until (datetime or str, optional): Only consultations before this time
+            
+        Returns:
+            list: List of consultation data
+        """
+        return self._get_records(user_id, "consultation", None, limit, cursor, since, until)
+    
+    def get_user_medication_schedules(self, user_id, limit=None, cursor=None, since=None, until=None):
+        """
+        Retrieve medication schedules for a user.
+        
+        Args:
+            user_id (str): Unique identifier for the user
+            limit (int, optional): Return only the latest `limit` schedules
+            cursor (str, optional): Page cursor from get_records_page
+            since (datetime or str, optional): Only schedules at or after this time
+            until (datetime or str, optional): Only schedules before this time
             
         Returns:
             list: List of medication schedule data
         """
-        if self._use_simulation:
-            if user_id in self._memory_store:
-                return self._memory_store[user_id]["medications"]
-            return []
-        else:
-            # return mem0_client.query({"userId": user_id, "type": "medication_schedule"})
-            return []
+        return self._get_records(user_id, "medication_schedule", None, limit, cursor, since, until)
     
-    def get_term_explanations(self, user_id, term=None):
+    def get_term_explanations(self, user_id, term=None, limit=None, cursor=None, since=None, until=None):
         """
         Retrieve term explanations for a user.
         
         Args:
             user_id (str): Unique identifier for the user
             term (str, optional): If provided, get explanations for this term only
+            limit (int, optional): Return only the latest `limit` explanations
+            cursor (str, optional): Page cursor from get_records_page
+            since (datetime or str, optional): Only explanations at or after this time
+            until (datetime or str, optional): Only explanations before this time
             
         Returns:
             list: List of explanation data
         """
-        if self._use_simulation:
-            if user_id in self._memory_store:
-                explanations = self._memory_store[user_id]["explanations"]
-                if term:
-                    return [exp for exp in explanations if exp["term"].lower() == term.lower()]
-                return explanations
-            return []
-        else:
-            # query = {"userId": user_id, "type": "explanation"}
-            # if term:
-            #     query["term"] = term
-            # return mem0_client.query(query)
-            return []
+        return self._get_records(user_id, "explanation", term, limit, cursor, since, until)
+    
+    def close(self):
+        """Flush pending writes and release the underlying store or client."""
+        with self._state:
+            if self._closed:
+                return
+            self._closed = True
+            self._state.wait_for(lambda: self._enqueuing == 0)
+        if self._write_behind:
+            self._write_queue.put(None)
+            self._writer.join()
+        if self._store is not None:
+            self._store.close()
+        if self._client is not None:
+            self._client.close()
+
+
+def with_pending(records, pending):
+    """Add queued records missing from a stored result, keeping timestamp order."""
+    if not pending:
+        return records
+    stored_ids = {record["id"] for record in records}
+    missing = [record for record in pending if record["id"] not in stored_ids]
+    return sorted(records + missing, key=record_key) if missing else records
@@ -0,0 +1,219 @@
+"""
+Record stores backing the simulated Mem0 memory service.
+Holds consultations, medication schedules and term explanations per user.
+"""
+
+import os
+import json
+import bisect
+import sqlite3
+import datetime
+import threading
+
+from explanation_cache import normalize_term
+
+COLLECTIONS = {
+    "consultation": "consultations",
+    "medication_schedule": "medications",
+    "explanation": "explanations",
+}
+
+
+def to_timestamp(value):
+    """Normalize a datetime or ISO string bound to the stored timestamp format."""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def record_key(record):
+    """Sort key for records: timestamp, then id to break ties."""
+    return (record["timestamp"], record["id"])
+
+
+def encode_cursor(record):
+    """Opaque cursor pointing just before this record."""
+    return f"{record['timestamp']}|{record['id']}"
+
+
+def decode_cursor(cursor):
+    timestamp, _, record_id = cursor.partition("|")
+    return (timestamp, record_id)
+
+
+def paginate(records, keys=None, limit=None, cursor=None, since=None, until=None):
+    """
+    Select the newest page of a timestamp-ordered record list.
+
+    Args:
+        records (list): Records sorted by record_key
+        keys (list, optional): Precomputed record_key for each record
+        limit (int, optional): Maximum records to return
+        cursor (str, optional): Only return records older than this cursor
+        since: Inclusive lower timestamp bound (datetime or ISO string)
+        until: Exclusive upper timestamp bound (datetime or ISO string)
+
+    Returns:
+        tuple: (records oldest first, cursor for the next older page or None)
+    """
+    if keys is None:
+        keys = [record_key(record) for record in records]
+    since, until = to_timestamp(since), to_timestamp(until)
+
+    low = bisect.bisect_left(keys, (since, "")) if since else 0
+    high = bisect.bisect_left(keys, (until, "")) if until else len(keys)
+    if cursor:
+        high = min(high, bisect.bisect_left(keys, decode_cursor(cursor)))
+    start = max(low, high - limit) if limit else low
+    if start >= high:
+        return [], None
+
+    page = records[start:high]
+    next_cursor = encode_cursor(page[0]) if start > low else None
+    return page, next_cursor
+
+
+class InMemoryRecordStore:
+    """Process-local store; contents are lost on restart."""
+
+    def __init__(self):
+        # user -> collection -> records kept sorted by record_key, with parallel key lists
+        self._records = {}
+        self._keys = {}
+        # Case-folded term -> explanations, kept in sync by add()
+        self._term_index = {}
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        """Store a record (a dict with id, userId, timestamp and type)."""
+        user_id = record["userId"]
+        with self._lock:
+            if user_id not in self._records:
+                self._records[user_id] = {"consultations": [], "medications": [], "explanations": []}
+                self._keys[user_id] = {"consultations": [], "medications": [], "explanations": []}
+            collection = COLLECTIONS[record["type"]]
+            records = self._records[user_id][collection]
+            keys = self._keys[user_id][collection]
+            key = record_key(record)
+            # Records normally arrive in timestamp order, making this an append
+            position = bisect.bisect_right(keys, key)
+            keys.insert(position, key)
+            records.insert(position, record)
+
+            if record["type"] == "explanation":
+                term_key = normalize_term(record["term"])
+                self._term_index.setdefault(user_id, {}).setdefault(term_key, []).append(record)
+
+    def query(self, user_id, record_type, term=None):
+        """Return a user's records of one type, oldest first."""
+        if user_id not in self._records:
+            return []
+        if term:
+            user_index = self._term_index.get(user_id, {})
+            return list(user_index.get(normalize_term(term), []))
+        return self._records[user_id][COLLECTIONS[record_type]]
+
+    def query_page(self, user_id, record_type, term=None, limit=None, cursor=None, since=None, until=None):
+        """Return (newest page of records oldest first, next cursor); see paginate()."""
+        if user_id not in self._records:
+            return [], None
+        if term:
+            records = sorted(self.query(user_id, record_type, term=term), key=record_key)
+            return paginate(records, limit=limit, cursor=cursor, since=since, until=until)
+        collection = COLLECTIONS[record_type]
+        with self._lock:
+            records = self._records[user_id][collection]
+            keys = self._keys[user_id][collection]
+            return paginate(records, keys, limit=limit, cursor=cursor, since=since, until=until)
+
+    def close(self):
+        pass
+
+
+class SQLiteRecordStore:
+    """Durable store in a single SQLite file (WAL mode)."""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "id TEXT NOT NULL UNIQUE, "
+            "user_id TEXT NOT NULL, "
+            "type TEXT NOT NULL, "
+            "term_key TEXT, "
+            "timestamp TEXT NOT NULL, "
+            "data TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_records_user_type_time ON records (user_id, type, timestamp, id)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_records_user_term ON records (user_id, term_key) "
+            "WHERE term_key IS NOT NULL"
+        )
+        self._conn.commit()
+
+    def add(self, record):
+        term_key = normalize_term(record["term"]) if record["type"] == "explanation" else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO records (id, user_id, type, term_key, timestamp, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (record["id"], record["userId"], record["type"], term_key, record["timestamp"], json.dumps(record))
+            )
+            self._conn.commit()
+
+    def query(self, user_id, record_type, term=None):
+        if term:
+            sql = "SELECT data FROM records WHERE user_id = ? AND term_key = ? ORDER BY timestamp, id"
+            params = (user_id, normalize_term(term))
+        else:
+            sql = "SELECT data FROM records WHERE user_id = ? AND type = ? ORDER BY timestamp, id"
+            params = (user_id, record_type)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def query_page(self, user_id, record_type, term=None, limit=None, cursor=None, since=None, until=None):
+        """Return (newest page of records oldest first, next cursor); see paginate()."""
+        conditions = ["user_id = ?"]
+        params = [user_id]
+        if term:
+            conditions.append("term_key = ?")
+            params.append(normalize_term(term))
+        else:
+            conditions.append("type = ?")
+            params.append(record_type)
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(to_timestamp(since))
+        if until:
+            conditions.append("timestamp < ?")
+            params.append(to_timestamp(until))
+        if cursor:
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+
+        # Fetch one extra row to learn whether an older page exists
+        sql = f"SELECT data FROM records WHERE {' AND '.join(conditions)} ORDER BY timestamp DESC, id DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        page = [json.loads(row[0]) for row in reversed(rows[:limit] if limit else rows)]
+        next_cursor = encode_cursor(page[0]) if limit and len(rows) > limit else None
+        return page, next_cursor
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
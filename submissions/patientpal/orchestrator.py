@@ -5,12 +5,17 @@ Coordinates the workflow between different services.
 
 import os
 import json
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 import uuid
 
+from explanation_cache import normalize_term
+
 class AgnoOrchestrator:
     def __init__(self, transcription_service, image_processing_service, summary_service, explanation_service, 
-                 medication_service, memory_service):
+                 medication_service, memory_service, explanation_cache=None):
         """
         Initialize the orchestrator with all required services.
         
@@ -21,6 +26,7 @@ class AgnoOrchestrator:
             explanation_service: Service for term explanation
             medication_service: Service for medication scheduling
             memory_service: Service for persistent memory
+            explanation_cache: Optional cache of explanations shared across users
         """
         self.transcription_service = transcription_service
         self.image_processing_service = image_processing_service
@@ -28,6 +34,27 @@ class AgnoOrchestrator:
         self.explanation_service = explanation_service
         self.medication_service = medication_service
         self.memory_service = memory_service
+        self.explanation_cache = explanation_cache
+        
+        self.medication_parse_concurrency = int(os.getenv("MEDICATION_PARSE_CONCURRENCY", "4"))
+        self.medication_parse_timeout = float(os.getenv("MEDICATION_PARSE_TIMEOUT", "30"))
+        self.medication_parse_mode = os.getenv("MEDICATION_PARSE_MODE", "batch").lower()
+        
+        # Opt-in: explain extracted terms in the background so clicks are answered from memory
+        self.term_prefetch_enabled = os.getenv("TERM_PREFETCH", "false").lower() in ("1", "true", "yes")
+        self._prefetch_executor = None
+        if self.term_prefetch_enabled:
+            self._prefetch_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("TERM_PREFETCH_WORKERS", "3")),
+                thread_name_prefix="term-prefetch"
+            )
+            atexit.register(self.close)
+        self._prefetch_futures = {}  # (user_id, normalized term) -> Future of its batch
+        
+        # Uncached terms are explained several per request once there are enough of them
+        self.term_batch_min_terms = int(os.getenv("TERM_BATCH_MIN_TERMS", "3"))
+        self.term_prefetch_batch_size = int(os.getenv("TERM_BATCH_SIZE", "8"))
+        self._prefetch_lock = threading.Lock()
         
         self.api_key = os.getenv("AGNO_API_KEY")
         if not self.api_key:
@@ -44,35 +71,105 @@ class AgnoOrchestrator:
             user_id (str): Unique identifier for the user
             audio_file: Audio file object, if provided
             text_input (str): Text input, if provided
-            image_file: Image file object containing consultation notes, if provided
+            image_file: Image or PDF of consultation notes, or a list of them in page order, if provided
             
         Returns:
             dict: Processed consultation data with summary and terms
         """
-        if audio_file is not None:
-            transcription = self.transcription_service.transcribe(audio_file)
-        elif image_file is not None:
-            transcription = self.image_processing_service.extract_text(image_file)
-        elif text_input is not None:
-            transcription = text_input
-        else:
-            raise ValueError("Either audio_file, image_file, or text_input must be provided")
+        transcription = self._get_transcription(audio_file, text_input, image_file)
         
         consultation_data = self.summary_service.summarize(transcription)
+        medication_lines = self._prepare_medications(consultation_data)
         
         consultation_id = self.memory_service.store_consultation(user_id, consultation_data)
+        self.prefetch_explanations(user_id, consultation_data["terms"])
         
         return {
             "id": consultation_id,
             "transcription": transcription,
             "summary": consultation_data["summary"],
-            "terms": consultation_data["terms"]
+            "terms": consultation_data["terms"],
+            "medication_lines": medication_lines
         }
     
+    def process_consultation_stream(self, user_id, audio_file=None, text_input=None, image_file=None):
+        """
+        Process a consultation, yielding the summary and terms as they are generated.
+        
+        Args:
+            user_id (str): Unique identifier for the user
+            audio_file: Audio file object, if provided
+            text_input (str): Text input, if provided
+            image_file: Image or PDF of consultation notes, or a list of them in page order, if provided
+            
+        Yields:
+            dict: Partial consultation data with "done" False; the last item matches
+                  process_consultation's result with "done" True
+        """
+        transcription = self._get_transcription(audio_file, text_input, image_file)
+        
+        for partial in self.summary_service.summarize_stream(transcription):
+            if not partial["done"]:
+                yield {
+                    "transcription": transcription,
+                    "summary": partial["summary"],
+                    "terms": partial["terms"],
+                    "done": False
+                }
+                continue
+            
+            consultation_data = {key: value for key, value in partial.items() if key != "done"}
+            medication_lines = self._prepare_medications(consultation_data)
+            consultation_id = self.memory_service.store_consultation(user_id, consultation_data)
+            self.prefetch_explanations(user_id, consultation_data["terms"])
+            yield {
+                "id": consultation_id,
+                "transcription": transcription,
+                "summary": consultation_data["summary"],
+                "terms": consultation_data["terms"],
+                "medication_lines": medication_lines,
+                "done": True
+            }
+    
+    def _prepare_medications(self, consultation_data):
+        """
+        Validate medications extracted with the summary and prime the parse cache with them.
+        
+        The validated medications replace the raw ones on the consultation record;
+        if any of them is invalid the record keeps them as extracted.
+        
+        Returns:
+            list: Medication input lines, or None if the summary did not extract
+                  medications or they could not all be validated
+        """
+        if "medications" not in consultation_data:
+            return None
+        prepared = self.medication_service.prime_parse_cache(consultation_data["medications"])
+        if prepared is None:
+            return None
+        medications, lines = prepared
+        consultation_data["medications"] = [med.dict() for med in medications]
+        return lines
+    
+    def _get_transcription(self, audio_file, text_input, image_file):
+        if audio_file is not None:
+            transcription = self.transcription_service.transcribe(audio_file)
+        elif image_file is not None:
+            transcription = self.image_processing_service.extract_document(image_file)
+        elif text_input is not None:
+            transcription = text_input
+        else:
+            raise ValueError("Either audio_file, image_file, or text_input must be provided")
+        return transcription
+    
     def explain_term(self, user_id, term, context=None):
         """
         Get or generate an explanation for a medical term.
         
+        Waits for a background prefetch of the same term only if it is already
+        running. A prefetch still queued behind other jobs is cancelled, together
+        with the rest of its batch, and the term is explained directly.
+        
         Args:
             user_id (str): Unique identifier for the user
             term (str): The medical term to explain
@@ -81,13 +178,74 @@ class AgnoOrchestrator:
         Returns:
             dict: Term explanation data
         """
-        existing_explanations = self.memory_service.get_term_explanations(user_id, term)
+        with self._prefetch_lock:
+            future = self._prefetch_futures.get((user_id, normalize_term(term)))
+        if future is not None and not future.cancel() and not future.done():
+            try:
+                future.result()  # the explanation is then found in memory
+            except Exception as e:
+                print(f"Prefetched explanation of '{term}' failed: {e}")
+        
+        return self.explain_terms(user_id, [{"term": term, "context": context}])[0]
+    
+    def explain_terms(self, user_id, terms):
+        """
+        Get or generate explanations for several terms.
         
-        if existing_explanations:
-            return existing_explanations[0]
+        Terms not found in the user's memory or the shared cache are explained
+        together in batched requests when there are at least TERM_BATCH_MIN_TERMS of them.
+        While the shared cache is keyed on the term alone, terms are explained
+        without the patient's context so one explanation serves every user.
         
-        explanation_data = self.explanation_service.explain_term(term, context)
+        Args:
+            user_id (str): Unique identifier for the user
+            terms (List[dict]): Terms with "term" and optional "context"
+            
+        Returns:
+            List[dict]: Term explanation data, in input order
+        """
+        # A contextual explanation would be specific to this patient, so it is never shared
+        share_context_free = self.explanation_cache is not None and not self.explanation_cache.use_context
+        terms = [
+            {"term": item["term"], "context": None if share_context_free else item.get("context")}
+            for item in terms
+        ]
         
+        results = [None] * len(terms)
+        uncached = []
+        for i, item in enumerate(terms):
+            term, context = item["term"], item.get("context")
+            existing_explanations = self.memory_service.get_term_explanations(user_id, term)
+            if existing_explanations:
+                results[i] = existing_explanations[0]
+                continue
+            
+            explanation_data = None
+            if self.explanation_cache is not None:
+                explanation_data = self.explanation_cache.get(term, context)
+            if explanation_data is None:
+                uncached.append(i)
+                continue
+            results[i] = self._store_explanation(user_id, term, explanation_data)
+        
+        if len(uncached) >= self.term_batch_min_terms:
+            generated = self.explanation_service.explain_terms(
+                [(terms[i]["term"], terms[i].get("context")) for i in uncached]
+            )
+        else:
+            generated = [self.explanation_service.explain_term(terms[i]["term"], terms[i].get("context")) for i in uncached]
+        
+        for i, explanation_data in zip(uncached, generated):
+            term, context = terms[i]["term"], terms[i].get("context")
+            # A fuzzy glossary match is a guess about what the user meant, so it is not shared
+            if (self.explanation_cache is not None and not explanation_data.get("error")
+                    and explanation_data.get("match") != "fuzzy"):
+                self.explanation_cache.set(term, explanation_data, context)
+            results[i] = self._store_explanation(user_id, term, explanation_data)
+        
+        return results
+    
+    def _store_explanation(self, user_id, term, explanation_data):
         explanation_id = self.memory_service.store_term_explanation(user_id, term, explanation_data)
         
         return {
@@ -97,6 +255,68 @@ class AgnoOrchestrator:
             "sources": explanation_data["sources"]
         }
     
+    def prefetch_explanations(self, user_id, terms):
+        """
+        Start generating explanations for terms in the background, if prefetching is enabled.
+        
+        Args:
+            user_id (str): Unique identifier for the user
+            terms (List[dict]): Terms with "term" and optional "context"
+        """
+        if self._prefetch_executor is None:
+            return
+        
+        submitted = []
+        with self._prefetch_lock:
+            batch = []
+            for item in terms:
+                term = item.get("term") if isinstance(item, dict) else None
+                if not term:
+                    continue
+                key = (user_id, normalize_term(term))
+                if key in self._prefetch_futures or any(key == queued for queued, _ in batch):
+                    continue
+                batch.append((key, item))
+            
+            # Each job explains a batch of terms in one request; a click waits for its term's batch
+            for start in range(0, len(batch), self.term_prefetch_batch_size):
+                chunk = batch[start:start + self.term_prefetch_batch_size]
+                future = self._prefetch_executor.submit(self.explain_terms, user_id, [item for _, item in chunk])
+                for key, _ in chunk:
+                    self._prefetch_futures[key] = future
+                    submitted.append((key, future))
+        
+        # Finished explanations are served from memory, so their futures can be dropped
+        for key, future in submitted:
+            future.add_done_callback(lambda done, key=key: self._forget_prefetch(key, done))
+    
+    def _forget_prefetch(self, key, future):
+        with self._prefetch_lock:
+            if self._prefetch_futures.get(key) is future:
+                del self._prefetch_futures[key]
+    
+    def cancel_prefetch(self, user_id):
+        """
+        Cancel queued explanation prefetches for a user whose session has ended.
+        
+        Explanations already being generated finish and are stored.
+        
+        Args:
+            user_id (str): Unique identifier for the user
+            
+        Returns:
+            int: Number of prefetches cancelled
+        """
+        with self._prefetch_lock:
+            keys = [key for key in self._prefetch_futures if key[0] == user_id]
+            futures = [self._prefetch_futures.pop(key) for key in keys]
+        return sum(1 for future in futures if future.cancel())
+    
+    def close(self):
+        """Stop background prefetching, dropping queued work."""
+        if self._prefetch_executor is not None:
+            self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
+    
     def process_medication(self, user_id, medication_inputs):
         """
         Process medication inputs and generate a schedule.
@@ -108,14 +328,7 @@ class AgnoOrchestrator:
         Returns:
             dict: Generated medication schedule
         """
-        medications = []
-        for med_input in medication_inputs:
-            try:
-                medication = self.medication_service.parse_medication_input(med_input)
-                medications.append(medication)
-            except ValueError as e:
-                print(f"Error parsing medication: {e}")
-                continue
+        medications = self._parse_medications(medication_inputs)
         
         daily_schedule = self.medication_service.generate_schedule(medications)
         
@@ -132,25 +345,70 @@ class AgnoOrchestrator:
             "schedule": daily_schedule
         }
     
-    def get_user_history(self, user_id):
+    def _parse_medications(self, medication_inputs):
+        """
+        Parse medication inputs in one batch request or concurrently,
+        preserving input order.
+        
+        Inputs that fail to parse (including timeouts) are skipped.
+        
+        Args:
+            medication_inputs (List[str]): List of medication descriptions
+            
+        Returns:
+            List[Medication]: Parsed medications in input order
+        """
+        if self.medication_parse_mode == "batch" and len(medication_inputs) > 1:
+            return self.medication_service.parse_medication_inputs(
+                medication_inputs, timeout=self.medication_parse_timeout,
+                concurrency=self.medication_parse_concurrency
+            )
+        
+        def parse(med_input):
+            try:
+                return self.medication_service.parse_medication_input(
+                    med_input, timeout=self.medication_parse_timeout
+                )
+            except ValueError as e:
+                print(f"Error parsing medication: {e}")
+                return None
+        
+        if len(medication_inputs) <= 1 or self.medication_parse_concurrency <= 1:
+            results = [parse(med_input) for med_input in medication_inputs]
+        else:
+            max_workers = min(self.medication_parse_concurrency, len(medication_inputs))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(parse, medication_inputs))
+        
+        return [medication for medication in results if medication is not None]
+    
+    def get_user_history(self, user_id, limit=None, cursors=None, since=None, until=None):
         """
         Get the user's consultation and medication history.
         
         Args:
             user_id (str): Unique identifier for the user
+            limit (int, optional): Return only the latest `limit` records of each kind
+            cursors (dict, optional): "consultations"/"medications"/"explanations" cursors
+                from a previous call's next_cursors, to fetch older records
+            since (datetime or str, optional): Only records at or after this time
+            until (datetime or str, optional): Only records before this time
             
         Returns:
-            dict: User history data
+            dict: User history data, plus next_cursors for the following page
         """
-        consultations = self.memory_service.get_user_consultations(user_id)
-        medications = self.memory_service.get_user_medication_schedules(user_id)
-        explanations = self.memory_service.get_term_explanations(user_id)
+        cursors = cursors or {}
+        history = {"next_cursors": {}}
+        for key, record_type in (("consultations", "consultation"),
+                                 ("medications", "medication_schedule"),
+                                 ("explanations", "explanation")):
+            page = self.memory_service.get_records_page(
+                user_id, record_type, limit=limit, cursor=cursors.get(key), since=since, until=until
+            )
+            history[key] = page["items"]
+            history["next_cursors"][key] = page["next_cursor"]
         
-        return {
-            "consultations": consultations,
-            "medications": medications,
-            "explanations": explanations
-        }
+        return history
     
     def get_upcoming_reminders(self, user_id):
         """
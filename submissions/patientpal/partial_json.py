@@ -0,0 +1,87 @@
+"""
+Partial JSON parsing for PatientPal.
+Reads the complete part of a JSON document that is still being streamed from the LLM.
+"""
+
+import json
+
+CLOSERS = {"{": "}", "[": "]"}
+
+
+def parse_partial_json(text):
+    """
+    Parse a possibly truncated JSON document.
+
+    Open strings, arrays and objects are closed; a trailing key or element that
+    cannot be completed is dropped.
+
+    Args:
+        text (str): JSON text received so far
+
+    Returns:
+        The parsed value, or None if nothing usable has arrived yet
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    text = text[start:]
+
+    stack = []
+    in_string = False
+    escape = False
+    unicode_escape = None  # start of the last \u escape seen inside a string
+    # Positions where the document can be cut and closed: (index, open containers)
+    cut_points = []
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+                if ch == "u":
+                    unicode_escape = i - 1
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in CLOSERS:
+            stack.append(ch)
+            cut_points.append((i + 1, tuple(stack)))
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return _loads(text[:i + 1])
+        elif ch == ",":
+            cut_points.append((i, tuple(stack)))
+
+    # First try closing everything where the text ends, including an open string
+    tail = text
+    if in_string:
+        if escape:
+            tail = tail[:-1]
+        elif unicode_escape is not None and len(text) - unicode_escape < 6:
+            # A \uXXXX escape cut short cannot be decoded, so drop it until the rest arrives
+            tail = tail[:unicode_escape]
+        tail += '"'
+    result = _loads(tail + _closing(stack))
+    if result is not None:
+        return result
+
+    for index, open_containers in reversed(cut_points):
+        result = _loads(text[:index] + _closing(open_containers))
+        if result is not None:
+            return result
+    return None
+
+
+def _closing(stack):
+    return "".join(CLOSERS[opener] for opener in reversed(stack))
+
+
+def _loads(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
@@ -0,0 +1,258 @@
+"""
+Local medication schedule engine for PatientPal.
+Maps structured frequency/timing to concrete daily dose times without an LLM.
+"""
+
+import os
+import re
+
+from medication_parser import match_frequency, match_timing, mentions_non_daily
+
+SCHEDULE_KEYS = ["morningSchedule", "afternoonSchedule", "eveningSchedule", "nightSchedule"]
+
+DEFAULT_ANCHORS = {
+    "wake": "07:00",
+    "breakfast": "08:00",
+    "lunch": "12:30",
+    "dinner": "18:30",
+    "bedtime": "22:00",
+}
+
+# Minutes between a meal and a dose taken before/after it
+MEAL_OFFSET_MINUTES = 30
+
+# Timing phrases already conveyed by the dose time itself, with the anchor each one names
+TIME_OF_DAY_SLOTS = {
+    "in the morning": "breakfast",
+    "in the afternoon": "lunch",
+    "in the evening": "dinner",
+    "at bedtime": "bedtime",
+}
+TIME_OF_DAY_PHRASES = set(TIME_OF_DAY_SLOTS)
+
+
+def parse_clock_time(value):
+    """Convert "HH:MM" (24h) to minutes after midnight."""
+    hours, minutes = value.strip().split(":")
+    return (int(hours) * 60 + int(minutes)) % (24 * 60)
+
+
+def format_clock_time(minutes):
+    """Convert minutes after midnight to the "8:00 AM" format used in schedules."""
+    hours, minutes = divmod(minutes % (24 * 60), 60)
+    suffix = "AM" if hours < 12 else "PM"
+    return f"{hours % 12 or 12}:{minutes:02d} {suffix}"
+
+
+def meal_offset(timing):
+    """Minutes to shift a meal-anchored dose for "before"/"after" timing."""
+    # Whole words only: "afternoon" is not "after"
+    if re.search(r"\bbefore\b", timing):
+        return -MEAL_OFFSET_MINUTES
+    if re.search(r"\bafter\b", timing):
+        return MEAL_OFFSET_MINUTES
+    return 0
+
+
+def schedule_bucket(minutes):
+    """Pick the schedule section a dose time belongs to."""
+    hour = minutes // 60
+    if 4 <= hour < 12:
+        return "morningSchedule"
+    if 12 <= hour < 17:
+        return "afternoonSchedule"
+    if 17 <= hour < 21:
+        return "eveningSchedule"
+    return "nightSchedule"
+
+
+class LocalScheduleEngine:
+    def __init__(self, anchors=None):
+        """
+        Initialize the schedule engine.
+
+        Args:
+            anchors (dict, optional): "HH:MM" times for wake, breakfast, lunch, dinner
+                and bedtime. Missing anchors are read from SCHEDULE_<NAME>_TIME
+                environment variables, then fall back to defaults.
+        """
+        anchors = anchors or {}
+        self.anchors = {
+            name: parse_clock_time(
+                anchors.get(name) or os.getenv(f"SCHEDULE_{name.upper()}_TIME", default)
+            )
+            for name, default in DEFAULT_ANCHORS.items()
+        }
+
+    def match_medication_frequency(self, medication):
+        """
+        Classify a medication's frequency, or None if it must be left to the LLM.
+
+        Only a frequency that is plainly once weekly is scheduled weekly. Any
+        other mention of a week, month or every other day in the frequency or
+        timing, or a frequency matching conflicting rules, is left unmatched.
+        The timing is only used as the frequency when the frequency says nothing.
+        """
+        frequency_text = medication.frequency or ""
+        timing_text = medication.timing or ""
+        if mentions_non_daily(timing_text):
+            return None
+        frequency = match_frequency(frequency_text)
+        if frequency is None and not mentions_non_daily(frequency_text):
+            frequency = match_frequency(timing_text)
+        return frequency
+
+    def dose_times(self, medication):
+        """
+        Work out the daily dose times for a medication.
+
+        Args:
+            medication (Medication): Parsed medication
+
+        Returns:
+            list: Minutes after midnight for each dose, or None if the
+                  frequency cannot be interpreted
+        """
+        frequency = self.match_medication_frequency(medication)
+        if frequency is None or frequency["frequency"] == "as needed":
+            return None
+
+        timing, _ = match_timing(medication.timing or "")
+        timing = timing or frequency["timing"] or ""
+        anchors = self.anchors
+
+        if frequency["interval_hours"]:
+            start = anchors["wake"]
+            return [start + k * frequency["interval_hours"] * 60 for k in range(frequency["doses_per_day"])]
+
+        doses = frequency["doses_per_day"] or 1
+        offset = meal_offset(timing)
+
+        if doses == 1:
+            for meal in ("breakfast", "lunch", "dinner"):
+                if meal in timing:
+                    return [anchors[meal] + offset]
+            if "supper" in timing:
+                return [anchors["dinner"] + offset]
+            if "bedtime" in timing:
+                return [anchors["bedtime"]]
+            if "evening" in timing:
+                return [anchors["dinner"] + offset]
+            if "afternoon" in timing:
+                return [anchors["lunch"] + offset]
+            if "empty stomach" in timing:
+                return [anchors["wake"]]
+            return [anchors["breakfast"] + offset]
+
+        single_meal = self.single_meal_time(timing)
+        if single_meal is not None:
+            # One named meal anchors one dose; the others keep their usual slots
+            meal, meal_time = single_meal
+            if doses == 2:
+                other = {"breakfast": anchors["dinner"], "lunch": anchors["bedtime"], "dinner": anchors["breakfast"]}[meal]
+                return sorted([meal_time, other])
+            slots = {"breakfast": anchors["breakfast"], "lunch": anchors["lunch"], "dinner": anchors["dinner"]}
+            slots[meal] = meal_time
+            times = list(slots.values())
+            return times + [anchors["bedtime"]] if doses > 3 else times
+
+        # Timing naming one time of day per dose ("morning and night") picks the slots
+        slots = [TIME_OF_DAY_SLOTS[phrase] for phrase in timing.split(", ") if phrase in TIME_OF_DAY_SLOTS]
+        if len(slots) == doses:
+            return sorted(anchors[slot] + (0 if slot == "bedtime" else offset) for slot in slots)
+
+        meal_times = [anchors["breakfast"], anchors["lunch"], anchors["dinner"]]
+        if doses == 2:
+            return [meal_times[0] + offset, meal_times[2] + offset]
+        if doses == 3:
+            return [t + offset for t in meal_times]
+        return [t + offset for t in meal_times] + [anchors["bedtime"]]
+
+    def single_meal_time(self, timing):
+        """
+        Find the dose time for timing that names exactly one meal.
+
+        Args:
+            timing (str): Canonical timing from match_timing
+
+        Returns:
+            tuple: (meal name, minutes after midnight including any before/after offset),
+                   or None if the timing names no meal or several
+        """
+        timing = (timing or "").replace("supper", "dinner")
+        meals = [meal for meal in ("breakfast", "lunch", "dinner") if meal in timing]
+        if len(meals) != 1:
+            return None
+        return meals[0], self.anchors[meals[0]] + meal_offset(timing)
+
+    def build_schedule(self, medications):
+        """
+        Bucket medications into the daily schedule structure.
+
+        Args:
+            medications (List[Medication]): Parsed medications
+
+        Daily doses go into SCHEDULE_KEYS; weekly medications go into
+        weeklySchedule so daily reminders never include them.
+
+        Returns:
+            tuple: (schedule dict, list of medications that could not be scheduled)
+        """
+        schedule = {key: [] for key in SCHEDULE_KEYS}
+        schedule["asNeededSchedule"] = []
+        schedule["weeklySchedule"] = []
+        unscheduled = []
+
+        for medication in medications:
+            frequency = self.match_medication_frequency(medication)
+            if frequency is not None and frequency["frequency"] == "as needed":
+                schedule["asNeededSchedule"].append({
+                    "name": medication.name,
+                    "dosage": medication.dosage,
+                    "time": "As needed",
+                    "instructions": medication.instructions or ""
+                })
+                continue
+
+            times = self.dose_times(medication)
+            if times is None:
+                unscheduled.append(medication)
+                continue
+
+            timing, _ = match_timing(medication.timing or "")
+            timing_notes = [
+                phrase for phrase in (timing or "").split(", ") if phrase and phrase not in TIME_OF_DAY_PHRASES
+            ]
+            instructions = [medication.instructions] if medication.instructions else []
+
+            if frequency is not None and frequency["frequency"] == "once weekly":
+                schedule["weeklySchedule"].append({
+                    "name": medication.name,
+                    "dosage": medication.dosage,
+                    "time": f"Once a week, {format_clock_time(times[0])}",
+                    "instructions": "; ".join(timing_notes + instructions)
+                })
+                continue
+
+            # A note naming one meal only belongs on the dose taken at that meal
+            single_meal = self.single_meal_time(timing) if len(times) > 1 else None
+            for minutes in times:
+                notes = timing_notes
+                if single_meal is not None and minutes != single_meal[1]:
+                    notes = [note for note in timing_notes if single_meal[0] not in note.replace("supper", "dinner")]
+                minutes %= 24 * 60
+                schedule[schedule_bucket(minutes)].append({
+                    "name": medication.name,
+                    "dosage": medication.dosage,
+                    "time": format_clock_time(minutes),
+                    "instructions": "; ".join(notes + instructions),
+                    "_minutes": minutes
+                })
+
+        for key in SCHEDULE_KEYS:
+            # Night doses after midnight sort after the late-evening ones.
+            schedule[key].sort(key=lambda entry: (entry["_minutes"] < 4 * 60, entry["_minutes"]))
+            for entry in schedule[key]:
+                del entry["_minutes"]
+
+        return schedule, unscheduled
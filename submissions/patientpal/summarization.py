@@ -1,45 +1,365 @@
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from groq import Groq
 
-class ConsultationSummaryService:
-    def __init__(self):
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY environment variable is not set")
-        self.client = Groq(api_key=api_key)
-    
-    def summarize(self, transcription):
-        system_prompt = """
+from explanation_cache import normalize_term
+from text_chunking import estimate_tokens, chunk_text
+from partial_json import parse_partial_json
+
+SUMMARY_SYSTEM_PROMPT = """
+        You are a medical assistant helping patients understand their doctor consultations.
+        Given a transcription of a medical consultation, provide:
+        1. A concise summary of the key points in plain language. Include medications mentioned, and when to take them.
+        2. A list of medical terms that might be confusing for the patient
+
+        Format your response as JSON with the following structure:
+        {
+          "summary": "Clear, concise summary, include medications in plain language...",
+          "terms": [
+            {"term": "medical term 1", "context": "brief context from the consultation"},
+            {"term": "medical term 2", "context": "brief context from the consultation"}
+          ]
+        }
+        """
+
+SUMMARY_MEDICATIONS_SYSTEM_PROMPT = """
         You are a medical assistant helping patients understand their doctor consultations.
         Given a transcription of a medical consultation, provide:
         1. A concise summary of the key points in plain language. Include medications mentioned, and when to take them.
         2. A list of medical terms that might be confusing for the patient
-        
+        3. A list of the medications prescribed or discussed, with their dosage, frequency and timing
+
         Format your response as JSON with the following structure:
         {
           "summary": "Clear, concise summary, include medications in plain language...",
           "terms": [
             {"term": "medical term 1", "context": "brief context from the consultation"},
             {"term": "medical term 2", "context": "brief context from the consultation"}
+          ],
+          "medications": [
+            {
+              "name": "Medication name",
+              "dosage": "Dosage amount",
+              "frequency": "How often to take",
+              "timing": "When to take (e.g., morning, with meals)",
+              "instructions": "Any special instructions"
+            }
+          ]
+        }
+        Use an empty list when no medications are mentioned.
+        """
+
+CHUNK_SYSTEM_PROMPT = """
+        You are a medical assistant helping patients understand their doctor consultations.
+        You are given one part of a longer consultation transcription. For this part only, provide:
+        1. A summary of its key points in plain language. Keep every medication, dose and timing mentioned.
+        2. A list of medical terms in this part that might be confusing for the patient
+
+        Format your response as JSON with the following structure:
+        {
+          "summary": "Summary of this part...",
+          "terms": [
+            {"term": "medical term 1", "context": "brief context from the consultation"}
+          ]
+        }
+        """
+
+CHUNK_MEDICATIONS_SYSTEM_PROMPT = """
+        You are a medical assistant helping patients understand their doctor consultations.
+        You are given one part of a longer consultation transcription. For this part only, provide:
+        1. A summary of its key points in plain language. Keep every medication, dose and timing mentioned.
+        2. A list of medical terms in this part that might be confusing for the patient
+        3. A list of the medications prescribed or discussed in this part
+
+        Format your response as JSON with the following structure:
+        {
+          "summary": "Summary of this part...",
+          "terms": [
+            {"term": "medical term 1", "context": "brief context from the consultation"}
+          ],
+          "medications": [
+            {
+              "name": "Medication name",
+              "dosage": "Dosage amount",
+              "frequency": "How often to take",
+              "timing": "When to take (e.g., morning, with meals)",
+              "instructions": "Any special instructions"
+            }
           ]
         }
+        Use an empty list when no medications are mentioned.
+        """
+
+MERGE_SYSTEM_PROMPT = """
+        You are a medical assistant helping patients understand their doctor consultations.
+        You are given summaries of consecutive parts of one consultation. Combine them into a single
+        concise summary of the key points in plain language, without repetition. Include medications
+        mentioned, and when to take them.
+
+        Format your response as JSON with the following structure:
+        {
+          "summary": "Clear, concise summary, include medications in plain language..."
+        }
         """
-        
+
+
+class ConsultationSummaryService:
+    def __init__(self):
+        api_key = os.getenv("GROQ_API_KEY")
+        if not api_key:
+            raise ValueError("GROQ_API_KEY environment variable is not set")
+        self.client = Groq(api_key=api_key)
+        self.model_name = "llama3-8b-8192"
+
+        # Transcriptions too long for one prompt are summarized in parts and merged
+        self.mode = os.getenv("SUMMARY_MODE", "auto").lower()
+        self.max_input_tokens = int(os.getenv("SUMMARY_MAX_INPUT_TOKENS", "5000"))
+        self.chunk_tokens = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+        self.chunk_overlap_tokens = int(os.getenv("SUMMARY_CHUNK_OVERLAP_TOKENS", "150"))
+        self.max_workers = int(os.getenv("SUMMARY_MAX_WORKERS", "4"))
+
+        # Medications are extracted in the same call, so no separate extraction request is needed
+        self.extract_medications = os.getenv("SUMMARY_EXTRACT_MEDICATIONS", "true").lower() in ("1", "true", "yes")
+        if self.extract_medications:
+            self.system_prompt = SUMMARY_MEDICATIONS_SYSTEM_PROMPT
+            self.chunk_system_prompt = CHUNK_MEDICATIONS_SYSTEM_PROMPT
+        else:
+            self.system_prompt = SUMMARY_SYSTEM_PROMPT
+            self.chunk_system_prompt = CHUNK_SYSTEM_PROMPT
+
+    def summarize(self, transcription):
+        if self._use_map_reduce(transcription):
+            return self.summarize_map_reduce(transcription)
+
+        result = self._complete_json(
+            self.system_prompt,
+            f"Please summarize and identify medical terms in this consultation: {transcription}"
+        )
+        if result is None:
+            return {
+                "summary": "Failed to generate summary. Please try again.",
+                "terms": []
+            }
+        return self._with_medications(result)
+
+    def _use_map_reduce(self, transcription):
+        return self.mode == "map_reduce" or (
+            self.mode == "auto" and estimate_tokens(transcription) > self.max_input_tokens
+        )
+
+    def summarize_stream(self, transcription):
+        """
+        Summarize a transcription, yielding partial results as the completion streams in.
+
+        Long transcriptions use map-reduce and yield once, when complete. If the
+        finished stream is not a complete JSON object, the summary is requested
+        once more without streaming, in JSON mode.
+
+        Args:
+            transcription (str): Consultation transcription
+
+        Yields:
+            dict: "summary" text so far, "terms" completed so far and "done"; the final
+                  item has done=True and the same shape as summarize()
+        """
+        if self._use_map_reduce(transcription):
+            yield {**self.summarize_map_reduce(transcription), "done": True}
+            return
+
+        # JSON mode cannot be combined with streaming, so the prompt alone asks for JSON
+        stream = self.client.chat.completions.create(
+            model=self.model_name,
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": f"Please summarize and identify medical terms in this consultation: {transcription}"}
+            ],
+            stream=True
+        )
+
+        content = ""
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            content += delta
+            partial = parse_partial_json(content)
+            if not isinstance(partial, dict):
+                continue
+            terms = partial.get("terms") if isinstance(partial.get("terms"), list) else []
+            # The last term may still be arriving
+            yield {"summary": str(partial.get("summary", "")), "terms": _complete_terms(terms[:-1]), "done": False}
+
+        result = _parse_complete_json(content)
+        if not isinstance(result, dict) or not result.get("summary"):
+            # The unconstrained stream was truncated or not JSON; ask once more in JSON mode
+            result = self._complete_json(
+                self.system_prompt,
+                f"Please summarize and identify medical terms in this consultation: {transcription}"
+            )
+        if not isinstance(result, dict) or not result.get("summary"):
+            result = {
+                "summary": "Failed to generate summary. Please try again.",
+                "terms": []
+            }
+        result["terms"] = _complete_terms(result.get("terms") if isinstance(result.get("terms"), list) else [])
+        yield {**self._with_medications(result), "done": True}
+
+    def summarize_map_reduce(self, transcription):
+        """
+        Summarize a long transcription in parts concurrently, then merge the results.
+
+        Args:
+            transcription (str): Consultation transcription
+
+        Returns:
+            dict: Merged summary and de-duplicated terms; "incomplete" and "missing_parts"
+                  (1-based) are set when some parts still fail after a retry
+        """
+        chunks = chunk_text(transcription, self.chunk_tokens, self.chunk_overlap_tokens)
+
+        def summarize_chunk(indexed_chunk):
+            index, chunk = indexed_chunk
+            return self._complete_json(
+                self.chunk_system_prompt,
+                f"Part {index + 1} of {len(chunks)} of the consultation: {chunk}"
+            )
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(chunks)))) as executor:
+            results = list(executor.map(summarize_chunk, enumerate(chunks)))
+            # Retry parts whose response could not be parsed once before giving up on them
+            failed = [index for index, result in enumerate(results) if not result]
+            for index, result in zip(failed, executor.map(summarize_chunk, [(index, chunks[index]) for index in failed])):
+                results[index] = result
+
+        partials = [result for result in results if result]
+        if not partials:
+            return {
+                "summary": "Failed to generate summary. Please try again.",
+                "terms": []
+            }
+
+        summary = self._merge_summaries([partial.get("summary", "") for partial in partials])
+        missing = [index + 1 for index, result in enumerate(results) if not result]
+        if missing:
+            parts = ("parts " if len(missing) > 1 else "part ") + ", ".join(str(part) for part in missing)
+            summary += (
+                f"\n\nNote: {parts} of {len(chunks)} of the consultation could not be summarized, "
+                "so this summary may be incomplete."
+            )
+
+        result = self._with_medications({
+            "summary": summary,
+            "terms": merge_terms(partial.get("terms", []) for partial in partials),
+            "medications": merge_medications(partial.get("medications", []) for partial in partials)
+        })
+        if missing:
+            result["incomplete"] = True
+            result["missing_parts"] = missing
+        return result
+
+    def _with_medications(self, result):
+        """Keep only well-formed medication entries, or drop the key when extraction is off."""
+        if not self.extract_medications:
+            result.pop("medications", None)
+            return result
+        medications = result.get("medications")
+        if not isinstance(medications, list):
+            medications = []
+        result["medications"] = [
+            medication for medication in medications
+            if isinstance(medication, dict) and medication.get("name")
+        ]
+        return result
+
+    def _merge_summaries(self, summaries):
+        """Combine part summaries with the LLM, in stages if they do not fit one prompt."""
+        summaries = [summary for summary in summaries if summary]
+        if len(summaries) <= 1:
+            return summaries[0] if summaries else ""
+
+        combined = "\n\n".join(f"Part {i + 1}: {summary}" for i, summary in enumerate(summaries))
+        if estimate_tokens(combined) > self.max_input_tokens:
+            # Merge groups of part summaries first, then merge those results
+            groups = chunk_text(combined, self.chunk_tokens)
+            if len(groups) < len(summaries):
+                with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(groups)))) as executor:
+                    merged = list(executor.map(self._merge_group, groups))
+                return self._merge_summaries(merged)
+
+        return self._merge_group(combined) or " ".join(summaries)
+
+    def _merge_group(self, combined):
+        result = self._complete_json(MERGE_SYSTEM_PROMPT, f"Combine these consultation summaries: {combined}")
+        return result.get("summary", "") if result else ""
+
+    def _complete_json(self, system_prompt, user_content):
+        """Run a JSON-mode completion, returning the parsed object or None."""
         response = self.client.chat.completions.create(
-            model="llama3-8b-8192",
+            model=self.model_name,
             messages=[
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Please summarize and identify medical terms in this consultation: {transcription}"}
+                {"role": "user", "content": user_content}
             ],
             response_format={"type": "json_object"}
         )
-        
+
         try:
             result = json.loads(response.choices[0].message.content)
-            return result
         except json.JSONDecodeError:
-            return {
-                "summary": "Failed to generate summary. Please try again.",
-                "terms": []
-            }
+            return None
+        return result if isinstance(result, dict) else None
+
+
+def _parse_complete_json(text):
+    """Parse the JSON object in a finished completion, ignoring any text around it."""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        return None
+    try:
+        return json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+
+
+def _complete_terms(terms):
+    return [term for term in terms if isinstance(term, dict) and term.get("term")]
+
+
+def merge_terms(term_lists):
+    """
+    Combine term lists, keeping the first occurrence of each term.
+
+    Args:
+        term_lists: Iterable of lists of {"term", "context"} dicts
+
+    Returns:
+        List[dict]: De-duplicated terms in order of first appearance
+    """
+    merged = {}
+    for terms in term_lists:
+        for term in terms or []:
+            if not isinstance(term, dict) or not term.get("term"):
+                continue
+            merged.setdefault(normalize_term(term["term"]), term)
+    return list(merged.values())
+
+
+def merge_medications(medication_lists):
+    """
+    Combine medication lists, keeping the first entry for each name and dosage.
+
+    Args:
+        medication_lists: Iterable of lists of medication dicts
+
+    Returns:
+        List[dict]: De-duplicated medications in order of first appearance
+    """
+    merged = {}
+    for medications in medication_lists:
+        for medication in medications or []:
+            if not isinstance(medication, dict) or not medication.get("name"):
+                continue
+            key = (normalize_term(str(medication["name"])), normalize_term(str(medication.get("dosage") or "")))
+            merged.setdefault(key, medication)
+    return list(merged.values())
@@ -1,11 +1,12 @@
 """
 Medical term explanation service for PatientPal.
 Uses Retrieval-Augmented Generation to provide plain-language explanations of medical terms.
+Common terms are answered from a bundled offline glossary before any LLM call.
 """
 
 import os
 import json
-from groq import Groq
+from groq import Groq, APIError
 
 # For RAG
 from langchain_community.retrievers.web_research import WebResearchRetriever
@@ -15,6 +16,27 @@ from langchain_community.vectorstores import Chroma
 from langchain_groq import ChatGroq
 from langchain.tools import Tool
 
+from explanation_cache import normalize_term
+from glossary import MedicalGlossary
+
+BATCH_SYSTEM_PROMPT = """
+        You are a helpful medical assistant explaining medical terms in simple language.
+        For each numbered term, provide a clear, concise explanation that would be understandable to someone without medical training.
+        Include a simple definition, why it's relevant to the patient, and any key information they should know.
+        
+        Format your response as JSON with the following structure, one entry per term:
+        {
+          "explanations": [
+            {
+              "index": 1,
+              "term": "the term as given",
+              "explanation": "Simple explanation in plain language...",
+              "sources": ["Mayo Clinic", "WebMD", "etc."]
+            }
+          ]
+        }
+        """
+
 class TermExplanationService:
     def __init__(self):
         """Initialize the term explanation service using Groq API with RAG capabilities."""
@@ -25,6 +47,18 @@ class TermExplanationService:
         self.client = Groq(api_key=api_key)
         self.rag_initialized = False
         
+        # Several terms share one request (and one copy of the system prompt)
+        self.batch_size = int(os.getenv("TERM_BATCH_SIZE", "8"))
+        self.batch_retries = int(os.getenv("TERM_BATCH_RETRIES", "1"))
+        
+        # Common terms are answered from the bundled glossary without an LLM call
+        self.glossary = None
+        if os.getenv("GLOSSARY_ENABLED", "true").lower() in ("1", "true", "yes"):
+            try:
+                self.glossary = MedicalGlossary()
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Glossary unavailable: {e}. Using the LLM for all terms.")
+        
         try:
             self.initialize_rag()
             self.rag_initialized = True
@@ -52,6 +86,10 @@ class TermExplanationService:
         Returns:
             dict: Contains 'explanation' text and 'sources' if available
         """
+        glossary_result = self.explain_from_glossary(term)
+        if glossary_result is not None:
+            return glossary_result
+        
         if self.rag_initialized:
             pass
         
@@ -86,5 +124,120 @@ class TermExplanationService:
         except json.JSONDecodeError:
             return {
                 "explanation": "Failed to generate explanation. Please try again.",
-                "sources": []
+                "sources": [],
+                "error": True
+            }
+    
+    def explain_from_glossary(self, term):
+        """
+        Look a term up in the offline glossary.
+        
+        Args:
+            term (str): The medical term to explain
+            
+        Returns:
+            dict: Explanation with the glossary as its source, or None if the term is not in it
+        """
+        if self.glossary is None:
+            return None
+        match = self.glossary.lookup(term)
+        if match is None:
+            return None
+        entry, match_type = match
+        return {
+            "explanation": entry["definition"],
+            "sources": [f"{self.glossary.name} v{self.glossary.version}"],
+            "glossary_term": entry["term"],
+            "match": match_type
+        }
+    
+    def explain_terms(self, terms_with_context):
+        """
+        Generate plain-language explanations for several terms, a batch per LLM request.
+        
+        Terms in the offline glossary are answered from it. Each entry of the response
+        is validated on its own; only terms missing or invalid in the response are
+        retried, and terms that still fail are explained individually.
+        
+        Args:
+            terms_with_context (list): (term, context) pairs or {"term", "context"} dicts
+            
+        Returns:
+            List[dict]: One explain_term-style result per input, in input order
+        """
+        requests = []
+        for item in terms_with_context:
+            if isinstance(item, dict):
+                requests.append((item["term"], item.get("context")))
+            else:
+                requests.append((item[0], item[1] if len(item) > 1 else None))
+        
+        results = [self.explain_from_glossary(term) for term, _ in requests]
+        pending = [i for i, result in enumerate(results) if result is None]
+        for _ in range(1 + self.batch_retries):
+            if not pending:
+                break
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                for i, result in zip(batch, self._explain_batch([requests[i] for i in batch])):
+                    results[i] = result
+            pending = [i for i in pending if results[i] is None]
+        
+        for i in pending:
+            results[i] = self.explain_term(*requests[i])
+        return results
+    
+    def _explain_batch(self, requests):
+        """
+        Explain up to batch_size terms with one JSON-mode request.
+        
+        Returns:
+            list: Result dict or None per request, in order
+        """
+        lines = []
+        for i, (term, context) in enumerate(requests, start=1):
+            line = f"{i}. '{term}'"
+            if context:
+                line += f" in this context: '{context}'"
+            lines.append(line)
+        
+        parsed = [None] * len(requests)
+        try:
+            response = self.client.chat.completions.create(
+                model="llama3-8b-8192",
+                messages=[
+                    {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                    {"role": "user", "content": "Please explain these medical terms:\n" + "\n".join(lines)}
+                ],
+                response_format={"type": "json_object"}
+            )
+            items = json.loads(response.choices[0].message.content).get("explanations", [])
+        except (APIError, json.JSONDecodeError, AttributeError) as e:
+            # The terms are retried, then explained one at a time
+            print(f"Batch term explanation failed: {e}")
+            return parsed
+        
+        positions = {normalize_term(term): i for i, (term, _) in enumerate(requests)}
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            # Prefer the echoed term; fall back to the index when it was reworded
+            position = positions.get(normalize_term(str(item.get("term", ""))))
+            if position is None:
+                index = item.get("index")
+                if not isinstance(index, int) or not 1 <= index <= len(requests):
+                    continue
+                position = index - 1
+            if parsed[position] is not None:
+                continue
+            
+            explanation = item.get("explanation")
+            if not isinstance(explanation, str) or not explanation.strip():
+                continue
+            sources = item.get("sources")
+            parsed[position] = {
+                "explanation": explanation.strip(),
+                "sources": [str(source) for source in sources] if isinstance(sources, list) else []
             }
+        
+        return parsed
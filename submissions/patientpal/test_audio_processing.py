@@ -0,0 +1,91 @@
+"""
+Tests for resampling, chunk planning and transcript stitching of recordings.
+"""
+
+import wave
+
+import numpy as np
+import pytest
+
+from audio_processing import plan_chunks, resample_wav_to_mono, stitch_transcripts
+
+WINDOW = 0.1
+
+
+def test_short_recording_is_one_chunk():
+    assert plan_chunks(np.ones(500), WINDOW, 50.0, chunk_seconds=120) == [(0.0, 50.0)]
+
+
+def test_chunks_cut_at_the_quietest_window_and_overlap():
+    duration = 250.0
+    energies = np.ones(int(duration / WINDOW))
+    energies[1050] = 0.0  # silence at 105s, inside the search range before the 120s target
+    chunks = plan_chunks(energies, WINDOW, duration, chunk_seconds=120, overlap_seconds=2.0)
+
+    assert chunks[0] == (0.0, pytest.approx(105.0))
+    assert chunks[1][0] == pytest.approx(103.0)
+    assert chunks[-1][1] == duration
+    for (_, end), (next_start, _) in zip(chunks, chunks[1:]):
+        assert next_start == pytest.approx(end - 2.0)
+    assert all(end - start <= 120 + 2.0 for start, end in chunks)
+
+
+def test_without_quiet_windows_chunks_are_cut_near_the_target_length():
+    chunks = plan_chunks(np.ones(3000), WINDOW, 300.0, chunk_seconds=100, overlap_seconds=0.0)
+    assert chunks[-1][1] == 300.0
+    assert all(80.0 <= end - start <= 100.0 for start, end in chunks[:-1])
+
+
+def test_stitching_drops_words_repeated_across_the_overlap():
+    texts = ["take one tablet of Metformin twice", "Metformin, twice daily with food", "with food"]
+    assert stitch_transcripts(texts) == "take one tablet of Metformin twice daily with food"
+
+
+def test_stitching_keeps_single_word_coincidences_and_skips_empty_chunks():
+    assert stitch_transcripts(["see you in", "", "in two weeks"]) == "see you in in two weeks"
+
+
+def write_tone(path, frequency, sample_rate=48000, seconds=2.0, channels=2):
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    tone = (0.5 * np.sin(2 * np.pi * frequency * t) * 32767).astype(np.int16)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(np.repeat(tone, channels).tobytes())
+
+
+def rms(samples):
+    return float(np.sqrt(np.mean((samples[1600:-1600] / 32768.0) ** 2)))
+
+
+def test_resampling_keeps_speech_band_tones_and_length(tmp_path):
+    path = tmp_path / "tone.wav"
+    write_tone(path, 1000)
+    samples = resample_wav_to_mono(str(path), 16000)
+    assert samples.dtype == np.int16
+    assert abs(len(samples) - 32000) <= 1
+    assert rms(samples) == pytest.approx(0.5 / np.sqrt(2), rel=0.02)
+
+
+def test_resampling_filters_tones_above_the_new_nyquist_frequency(tmp_path):
+    # 12 kHz would alias to 4 kHz at 16 kHz without a low-pass filter
+    path = tmp_path / "tone.wav"
+    write_tone(path, 12000)
+    assert rms(resample_wav_to_mono(str(path), 16000)) < 0.01
+
+
+def test_resampling_block_by_block_matches_one_block(tmp_path):
+    path = tmp_path / "tone.wav"
+    write_tone(path, 440, sample_rate=44100)
+    whole = resample_wav_to_mono(str(path), 16000, block_seconds=10)
+    blocks = resample_wav_to_mono(str(path), 16000, block_seconds=0.013)
+    assert len(blocks) == len(whole)
+    assert np.max(np.abs(blocks.astype(np.int32) - whole)) <= 1
+
+
+def test_resampling_a_segment(tmp_path):
+    path = tmp_path / "tone.wav"
+    write_tone(path, 440)
+    segment = resample_wav_to_mono(str(path), 16000, start_seconds=0.5, end_seconds=1.5)
+    assert abs(len(segment) - 16000) <= 1
@@ -0,0 +1,68 @@
+"""
+Tests for content hashing and the on-disk content cache.
+"""
+
+import io
+import os
+
+from content_cache import ContentCache, hash_content
+
+
+def test_hash_is_the_same_for_a_path_and_a_file_object(tmp_path):
+    path = tmp_path / "recording.wav"
+    path.write_bytes(b"RIFF" + bytes(range(256)) * 10)
+    stream = io.BytesIO(path.read_bytes())
+
+    assert hash_content(str(path), chunk_size=100) == hash_content(stream, chunk_size=64)
+    assert stream.tell() == 0
+    assert hash_content(io.BytesIO(b"other")) != hash_content(str(path))
+
+
+def test_unseekable_streams_are_not_hashed():
+    class Pipe(io.RawIOBase):
+        def seekable(self):
+            return False
+
+    assert hash_content(Pipe()) is None
+    assert hash_content(object()) is None
+
+
+def test_results_survive_a_new_cache_instance(tmp_path):
+    cache = ContentCache("ocr", cache_dir=str(tmp_path))
+    assert cache.get("abc") is None
+    cache.set("abc", "Metformin 500mg twice daily")
+
+    reopened = ContentCache("ocr", cache_dir=str(tmp_path))
+    assert reopened.get("abc") == "Metformin 500mg twice daily"
+    assert reopened.stats() == {"hits": 1, "misses": 0, "size_bytes": len("Metformin 500mg twice daily")}
+    assert ContentCache("transcription", cache_dir=str(tmp_path)).get("abc") is None
+
+
+def test_least_recently_used_entries_are_evicted_past_the_size_limit(tmp_path):
+    cache = ContentCache("ocr", cache_dir=str(tmp_path), max_bytes=25)
+    cache.set("old", "x" * 10)
+    cache.set("used", "y" * 10)
+    os.utime(cache._path("old"), (1, 1))
+    os.utime(cache._path("used"), (2, 2))
+    assert cache.get("used") is not None  # marked recently used; "old" goes first
+
+    cache.set("new", "z" * 10)
+    assert cache.get("old") is None
+    assert cache.get("used") == "y" * 10
+    assert cache.get("new") == "z" * 10
+    assert cache.stats()["size_bytes"] == 20
+
+
+def test_overwriting_an_entry_keeps_the_size_accurate(tmp_path):
+    cache = ContentCache("ocr", cache_dir=str(tmp_path))
+    cache.set("abc", "first")
+    cache.set("abc", "second result")
+    assert cache.get("abc") == "second result"
+    assert cache.stats()["size_bytes"] == len("second result")
+
+
+def test_file_objects_are_hashed_from_their_current_position():
+    stream = io.BytesIO(b"header" + b"payload")
+    stream.seek(6)
+    assert hash_content(stream) == hash_content(io.BytesIO(b"payload"))
+    assert stream.tell() == 6
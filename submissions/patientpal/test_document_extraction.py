@@ -0,0 +1,101 @@
+"""
+Tests for multi-page document extraction, with a stubbed extract_text.
+"""
+
+import io
+import threading
+import time
+
+import pytest
+
+from image_processing import ImageProcessingService
+
+TEXT_LAYER = "Metformin 500mg twice daily with meals. Review HbA1c in three months."
+
+
+def make_pdf(page_texts):
+    """Build a PDF with one page per text; an empty text makes a page with no text layer."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 10 Tf 20 700 Td ({text}) Tj ET".encode() if text else b""
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R >> >> >>" % len(objects)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    pdf = io.BytesIO()
+    pdf.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(pdf.tell())
+        pdf.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = pdf.tell()
+    pdf.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        pdf.write(b"%010d 00000 n \n" % offset)
+    pdf.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    pdf.seek(0)
+    return pdf
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("LOCAL_OCR_ENABLED", "false")
+    monkeypatch.setenv("CONTENT_CACHE_ENABLED", "false")
+    monkeypatch.setenv("IMAGE_PAGE_WORKERS", "2")
+    return ImageProcessingService()
+
+
+def test_pages_keep_their_order_when_ocr_finishes_out_of_order(service):
+    def extract_text(page):
+        time.sleep(0.01 * (5 - page))  # later pages finish first
+        return f"page {page}"
+
+    service.extract_text = extract_text
+    pages = [("image", number) for number in range(5)] + [("text", "typed page")]
+    assert service.extract_pages(pages).split("\n\n") == [f"page {n}" for n in range(5)] + ["typed page"]
+
+
+def test_at_most_twice_the_workers_pages_are_held(service):
+    lock = threading.Lock()
+    held = {"now": 0, "max": 0}
+
+    def extract_text(page):
+        time.sleep(0.01)
+        with lock:
+            held["now"] -= 1
+        return f"page {page}"
+
+    def pages():
+        for number in range(20):
+            with lock:
+                held["now"] += 1
+                held["max"] = max(held["max"], held["now"])
+            yield "image", number
+
+    service.extract_text = extract_text
+    assert service.extract_pages(pages()).count("page") == 20
+    assert held["max"] <= 2 * service.page_workers
+
+
+def test_pdf_pages_with_a_text_layer_skip_ocr(service):
+    pytest.importorskip("pypdfium2")
+    from image_preprocessing import iter_pdf_pages
+
+    ocr_calls = []
+
+    def extract_text(page):
+        ocr_calls.append(page.read(8))
+        return "scanned page"
+
+    service.extract_text = extract_text
+    kinds = [kind for kind, _ in iter_pdf_pages(make_pdf([TEXT_LAYER, ""]))]
+    assert kinds == ["text", "image"]
+
+    assert service.extract_document(make_pdf([TEXT_LAYER, ""])) == f"{TEXT_LAYER}\n\nscanned page"
+    assert ocr_calls == [b"\x89PNG\r\n\x1a\n"]
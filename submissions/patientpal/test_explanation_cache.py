@@ -0,0 +1,69 @@
+"""
+Tests for the shared explanation cache and its backends.
+"""
+
+import time
+
+import pytest
+
+from explanation_cache import ExplanationCache, InMemoryCacheBackend, SQLiteCacheBackend
+
+EXPLANATION = {"explanation": "High blood pressure.", "sources": ["glossary"]}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_backend(request, tmp_path):
+    def make(max_entries=5000):
+        if request.param == "sqlite":
+            return SQLiteCacheBackend(str(tmp_path / "cache.db"), max_entries=max_entries)
+        return InMemoryCacheBackend(max_entries=max_entries)
+    return make
+
+
+def test_least_recently_used_entry_is_evicted(make_backend):
+    backend = make_backend(max_entries=2)
+    backend.set("a", {"v": 1}, 1.0)
+    time.sleep(0.01)
+    backend.set("b", {"v": 2}, 1.0)
+    time.sleep(0.01)
+    assert backend.get("a") == ({"v": 1}, 1.0)  # "b" is now least recently used
+    time.sleep(0.01)
+    assert backend.set("c", {"v": 3}, 1.0) == 1
+    assert backend.get("b") is None
+    assert backend.get("a") is not None and backend.get("c") is not None
+    assert len(backend) == 2
+
+
+def test_expired_entries_are_misses(make_backend):
+    cache = ExplanationCache(backend=make_backend(), ttl_seconds=60, use_context=True)
+    cache.set("Hypertension", EXPLANATION)
+    assert cache.get("  hypertension ") == EXPLANATION
+
+    key = cache.make_key("hypertension")
+    cache.backend.set(key, cache.backend.get(key)[0], time.time() - 61)
+    assert cache.get("hypertension") is None
+    assert len(cache.backend) == 0
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_sqlite_backend_survives_reopening(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ExplanationCache(backend=SQLiteCacheBackend(path), ttl_seconds=60).set("Statin", EXPLANATION)
+    reopened = ExplanationCache(backend=SQLiteCacheBackend(path), ttl_seconds=60)
+    assert reopened.get("statin") == EXPLANATION
+
+
+def test_contextual_explanations_are_keyed_on_their_context():
+    cache = ExplanationCache(backend=InMemoryCacheBackend(), ttl_seconds=60, use_context=True)
+    cache.set("Metformin", EXPLANATION, context="Patient A has type 2 diabetes")
+    assert cache.get("metformin", context="Patient A has type 2 diabetes") == EXPLANATION
+    assert cache.get("metformin", context="Patient B has PCOS") is None
+    assert cache.get("metformin") is None
+
+
+def test_term_only_keys_never_store_contextual_explanations():
+    cache = ExplanationCache(backend=InMemoryCacheBackend(), ttl_seconds=60, use_context=False)
+    cache.set("Metformin", EXPLANATION, context="Patient A has type 2 diabetes")
+    assert len(cache.backend) == 0
+    cache.set("Metformin", EXPLANATION)
+    assert cache.get("metformin", context="Patient B has PCOS") == EXPLANATION
@@ -0,0 +1,98 @@
+"""
+Tests for the offline medical glossary.
+"""
+
+import pytest
+
+from glossary import MedicalGlossary, is_single_typo
+
+
+@pytest.fixture(scope="module")
+def glossary():
+    return MedicalGlossary()
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("Hypertension", "hypertension"),
+    ("high blood pressure", "hypertension"),
+    ("anaemia", "anemia"),
+    ("type 2 diabetes", "diabetes mellitus"),
+    ("arthritis", "arthritis"),
+])
+def test_exact_lookup(glossary, term, expected):
+    entry, match = glossary.lookup(term)
+    assert (entry["term"], match) == (expected, "exact")
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("hypertenison", "hypertension"),  # adjacent swap
+    ("hypertensin", "hypertension"),  # dropped letter
+    ("tachyycardia", "tachycardia"),  # doubled letter
+])
+def test_single_typos_match_fuzzily(glossary, term, expected):
+    entry, match = glossary.lookup(term)
+    assert (entry["term"], match) == (expected, "fuzzy")
+
+
+@pytest.mark.parametrize("term", [
+    "arteritis",  # not arthritis
+    "type 3 diabetes",  # not diabetes mellitus
+    "hypertensoin syndrome",
+    "hyprtnsion",  # more than one typo
+    "rb",  # short keys must match exactly
+    "cts",  # not the plural of "ct"
+])
+def test_distinct_terms_do_not_match(glossary, term):
+    assert glossary.lookup(term) is None
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("arthritis", "artrhitis", True),
+    ("arthritis", "arthritiss", True),
+    ("arthritis", "arteritis", False),
+    ("type 2 diabetes", "type 3 diabetes", False),
+    ("type 2 diabetes", "type 22 diabetes", False),
+    ("arthritis", "arthritis", False),
+])
+def test_is_single_typo(a, b, expected):
+    assert is_single_typo(a, b) is expected
+
+
+class _RecordingCache:
+    use_context = False
+
+    def __init__(self):
+        self.stored = []
+
+    def get(self, term, context=None):
+        return None
+
+    def set(self, term, explanation_data, context=None):
+        self.stored.append(term)
+
+
+class _Memory:
+    def get_term_explanations(self, user_id, term):
+        return []
+
+    def store_term_explanation(self, user_id, term, explanation_data):
+        return "id"
+
+
+class _GlossaryExplainer:
+    def __init__(self, glossary):
+        self.glossary = glossary
+
+    def explain_term(self, term, context=None):
+        entry, match = self.glossary.lookup(term)
+        return {"explanation": entry["definition"], "sources": ["glossary"], "match": match}
+
+
+def test_fuzzy_glossary_answers_are_not_shared(glossary):
+    from orchestrator import AgnoOrchestrator
+
+    cache = _RecordingCache()
+    orchestrator = AgnoOrchestrator(None, None, None, _GlossaryExplainer(glossary), None, _Memory(), cache)
+    orchestrator.explain_term("user", "hypertensin")
+    orchestrator.explain_term("user", "hypertension")
+    assert cache.stored == ["hypertension"]
@@ -0,0 +1,86 @@
+"""
+Tests for image format detection and pre-processing before OCR upload.
+"""
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_preprocessing import detect_mime_type, is_pdf, preprocess_image
+
+
+def encode(image, image_format="PNG", **kwargs):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **kwargs)
+    return buffer.getvalue()
+
+
+def noisy_photo(width, height):
+    rng = np.random.default_rng(0)
+    return Image.fromarray(rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8), "RGB")
+
+
+@pytest.mark.parametrize("image_format, mime_type", [
+    ("PNG", "image/png"), ("JPEG", "image/jpeg"), ("GIF", "image/gif"), ("BMP", "image/bmp"), ("WEBP", "image/webp"),
+])
+def test_mime_type_comes_from_the_bytes(image_format, mime_type):
+    assert detect_mime_type(encode(Image.new("RGB", (4, 4)), image_format)) == mime_type
+
+
+def test_unknown_bytes_use_the_default_mime_type():
+    assert detect_mime_type(b"not an image") == "image/jpeg"
+
+
+def test_large_photos_are_downsized_to_grayscale_jpeg():
+    original = encode(Image.new("RGB", (4000, 3000), "white"), "PNG")
+    encoded, mime_type = preprocess_image(original, max_dimension=2048)
+    with Image.open(io.BytesIO(encoded)) as image:
+        assert (image.size, image.mode, image.format) == ((2048, 1536), "L", "JPEG")
+    assert mime_type == "image/jpeg"
+
+
+def test_small_images_are_not_upscaled_and_keep_colour_when_asked():
+    encoded, mime_type = preprocess_image(encode(Image.new("RGB", (300, 200))), grayscale=False, output_format="png")
+    with Image.open(io.BytesIO(encoded)) as image:
+        assert (image.size, image.mode) == ((300, 200), "RGB")
+    assert mime_type == "image/png"
+
+
+def test_exif_orientation_is_applied():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise when displayed
+    original = encode(Image.new("RGB", (400, 200)), "JPEG", exif=exif)
+    encoded, _ = preprocess_image(original)
+    with Image.open(io.BytesIO(encoded)) as image:
+        assert image.size == (200, 400)
+
+
+def test_quality_then_resolution_is_lowered_to_meet_the_size_target():
+    original = encode(noisy_photo(1600, 1200), "PNG")
+    encoded, _ = preprocess_image(original, max_bytes=200 * 1024)
+    assert len(encoded) <= 200 * 1024
+    with Image.open(io.BytesIO(encoded)) as image:
+        assert max(image.size) < 1600
+
+
+def test_undecodable_input_is_left_to_the_caller():
+    assert preprocess_image(b"%PDF-1.7 not an image") is None
+
+
+def test_unsupported_output_format_is_rejected():
+    with pytest.raises(ValueError):
+        preprocess_image(encode(Image.new("RGB", (4, 4))), output_format="tiff")
+
+
+def test_pdfs_are_recognised_by_name_or_header(tmp_path):
+    path = tmp_path / "letter"
+    path.write_bytes(b"%PDF-1.7\n")
+    stream = io.BytesIO(b"xx%PDF-1.7")
+    stream.seek(2)
+
+    assert is_pdf(str(path))
+    assert is_pdf("missing.PDF")
+    assert is_pdf(stream) and stream.tell() == 2
+    assert not is_pdf(io.BytesIO(b"\x89PNG\r\n\x1a\n"))
@@ -0,0 +1,70 @@
+"""
+Tests for live microphone transcription in rolling segments, with a stub service.
+"""
+
+import io
+import wave
+
+import numpy as np
+
+from transcription import LiveTranscriptionSession
+
+RATE = 1000
+BLOCK = 250  # samples per spoken "word"
+
+
+class StubService:
+    """Transcribes WAV segments whose samples are their own position in the recording."""
+
+    def __init__(self, fail_calls=()):
+        self.segments = []
+        self.fail_calls = set(fail_calls)
+
+    def _transcribe_stream(self, filename, audio_stream):
+        with wave.open(audio_stream, "rb") as wav:
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+        self.segments.append((int(samples[0]), int(samples[-1])))
+        if len(self.segments) in self.fail_calls:
+            raise RuntimeError("service unavailable")
+        return " ".join(f"w{block}" for block in sorted(set(samples // BLOCK)))
+
+
+def words(first, last):
+    return " ".join(f"w{block}" for block in range(first, last + 1))
+
+
+def record(session, total, chunk=300):
+    for start in range(0, total, chunk):
+        session.add_audio(RATE, np.arange(start, min(start + chunk, total), dtype=np.int16))
+
+
+def test_segments_are_cut_with_overlap_and_stitched():
+    service = StubService()
+    session = LiveTranscriptionSession(service, segment_seconds=2, overlap_seconds=0.5)
+    record(session, 4500)
+
+    assert session.finish() == words(0, 4499 // BLOCK)
+    # Each segment repeats the last half second of the one before
+    assert service.segments == [(0, 2099), (1600, 4199), (3700, 4499)]
+
+
+def test_failed_segment_is_skipped_and_the_rest_kept():
+    service = StubService(fail_calls={2})
+    session = LiveTranscriptionSession(service, segment_seconds=2, overlap_seconds=0.5)
+    record(session, 6500)
+
+    transcript = session.finish()
+    assert transcript.startswith(words(0, 2099 // BLOCK))
+    assert transcript.endswith(words(5800 // BLOCK, 6499 // BLOCK))
+    assert [failure[:3] for failure in session.failed_segments] == [(2, 2.1, 4.2)]
+    assert "service unavailable" in session.failed_segments[0][3]
+
+
+def test_finish_sends_audio_shorter_than_a_segment():
+    service = StubService()
+    session = LiveTranscriptionSession(service, segment_seconds=2, overlap_seconds=0.5)
+    assert session.add_audio(RATE, np.arange(0, 500, dtype=np.int16)) == ""
+    assert service.segments == []
+
+    assert session.finish() == words(0, 1)
+    assert service.segments == [(0, 499)]
@@ -0,0 +1,69 @@
+"""
+Tests for the local OCR fast path in ImageProcessingService.
+"""
+
+import io
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from image_processing import ImageProcessingService
+from local_ocr import LocalOCR, tesseract_available
+
+NOTE = ["Metformin 500mg twice daily with meals", "Lisinopril 10mg once daily in the morning",
+        "Review blood pressure in two weeks"]
+
+
+def note_photo():
+    image = Image.new("RGB", (2400, 800), "white")
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=48)
+    for line, text in enumerate(NOTE):
+        draw.text((80, 120 + line * 180), text, fill="black", font=font)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("CONTENT_CACHE_ENABLED", "false")
+    monkeypatch.setenv("LOCAL_OCR_ENABLED", "false")
+    # Squeeze the upload copy hard, so reading it instead of the original would show
+    monkeypatch.setenv("IMAGE_MAX_DIMENSION", "600")
+    monkeypatch.setenv("IMAGE_MAX_UPLOAD_BYTES", str(20 * 1024))
+    return ImageProcessingService()
+
+
+def test_local_ocr_reads_the_original_and_upload_gets_the_preprocessed_copy(service):
+    seen = []
+
+    def recognize(image_data):
+        seen.append(bytes(image_data))
+        return None, 0.1
+
+    uploads = []
+
+    def create(**kwargs):
+        uploads.append(kwargs["messages"][1]["content"][1]["image_url"]["url"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="remote text"))])
+
+    service.local_ocr = SimpleNamespace(recognize=recognize)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    photo = note_photo()
+
+    assert service.extract_text(io.BytesIO(photo)) == "remote text"
+    assert seen == [photo]
+    assert uploads[0].startswith("data:image/jpeg;base64,")
+
+
+@pytest.mark.skipif(not tesseract_available(), reason="tesseract is not installed")
+def test_clean_printed_note_is_read_locally(service):
+    service.local_ocr = LocalOCR(min_confidence=0.8)
+    service.client = None  # any remote call would fail
+
+    text = service.extract_text(io.BytesIO(note_photo()))
+    assert "Metformin" in text and "Lisinopril" in text
+    assert service.get_ocr_stats()["local"] == 1
@@ -0,0 +1,88 @@
+"""
+Tests for MedicationSchedulingService parsing fallbacks, with a stubbed Groq client.
+"""
+
+import time
+from types import SimpleNamespace
+
+import groq
+import httpx
+import pytest
+
+from medication import MedicationSchedulingService
+
+
+def stub_client(create):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def reply(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    return MedicationSchedulingService()
+
+
+def test_api_errors_keep_lines_parsed_locally(service):
+    def create(**kwargs):
+        raise groq.APIConnectionError(request=httpx.Request("POST", "https://api.groq.com"))
+
+    service.client = stub_client(create)
+    medications = service.parse_medication_inputs(["Metformin 500mg twice daily", "the blue pill the doctor mentioned"])
+    assert [medication.name for medication in medications] == ["Metformin"]
+
+
+def test_batch_reply_without_a_list_falls_back_to_single_parsing(service):
+    replies = iter([
+        reply('{"medications": null}'),
+        reply('{"name": "Aspirin", "dosage": "81mg", "frequency": "once daily", "timing": "morning"}'),
+    ])
+    service.client = stub_client(lambda **kwargs: next(replies))
+    medications = service.parse_medication_inputs(["Metformin 500mg twice daily", "baby aspirin as usual"])
+    assert [medication.name for medication in medications] == ["Metformin", "Aspirin"]
+
+
+def test_failed_batch_falls_back_to_concurrent_single_parsing_within_one_timeout(service):
+    def create(**kwargs):
+        if "numbered" in kwargs["messages"][0]["content"]:
+            raise groq.APITimeoutError(request=httpx.Request("POST", "https://api.groq.com"))
+        line = kwargs["messages"][1]["content"].rsplit(": ", 1)[1]
+        if line.startswith("slow"):
+            time.sleep(1.0)
+        return reply(f'{{"name": "{line}", "dosage": "1 tablet", "frequency": "once daily", "timing": "morning"}}')
+
+    service.client = stub_client(create)
+    lines = ["blue pill", "red pill", "slow pill", "green pill"]
+    started = time.monotonic()
+    medications = service.parse_medication_inputs(lines, timeout=0.3, concurrency=4)
+    assert time.monotonic() - started < 0.9
+    assert [medication.name for medication in medications] == ["blue pill", "red pill", "green pill"]
+
+
+def test_summary_medications_with_missing_timing_are_filled_in(service):
+    validated, lines = service.prime_parse_cache([
+        {"name": "Metformin", "dosage": "500mg", "frequency": "twice daily", "timing": None},
+        {"name": "Atorvastatin", "dosage": "20mg", "frequency": "once daily", "timing": "at bedtime"},
+    ])
+    assert [medication.timing for medication in validated] == ["as directed", "at bedtime"]
+    assert lines == ["Metformin 500mg twice daily", "Atorvastatin 20mg once daily at bedtime"]
+    assert service.parse_medication_input("Metformin 500mg twice daily").timing == "as directed"
+    assert service.get_parse_stats()["cached"] == 1
+
+
+def test_summary_medications_left_unvalidated_use_the_extraction_path(service):
+    from orchestrator import AgnoOrchestrator
+
+    medications = [
+        {"name": "Metformin", "dosage": "500mg", "frequency": "twice daily"},
+        {"name": "Lisinopril", "dosage": None, "frequency": "once daily"},
+    ]
+    consultation_data = {"summary": "", "terms": [], "medications": medications}
+    orchestrator = AgnoOrchestrator(None, None, None, None, service, None)
+
+    assert orchestrator._prepare_medications(consultation_data) is None
+    assert consultation_data["medications"] == medications  # not reduced to the valid entry
+    assert service.parse_cache == {}
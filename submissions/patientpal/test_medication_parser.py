@@ -0,0 +1,102 @@
+"""
+Tests for the rule-based medication parser.
+"""
+
+import pytest
+
+from medication_parser import RuleBasedMedicationParser, match_frequency
+
+
+@pytest.fixture
+def parser():
+    return RuleBasedMedicationParser()
+
+
+@pytest.mark.parametrize("text, frequency, timing", [
+    ("Metformin 500mg twice daily with dinner", "twice daily", "with dinner"),
+    ("Lisinopril 10mg daily at bedtime", "once daily", "at bedtime"),
+    ("Amoxicillin 500mg three times daily for 2 weeks", "three times daily", "morning, afternoon and evening"),
+    ("Paracetamol 500mg every 6 hours", "every 6 hours", "morning, midday, evening and bedtime"),
+    ("Alendronate 70mg once weekly", "once weekly", "as directed"),
+    ("Methotrexate 15mg once a week in the morning", "once weekly", "in the morning"),
+])
+def test_common_phrasing_is_parsed(parser, text, frequency, timing):
+    fields, confidence = parser.parse(text)
+    assert fields is not None
+    assert (fields["frequency"], fields["timing"]) == (frequency, timing)
+    assert confidence == 1.0
+
+
+def test_course_length_is_kept_as_instruction(parser):
+    fields, _ = parser.parse("Amoxicillin 500mg three times daily for 2 weeks")
+    assert fields["instructions"] == "for 2 weeks"
+
+
+@pytest.mark.parametrize("text", [
+    # A weekly drug must never become a daily reminder
+    "Methotrexate 2.5mg weekly at bedtime",
+    "Methotrexate 2.5mg once a week every morning",
+    "Drug 10mg once daily weekly",
+    # Several doses a week or other non-daily periods
+    "Alendronate 70mg twice weekly",
+    "Drug 5mg three times a week",
+    "Drug 5mg 2x weekly",
+    "Drug 5mg every 2 weeks",
+    "Vitamin D 1000 iu every other day",
+    "Vitamin B12 1000mcg monthly",
+    # Conflicting daily cues
+    "Ibuprofen 400mg twice daily at bedtime",
+    # Changes to a prescription
+    "Stop metformin 500mg twice daily",
+    "Do not take ibuprofen 400mg three times daily",
+    "Increase lisinopril 20mg daily",
+    # Intervals too short for ordinary dosing
+    "Drug 5mg every 1 hour",
+    # Tapers and split doses
+    "Prednisolone 40mg daily then 30mg daily",
+    "Prednisolone 40mg daily, 30mg daily",
+    "Prednisolone 20mg daily then stop",
+    "Metformin 500mg in the morning and 1000mg in the evening",
+    "Insulin glargine 10 units in the morning, 5 units at bedtime",
+    "Paracetamol 1 tablet in the morning and 2 tablets at bedtime",
+    # More times of day than doses
+    "Metformin 500mg daily in the morning and at night",
+    "Amlodipine 5mg every morning at bedtime",
+    "Metformin 500mg twice daily morning, afternoon and evening",
+])
+def test_risky_or_ambiguous_lines_go_to_the_llm(parser, text):
+    fields, _ = parser.parse(text)
+    assert fields is None
+
+
+@pytest.mark.parametrize("frequency", [
+    "once a week at bedtime", "twice weekly", "three times a week", "every other day", "monthly",
+    "twice daily at bedtime", "5 times daily", "6x daily", "five times every day"
+])
+def test_match_frequency_rejects_ambiguous_frequencies(frequency):
+    assert match_frequency(frequency) is None
+
+
+@pytest.mark.parametrize("frequency, canonical", [
+    ("once weekly", "once weekly"),
+    ("every week", "once weekly"),
+    ("twice daily", "twice daily"),
+    ("qhs", "once daily"),
+    ("every 8 hours", "every 8 hours"),
+    ("3 times daily", "three times daily"),
+    ("4 times daily", "four times daily"),
+    ("2 times daily", "twice daily"),
+    ("two times daily", "twice daily"),
+])
+def test_match_frequency(frequency, canonical):
+    assert match_frequency(frequency)["frequency"] == canonical
+
+
+@pytest.mark.parametrize("text, frequency", [
+    ("Amoxicillin 500mg 3 times daily", "three times daily"),
+    ("Metformin 500mg 2 times daily", "twice daily"),
+    ("Metformin 500mg two times daily", "twice daily"),
+])
+def test_counted_daily_doses_are_not_read_as_once_daily(parser, text, frequency):
+    fields, _ = parser.parse(text)
+    assert fields["frequency"] == frequency
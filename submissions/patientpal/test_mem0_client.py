@@ -0,0 +1,84 @@
+"""
+Tests for Mem0Client queued writes against the local Mem0 stand-in server.
+"""
+
+import socket
+import threading
+import uuid
+
+import pytest
+
+from mem0_client import Mem0Client
+from mem0_local_server import serve
+
+
+@pytest.fixture
+def server_url():
+    server = serve("127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(base_url):
+    # A long flush interval keeps the background flusher out of the way
+    return Mem0Client("local", base_url=base_url, flush_threshold=100, flush_interval=60,
+                      max_retries=0, backoff_seconds=0.01, timeout=2)
+
+
+def consultation(user_id, summary="Take metformin 500mg twice daily"):
+    return {"id": str(uuid.uuid4()), "userId": user_id, "timestamp": 1.0,
+            "type": "consultation", "summary": summary}
+
+
+def test_rejected_record_is_dropped_and_rest_of_queue_written(server_url):
+    client = make_client(server_url)
+    user_id = str(uuid.uuid4())
+    try:
+        client.add(consultation(user_id, "first"))
+        client.add(consultation(None))  # the stand-in rejects a missing user_id with 400
+        client.add(consultation(user_id, "second"))
+
+        assert client.flush() == 2
+        assert client._pending == []
+        assert client.flush() == 0
+        assert [record["summary"] for record in client.query(user_id, "consultation")] == ["first", "second"]
+    finally:
+        client.close()
+
+
+def test_transient_failure_keeps_records_queued():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        unused_port = sock.getsockname()[1]
+
+    client = make_client(f"http://127.0.0.1:{unused_port}")
+    records = [consultation("patient"), consultation("patient")]
+    for record in records:
+        client.add(record)
+
+    assert client.flush() == 0
+    assert client._pending == records
+    client._pending = []
+    client.close()
+
+
+def test_query_serves_own_unsent_records_without_flushing(server_url):
+    client = make_client(server_url)
+    user_id, other_user_id = str(uuid.uuid4()), str(uuid.uuid4())
+    try:
+        client.add(consultation(user_id, "sent"))
+        client.flush()
+        client.add(consultation(user_id, "queued"))
+        client.add(consultation(other_user_id, "someone else"))
+
+        assert [record["summary"] for record in client.query(user_id, "consultation")] == ["sent", "queued"]
+        assert client.query(user_id, "explanation") == []
+        assert len(client._pending) == 2
+
+        client.flush()
+        assert [record["summary"] for record in client.query(user_id, "consultation")] == ["sent", "queued"]
+    finally:
+        client.close()
@@ -0,0 +1,131 @@
+"""
+Tests for Mem0Service reads and write-behind persistence.
+"""
+
+import threading
+import time
+
+import pytest
+
+from memory import Mem0Service
+from memory_store import InMemoryRecordStore
+
+
+@pytest.fixture
+def remote_service(monkeypatch):
+    # Nothing listens on port 1, so every request to the API fails to connect
+    monkeypatch.setenv("MEM0_API_KEY", "test")
+    monkeypatch.setenv("MEM0_API_URL", "http://127.0.0.1:1")
+    monkeypatch.setenv("MEM0_MAX_RETRIES", "0")
+    monkeypatch.setenv("MEM0_FLUSH_INTERVAL", "60")
+    monkeypatch.setenv("MEM0_TIMEOUT", "1")
+    service = Mem0Service()
+    yield service
+    service.close()
+
+
+class SlowStore(InMemoryRecordStore):
+    """Record store whose background writes wait until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.writer_threads = set()
+
+    def add(self, record):
+        self.writer_threads.add(threading.current_thread().name)
+        if threading.current_thread().name == "mem0-writer":
+            self.release.wait(5)
+        super().add(record)
+
+
+@pytest.fixture
+def make_service(monkeypatch):
+    services = []
+
+    def make(queue_size=1000):
+        monkeypatch.delenv("MEM0_API_KEY", raising=False)
+        monkeypatch.setenv("MEM0_SIMULATION_STORE", "memory")
+        monkeypatch.setenv("MEM0_WRITE_BEHIND", "true")
+        monkeypatch.setenv("MEM0_WRITE_QUEUE_SIZE", str(queue_size))
+        monkeypatch.setenv("MEM0_WRITE_QUEUE_TIMEOUT", "0.05")
+        service = Mem0Service()
+        service._store = SlowStore()
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service._store.release.set()
+        service.close()
+
+
+def summaries(records):
+    return [record["summary"] for record in records]
+
+
+def test_writes_are_acknowledged_before_they_are_persisted(make_service):
+    service = make_service()
+    started = time.monotonic()
+    service.store_consultation("patient", {"summary": "first"})
+    service.store_consultation("patient", {"summary": "second"})
+    assert time.monotonic() - started < 1
+    assert service._store.query("patient", "consultation") == []
+
+    service._store.release.set()
+    service.flush()
+    assert summaries(service._store.query("patient", "consultation")) == ["first", "second"]
+    assert service.queue_depth() == 0
+
+
+def test_reads_see_queued_writes_including_pages(make_service):
+    service = make_service()
+    for summary in ("first", "second", "third"):
+        service.store_consultation("patient", {"summary": summary})
+        time.sleep(0.01)  # distinct timestamps
+    service.store_consultation("other-patient", {"summary": "not mine"})
+
+    assert summaries(service.get_user_consultations("patient")) == ["first", "second", "third"]
+    page = service.get_records_page("patient", "consultation", limit=2)
+    assert summaries(page["items"]) == ["second", "third"]
+    older = service.get_records_page("patient", "consultation", limit=2, cursor=page["next_cursor"])
+    assert summaries(older["items"]) == ["first"]
+    assert older["next_cursor"] is None
+
+
+def test_full_queue_writes_synchronously(make_service, capsys):
+    service = make_service(queue_size=1)
+    service.store_consultation("patient", {"summary": "taken by the writer"})
+    time.sleep(0.05)  # the writer holds the first record in the slow store
+    service.store_consultation("patient", {"summary": "queued"})
+    time.sleep(0.01)
+    service.store_consultation("patient", {"summary": "written synchronously"})
+
+    assert summaries(service._store.query("patient", "consultation")) == ["written synchronously"]
+    assert "writing synchronously" in capsys.readouterr().out
+    assert summaries(service.get_user_consultations("patient")) == [
+        "taken by the writer", "queued", "written synchronously"
+    ]
+
+
+def test_close_persists_every_queued_write(make_service):
+    service = make_service()
+    for summary in ("first", "second", "third"):
+        service.store_consultation("patient", {"summary": summary})
+    threading.Timer(0.1, service._store.release.set).start()
+
+    service.close()
+    assert summaries(service._store.query("patient", "consultation")) == ["first", "second", "third"]
+    assert service._store.writer_threads == {"mem0-writer"}
+
+    service.store_consultation("patient", {"summary": "after close"})  # written directly
+    assert summaries(service._store.query("patient", "consultation"))[-1] == "after close"
+
+
+def test_unreachable_api_falls_back_to_unsent_records(remote_service):
+    remote_service.store_consultation("patient", {"summary": "Take metformin"})
+    remote_service.flush()  # handed to the client, which has not sent it yet
+
+    consultations = remote_service.get_user_consultations("patient")
+    assert [record["summary"] for record in consultations] == ["Take metformin"]
+    assert remote_service.get_user_consultations("other-patient") == []
@@ -0,0 +1,80 @@
+"""
+Tests for record pagination and the simulated record stores.
+"""
+
+import datetime
+
+import pytest
+
+from memory_store import InMemoryRecordStore, SQLiteRecordStore, paginate
+
+
+def consultation(index, user_id="patient"):
+    # Two records share each timestamp so ties are broken by id
+    timestamp = datetime.datetime(2026, 1, 1 + index // 2).isoformat()
+    return {"id": f"c{index:02d}", "userId": user_id, "timestamp": timestamp, "type": "consultation"}
+
+
+RECORDS = [consultation(i) for i in range(9)]
+
+
+def ids(records):
+    return [record["id"] for record in records]
+
+
+def walk(fetch_page):
+    """Follow next_cursor from the newest page to the oldest."""
+    pages = []
+    cursor = None
+    while True:
+        page, cursor = fetch_page(cursor)
+        pages.append(ids(page))
+        if cursor is None:
+            return pages
+
+
+def test_pages_run_newest_first_and_cover_every_record_once():
+    pages = walk(lambda cursor: paginate(RECORDS, limit=4, cursor=cursor))
+    assert pages == [["c05", "c06", "c07", "c08"], ["c01", "c02", "c03", "c04"], ["c00"]]
+
+
+def test_no_limit_returns_everything():
+    assert paginate(RECORDS) == (RECORDS, None)
+
+
+def test_time_window_is_inclusive_then_exclusive():
+    page, cursor = paginate(RECORDS, since=datetime.datetime(2026, 1, 2), until="2026-01-04T00:00:00")
+    assert (ids(page), cursor) == (["c02", "c03", "c04", "c05"], None)
+
+
+def test_time_window_with_limit_pages_within_the_window():
+    pages = walk(lambda cursor: paginate(RECORDS, limit=3, cursor=cursor, since="2026-01-02T00:00:00"))
+    assert pages == [["c06", "c07", "c08"], ["c03", "c04", "c05"], ["c02"]]
+
+
+def test_empty_window():
+    assert paginate(RECORDS, since="2027-01-01T00:00:00") == ([], None)
+    assert paginate([], limit=5) == ([], None)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    store = InMemoryRecordStore() if request.param == "memory" else SQLiteRecordStore(str(tmp_path / "memory.db"))
+    # Out of order on purpose; other users' records must not leak into pages
+    for record in reversed(RECORDS):
+        store.add(record)
+    store.add(consultation(3, user_id="someone else") | {"id": "other"})
+    yield store
+    store.close()
+
+
+def test_stores_page_like_paginate(store):
+    for kwargs in ({"limit": 4}, {"limit": 3, "since": "2026-01-02T00:00:00"}, {"until": "2026-01-03T00:00:00"}):
+        expected = walk(lambda cursor: paginate(RECORDS, cursor=cursor, **kwargs))
+        actual = walk(lambda cursor: store.query_page("patient", "consultation", cursor=cursor, **kwargs))
+        assert actual == expected
+
+
+def test_store_query_is_oldest_first(store):
+    assert ids(store.query("patient", "consultation")) == ids(RECORDS)
+    assert store.query_page("nobody", "consultation", limit=3) == ([], None)
@@ -0,0 +1,116 @@
+"""
+Tests for term explanation clicks: the shared cache and background prefetching.
+"""
+
+import threading
+import time
+
+import pytest
+
+from explanation_cache import ExplanationCache, InMemoryCacheBackend
+from orchestrator import AgnoOrchestrator
+
+
+class Memory:
+    def __init__(self):
+        self.explanations = {}
+
+    def get_term_explanations(self, user_id, term):
+        found = self.explanations.get((user_id, term.lower()))
+        return [found] if found else []
+
+    def store_term_explanation(self, user_id, term, explanation_data):
+        self.explanations[(user_id, term.lower())] = {"id": term, "term": term, **explanation_data}
+        return term
+
+
+class Explainer:
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.terms = []
+        self.contexts = []
+
+    def explain_term(self, term, context=None):
+        self.terms.append(term)
+        self.contexts.append(context)
+        if term == "blocker":
+            self.started.set()
+            self.release.wait(5)
+        return {"explanation": f"{term} explained", "sources": []}
+
+    def explain_terms(self, terms):
+        return [self.explain_term(term, context) for term, context in terms]
+
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    monkeypatch.setenv("TERM_PREFETCH", "true")
+    monkeypatch.setenv("TERM_PREFETCH_WORKERS", "1")
+    monkeypatch.setenv("TERM_BATCH_SIZE", "1")
+    explainer = Explainer()
+    orchestrator = AgnoOrchestrator(None, None, None, explainer, None, Memory())
+    yield orchestrator
+    explainer.release.set()
+    orchestrator.close()
+
+
+def test_click_on_a_queued_prefetch_cancels_it_and_explains_directly(orchestrator):
+    explainer = orchestrator.explanation_service
+    orchestrator.prefetch_explanations("other-session", [{"term": "blocker"}])
+    assert explainer.started.wait(5)
+    orchestrator.prefetch_explanations("patient", [{"term": "statin"}])
+
+    started = time.monotonic()
+    result = orchestrator.explain_term("patient", "statin")
+    assert time.monotonic() - started < 1  # not stuck behind the other session's job
+    assert result["explanation"] == "statin explained"
+    assert explainer.terms == ["blocker", "statin"]
+
+
+def test_click_waits_for_a_running_prefetch_instead_of_repeating_it(orchestrator):
+    explainer = orchestrator.explanation_service
+    orchestrator.prefetch_explanations("patient", [{"term": "blocker"}])
+    assert explainer.started.wait(5)
+    threading.Timer(0.1, explainer.release.set).start()
+
+    assert orchestrator.explain_term("patient", "blocker")["explanation"] == "blocker explained"
+    assert explainer.terms == ["blocker"]
+
+
+def test_two_users_clicking_the_same_term_share_one_context_free_explanation():
+    explainer = Explainer()
+    cache = ExplanationCache(backend=InMemoryCacheBackend(), ttl_seconds=60, use_context=False)
+    orchestrator = AgnoOrchestrator(None, None, None, explainer, None, Memory(), cache)
+
+    first = orchestrator.explain_term("patient-a", "Hypertension", "Patient A's blood pressure was 160/100")
+    second = orchestrator.explain_term("patient-b", "hypertension", "Patient B is pregnant")
+    assert first["explanation"] == second["explanation"] == "Hypertension explained"
+    assert explainer.terms == ["Hypertension"]
+    assert explainer.contexts == [None]
+
+
+def test_contextual_explanations_are_not_shared_across_contexts():
+    explainer = Explainer()
+    cache = ExplanationCache(backend=InMemoryCacheBackend(), ttl_seconds=60, use_context=True)
+    orchestrator = AgnoOrchestrator(None, None, None, explainer, None, Memory(), cache)
+
+    orchestrator.explain_term("patient-a", "hypertension", "Patient A's blood pressure was 160/100")
+    orchestrator.explain_term("patient-b", "hypertension", "Patient B is pregnant")
+    assert explainer.contexts == ["Patient A's blood pressure was 160/100", "Patient B is pregnant"]
+
+
+def test_concurrent_medication_parsing_keeps_input_order_and_skips_failures(monkeypatch):
+    monkeypatch.setenv("MEDICATION_PARSE_MODE", "concurrent")
+    monkeypatch.setenv("MEDICATION_PARSE_CONCURRENCY", "4")
+
+    class Parser:
+        def parse_medication_input(self, text, timeout=None):
+            time.sleep(0.05 * (4 - len(text.split())))  # later lines finish first
+            if "unreadable" in text:
+                raise ValueError(f"Failed to parse medication information: {text}")
+            return text.split()[0]
+
+    orchestrator = AgnoOrchestrator(None, None, None, None, Parser(), Memory())
+    lines = ["Aspirin", "unreadable scribble", "Metformin 500mg daily"]
+    assert orchestrator._parse_medications(lines) == ["Aspirin", "Metformin"]
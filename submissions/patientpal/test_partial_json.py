@@ -0,0 +1,61 @@
+"""
+Tests for parsing JSON that is still being streamed.
+"""
+
+import json
+
+import pytest
+
+from partial_json import parse_partial_json
+
+
+DOCUMENT = json.dumps({
+    "summary": "Take metformin 500mg twice daily. Café visit é",
+    "terms": [{"term": "metformin", "context": "diabetes medicine"}, {"term": "HbA1c", "context": "blood test"}]
+}, ensure_ascii=True)
+
+
+def test_nothing_usable_yet():
+    assert parse_partial_json("") is None
+    assert parse_partial_json("Sure, here is") is None
+
+
+def test_complete_document_ignores_trailing_text():
+    assert parse_partial_json(DOCUMENT + "\nHope this helps!") == json.loads(DOCUMENT)
+
+
+def test_open_string_and_containers_are_closed():
+    assert parse_partial_json('{"summary": "Take met') == {"summary": "Take met"}
+    assert parse_partial_json('{"summary": "x", "terms": [{"term": "met') == {
+        "summary": "x", "terms": [{"term": "met"}]
+    }
+
+
+def test_incomplete_key_is_dropped():
+    assert parse_partial_json('{"summary": "x", "ter') == {"summary": "x"}
+
+
+@pytest.mark.parametrize("text, summary", [
+    ('{"summary": "caf\\u00', "caf"),
+    ('{"summary": "caf\\u', "caf"),
+    ('{"summary": "caf\\', "caf"),
+    ('{"summary": "caf\\u00e9 ok', "café ok"),
+    ('{"summary": "a\\\\u00', "a\\u00"),
+])
+def test_truncated_escapes_do_not_blank_the_string(text, summary):
+    assert parse_partial_json(text) == {"summary": summary}
+
+
+def test_every_prefix_keeps_the_summary_growing():
+    """The streamed summary should never flicker back to empty once text has arrived."""
+    summary = json.loads(DOCUMENT)["summary"]
+    seen = ""
+    for end in range(1, len(DOCUMENT) + 1):
+        partial = parse_partial_json(DOCUMENT[:end])
+        if not isinstance(partial, dict) or "summary" not in partial:
+            assert seen == ""
+            continue
+        assert summary.startswith(partial["summary"])
+        assert len(partial["summary"]) >= len(seen)
+        seen = partial["summary"]
+    assert seen == summary
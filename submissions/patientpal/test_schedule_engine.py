@@ -0,0 +1,99 @@
+"""
+Tests for the local medication schedule engine.
+"""
+
+import pytest
+
+from medication import Medication
+from schedule_engine import LocalScheduleEngine, SCHEDULE_KEYS
+
+
+def medication(frequency, timing="as directed", name="Drug", dosage="10mg"):
+    return Medication(name=name, dosage=dosage, frequency=frequency, timing=timing)
+
+
+def daily_entries(schedule):
+    return [entry for key in SCHEDULE_KEYS for entry in schedule[key]]
+
+
+@pytest.fixture
+def engine():
+    return LocalScheduleEngine()
+
+
+def test_daily_doses_are_bucketed_by_time(engine):
+    schedule, unscheduled = engine.build_schedule([medication("twice daily")])
+    assert unscheduled == []
+    assert [entry["time"] for entry in schedule["morningSchedule"]] == ["8:00 AM"]
+    assert [entry["time"] for entry in schedule["eveningSchedule"]] == ["6:30 PM"]
+    assert schedule["weeklySchedule"] == []
+
+
+def test_once_weekly_goes_to_weekly_schedule_only(engine):
+    schedule, unscheduled = engine.build_schedule([medication("once weekly", "at bedtime", name="Methotrexate")])
+    assert unscheduled == []
+    assert daily_entries(schedule) == []
+    assert [entry["time"] for entry in schedule["weeklySchedule"]] == ["Once a week, 10:00 PM"]
+
+
+@pytest.mark.parametrize("frequency, timing", [
+    ("once a week at bedtime", "as directed"),
+    ("weekly every morning", "as directed"),
+    ("twice weekly", "as directed"),
+    ("three times a week", "in the morning"),
+    ("twice weekly", "at bedtime"),
+    ("every 2 weeks", "as directed"),
+    ("every other day", "in the morning"),
+    ("once daily", "on Mondays every week"),
+    ("twice daily at bedtime", "as directed"),
+    ("5 times daily", "as directed"),
+])
+def test_non_daily_or_conflicting_frequencies_are_left_to_the_llm(engine, frequency, timing):
+    schedule, unscheduled = engine.build_schedule([medication(frequency, timing)])
+    assert len(unscheduled) == 1
+    assert daily_entries(schedule) == []
+    assert schedule["weeklySchedule"] == []
+
+
+def test_single_named_meal_anchors_one_dose(engine):
+    schedule, _ = engine.build_schedule([medication("twice daily", "with dinner")])
+    assert [(entry["time"], entry["instructions"]) for entry in schedule["morningSchedule"]] == [("8:00 AM", "")]
+    assert [(entry["time"], entry["instructions"]) for entry in schedule["eveningSchedule"]] == [("6:30 PM", "with dinner")]
+
+
+def test_as_needed_is_not_scheduled_daily(engine):
+    schedule, unscheduled = engine.build_schedule([medication("as needed")])
+    assert unscheduled == []
+    assert daily_entries(schedule) == []
+    assert len(schedule["asNeededSchedule"]) == 1
+
+
+@pytest.mark.parametrize("frequency, count", [
+    ("3 times daily", 3),
+    ("2 times daily", 2),
+    ("two times daily", 2),
+    ("4 times daily", 4),
+])
+def test_counted_daily_frequencies_get_every_dose(engine, frequency, count):
+    schedule, unscheduled = engine.build_schedule([medication(frequency)])
+    assert unscheduled == []
+    assert len(daily_entries(schedule)) == count
+
+
+def test_named_times_of_day_pick_the_dose_slots(engine):
+    schedule, _ = engine.build_schedule([medication("twice daily", "morning and night")])
+    assert [entry["time"] for entry in schedule["morningSchedule"]] == ["8:00 AM"]
+    assert schedule["eveningSchedule"] == []
+    assert [entry["time"] for entry in schedule["nightSchedule"]] == ["10:00 PM"]
+
+
+@pytest.mark.parametrize("frequency, timing, times", [
+    ("3 times daily", "as directed", ["8:00 AM", "12:30 PM", "6:30 PM"]),
+    ("once daily", "in the afternoon", ["12:30 PM"]),
+    ("once daily", "after lunch", ["1:00 PM"]),
+    ("once daily", "before breakfast", ["7:30 AM"]),
+])
+def test_afternoon_is_not_an_after_meal_offset(engine, frequency, timing, times):
+    schedule, unscheduled = engine.build_schedule([medication(frequency, timing)])
+    assert unscheduled == []
+    assert [entry["time"] for entry in daily_entries(schedule)] == times
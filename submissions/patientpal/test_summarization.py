@@ -0,0 +1,59 @@
+"""
+Tests for streamed summaries and their JSON-mode fallback, with a stubbed Groq client.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from summarization import ConsultationSummaryService
+
+SUMMARY = {"summary": "Take metformin 500mg twice daily.", "terms": [{"term": "metformin", "context": "diabetes"}]}
+
+
+def stream_of(content, size=7):
+    for i in range(0, len(content), size):
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + size]))])
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("SUMMARY_EXTRACT_MEDICATIONS", "false")
+    return ConsultationSummaryService()
+
+
+def stub(service, streamed, json_reply=None):
+    calls = []
+
+    def create(**kwargs):
+        calls.append("stream" if kwargs.get("stream") else "json")
+        if kwargs.get("stream"):
+            return stream_of(streamed)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json_reply))])
+
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return calls
+
+
+def test_complete_stream_needs_no_second_request(service):
+    calls = stub(service, "Here you go: " + json.dumps(SUMMARY))
+    items = list(service.summarize_stream("consultation"))
+    assert items[-1] == {**SUMMARY, "done": True}
+    assert not any(item["done"] for item in items[:-1])
+    assert calls == ["stream"]
+
+
+def test_truncated_stream_is_retried_once_in_json_mode(service):
+    calls = stub(service, json.dumps(SUMMARY)[:30], json_reply=json.dumps(SUMMARY))
+    final = list(service.summarize_stream("consultation"))[-1]
+    assert final == {**SUMMARY, "done": True}
+    assert calls == ["stream", "json"]
+
+
+def test_failed_retry_reports_the_failure(service):
+    calls = stub(service, "I cannot help with that.", json_reply="not json")
+    final = list(service.summarize_stream("consultation"))[-1]
+    assert final["summary"].startswith("Failed to generate summary")
+    assert calls == ["stream", "json"]
@@ -0,0 +1,75 @@
+"""
+Tests for batched term explanations and their fallbacks, with a stubbed Groq client.
+"""
+
+import json
+import re
+from types import SimpleNamespace
+
+import groq
+import httpx
+import pytest
+
+from term_explanation import TermExplanationService
+
+
+def reply(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("GLOSSARY_ENABLED", "false")
+    monkeypatch.setenv("TERM_BATCH_SIZE", "2")
+    monkeypatch.setenv("TERM_BATCH_RETRIES", "1")
+    return TermExplanationService()
+
+
+def stub(service, answer_batch):
+    """Answer batch requests with answer_batch(terms) and single requests directly."""
+    calls = []
+
+    def create(**kwargs):
+        prompt = kwargs["messages"][1]["content"]
+        terms = re.findall(r"^\d+\. '([^']*)'", prompt, re.MULTILINE)
+        if terms:
+            calls.append(terms)
+            return answer_batch(terms)
+        term = re.search(r"term '([^']*)'", prompt).group(1)
+        calls.append(term)
+        return reply(json.dumps({"explanation": f"{term} (single)", "sources": []}))
+
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return calls
+
+
+def batch_reply(terms, skip=()):
+    return reply(json.dumps({"explanations": [
+        {"index": i, "term": term, "explanation": f"{term} (batch)", "sources": ["NHS"]}
+        for i, term in enumerate(terms, start=1) if term not in skip
+    ]}))
+
+
+def test_terms_are_explained_a_batch_per_request(service):
+    calls = stub(service, batch_reply)
+    results = service.explain_terms([("statin", None), ("HbA1c", "blood test"), {"term": "ECG"}])
+    assert [result["explanation"] for result in results] == ["statin (batch)", "HbA1c (batch)", "ECG (batch)"]
+    assert calls == [["statin", "HbA1c"], ["ECG"]]
+
+
+def test_terms_missing_from_the_reply_are_retried_then_explained_singly(service):
+    calls = stub(service, lambda terms: batch_reply(terms, skip={"eGFR"}))
+    results = service.explain_terms([("statin", None), ("eGFR", None)])
+    assert [result["explanation"] for result in results] == ["statin (batch)", "eGFR (single)"]
+    assert calls == [["statin", "eGFR"], ["eGFR"], "eGFR"]
+
+
+def test_api_errors_on_a_batch_fall_back_to_single_requests(service):
+    def fail(terms):
+        raise groq.APIConnectionError(request=httpx.Request("POST", "https://api.groq.com"))
+
+    calls = stub(service, fail)
+    results = service.explain_terms([("statin", None), ("eGFR", None)])
+    assert [result["explanation"] for result in results] == ["statin (single)", "eGFR (single)"]
+    assert calls[-2:] == ["statin", "eGFR"]
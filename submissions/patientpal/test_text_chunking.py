@@ -0,0 +1,44 @@
+"""
+Tests for sentence-aware transcript chunking.
+"""
+
+from text_chunking import chunk_text, estimate_tokens, split_sentences
+
+TRANSCRIPT = " ".join(
+    f"Sentence {i} covers the plan for medication number {i}." for i in range(40)
+)
+
+
+def test_short_text_is_one_chunk():
+    assert chunk_text("Take metformin. Come back in two weeks.", max_tokens=100) == [
+        "Take metformin. Come back in two weeks."
+    ]
+
+
+def test_chunks_fit_the_budget_and_cut_between_sentences():
+    chunks = chunk_text(TRANSCRIPT, max_tokens=60)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 60 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert " ".join(chunks) == TRANSCRIPT
+
+
+def test_overlap_repeats_trailing_sentences_within_the_budget():
+    chunks = chunk_text(TRANSCRIPT, max_tokens=60, overlap_tokens=20)
+    assert all(estimate_tokens(chunk) <= 60 for chunk in chunks)
+    for previous, following in zip(chunks, chunks[1:]):
+        last_sentence = split_sentences(previous)[-1]
+        assert following.startswith(last_sentence)
+
+
+def test_unpunctuated_speech_is_split_on_words():
+    speech = " ".join(["okay so take the tablet"] * 100)
+    chunks = chunk_text(speech, max_tokens=50)
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+    assert " ".join(chunks).split() == speech.split()
+
+
+def test_paragraph_breaks_are_sentence_boundaries():
+    assert split_sentences("History of asthma\n\nPlan: inhaler as needed") == [
+        "History of asthma", "Plan: inhaler as needed"
+    ]
@@ -0,0 +1,90 @@
+"""
+Token-aware text chunking for PatientPal.
+Splits long consultation transcripts on sentence boundaries so each piece fits a model's context window.
+"""
+
+import re
+
+# Rough English average for Llama-family tokenizers; errs on the side of overestimating
+CHARS_PER_TOKEN = 3.5
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+
+
+def estimate_tokens(text):
+    """
+    Estimate the token count of a text without a tokenizer.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    return _estimate(len(text), len(text.split()))
+
+
+def _estimate(chars, words):
+    return int(max(chars / CHARS_PER_TOKEN, words * 1.3)) + 1
+
+
+def split_sentences(text):
+    """Split text into sentences and paragraphs, dropping empty pieces."""
+    return [piece.strip() for piece in SENTENCE_BOUNDARY.split(text) if piece and piece.strip()]
+
+
+def chunk_text(text, max_tokens, overlap_tokens=0):
+    """
+    Split text into chunks of at most max_tokens, cutting between sentences.
+
+    Args:
+        text (str): Text to split
+        max_tokens (int): Token budget per chunk
+        overlap_tokens (int): Trailing sentences repeated at the start of the next chunk
+
+    Returns:
+        List[str]: Chunks in order
+    """
+    pieces = []
+    for sentence in split_sentences(text):
+        if estimate_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        # A single overlong sentence (e.g. unpunctuated speech) is split on words
+        part = []
+        part_chars = 0
+        for word in sentence.split():
+            chars = part_chars + len(word) + (1 if part else 0)
+            if part and _estimate(chars, len(part) + 1) > max_tokens:
+                pieces.append(" ".join(part))
+                part = []
+                chars = len(word)
+            part.append(word)
+            part_chars = chars
+        if part:
+            pieces.append(" ".join(part))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        tokens = estimate_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            overlap = []
+            overlap_size = 0
+            for previous in reversed(current):
+                size = estimate_tokens(previous)
+                if overlap_size + size > overlap_tokens or overlap_size + size + tokens > max_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += size
+            current = overlap
+            current_tokens = overlap_size
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
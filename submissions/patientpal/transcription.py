@@ -1,8 +1,20 @@
 import os
+import io
+import time
+import threading
 from pathlib import Path
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from groq import Groq
 
+from content_cache import ContentCache, hash_content
+from audio_processing import (
+    wav_info, window_energies, sample_energies, plan_chunks, read_wav_segment, stitch_transcripts,
+    to_mono_int16, encode_wav, encode_audio, resample_wav_to_mono, decode_with_ffmpeg, silence_bounds
+)
+
+ENERGY_WINDOW_SECONDS = 0.1
+
 class TranscriptionService:
     def __init__(self):
         api_key = os.getenv("GROQ_API_KEY")
@@ -10,32 +22,271 @@ class TranscriptionService:
             raise ValueError("GROQ_API_KEY environment variable is not set")
         self.client = Groq(api_key=api_key)
         
+        # Long WAV recordings are split on silence and transcribed in parallel
+        self.chunking_enabled = os.getenv("TRANSCRIPTION_CHUNKING", "true").lower() in ("1", "true", "yes")
+        self.chunk_seconds = float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "120"))
+        self.chunk_overlap_seconds = float(os.getenv("TRANSCRIPTION_CHUNK_OVERLAP_SECONDS", "2"))
+        self.max_workers = int(os.getenv("TRANSCRIPTION_MAX_WORKERS", "4"))
+        
+        # Recordings are downmixed, resampled and trimmed locally before upload
+        self.preprocessing_enabled = os.getenv("AUDIO_PREPROCESSING", "true").lower() in ("1", "true", "yes")
+        self.target_sample_rate = int(os.getenv("AUDIO_TARGET_SAMPLE_RATE", "16000"))
+        self.silence_threshold = float(os.getenv("AUDIO_SILENCE_THRESHOLD", "0.01"))
+        self.upload_format = os.getenv("AUDIO_UPLOAD_FORMAT", "flac").lower()
+        self.last_preprocessing_stats = None
+        
+        # Re-submitted recordings are answered from a content-addressed cache
+        self.cache = None
+        if os.getenv("CONTENT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"):
+            namespace = "transcription-whisper-large-v3"
+            if self.preprocessing_enabled:
+                namespace += f"-pp{self.target_sample_rate}-{self.silence_threshold:g}"
+            if self.chunking_enabled:
+                namespace += f"-chunk{self.chunk_seconds:g}-{self.chunk_overlap_seconds:g}"
+            self.cache = ContentCache(namespace)
+        
     def transcribe(self, audio_file):
+        cache_key = hash_content(audio_file) if self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        transcription = self._transcribe_uncached(audio_file)
+        
+        text = getattr(transcription, "text", transcription)
+        if cache_key is not None and text:
+            self.cache.set(cache_key, text)
+        return transcription
+    
+    def _transcribe_uncached(self, audio_file):
+        """
+        Transcribe a recording given as a path or an open file object.
+        
+        Pre-processing and chunking need random access to the decoded audio,
+        so they only apply to paths. File objects are streamed as-is in one
+        upload rather than spooled to a temporary copy.
+        """
         if isinstance(audio_file, str):
-            # If it's already a path (from Gradio), use it directly
-            tmp_path = audio_file
-            need_cleanup = False
+            info = wav_info(audio_file)
+            supported_wav = info is not None and info["sample_width"] in (1, 2, 4)
+            
+            if self.preprocessing_enabled:
+                transcription = self._transcribe_preprocessed(audio_file, info, supported_wav)
+                if transcription is not None:
+                    return transcription
+            
+            if self.chunking_enabled and supported_wav and info["duration"] > self.chunk_seconds:
+                return self.transcribe_chunked(audio_file, info["duration"])
+            
+            # If it's already a path (from Gradio), stream it from disk
+            with open(audio_file, "rb") as audio_file_obj:
+                return self._transcribe_stream(os.path.basename(audio_file), audio_file_obj)
+        
+        # File-like objects are uploaded directly, without a temporary copy
+        if self.preprocessing_enabled or self.chunking_enabled:
+            print("Audio given as a file object is uploaded without pre-processing or chunking")
+        filename = os.path.basename(getattr(audio_file, "name", "") or "audio.wav")
+        return self._transcribe_stream(filename, audio_file)
+    
+    def _transcribe_preprocessed(self, audio_path, info, supported_wav):
+        """
+        Upload the recording downmixed, resampled and trimmed of silence.
+        
+        WAV files are decoded one chunk at a time from disk; other formats are
+        decoded with ffmpeg. Returns None when the format is unsupported or the
+        whole recording is below the silence threshold, so the caller uploads
+        the original instead.
+        """
+        rate = self.target_sample_rate
+        if supported_wav:
+            energies = window_energies(audio_path, ENERGY_WINDOW_SECONDS)
+            duration = info["duration"]
+            read_samples = lambda start, end: resample_wav_to_mono(audio_path, rate, start_seconds=start, end_seconds=end)
         else:
-            # If it's a file-like object, read and save it
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as tmp_file:
-                tmp_file.write(audio_file.read())
-                tmp_path = tmp_file.name
-            need_cleanup = True
+            samples = decode_with_ffmpeg(audio_path, rate)
+            if samples is None:
+                return None
+            energies = sample_energies(samples, rate, ENERGY_WINDOW_SECONDS)
+            duration = len(samples) / float(rate)
+            read_samples = lambda start, end: samples[int(start * rate):int(end * rate)]
+        
+        bounds = silence_bounds(energies, ENERGY_WINDOW_SECONDS, duration, self.silence_threshold)
+        if bounds is None:
+            return None
+        trim_start, trim_end = bounds
+        trimmed_duration = trim_end - trim_start
+        original_bytes = os.path.getsize(audio_path)
+        uploaded = [0]
+        uploaded_lock = threading.Lock()
+        
+        def read_segment(start, end):
+            segment = read_samples(trim_start + start, trim_start + end)
+            encoded, audio_format = encode_audio(segment, rate, self.upload_format)
+            with uploaded_lock:
+                uploaded[0] += len(encoded)
+            return encoded, audio_format
         
+        started = time.perf_counter()
+        if self.chunking_enabled and trimmed_duration > self.chunk_seconds:
+            first_window = int(trim_start / ENERGY_WINDOW_SECONDS)
+            transcription = self._transcribe_chunks(
+                energies[first_window:], ENERGY_WINDOW_SECONDS, trimmed_duration, read_segment
+            )
+        else:
+            encoded, audio_format = read_segment(0, trimmed_duration)
+            transcription = self._transcribe_stream(f"audio.{audio_format}", io.BytesIO(encoded))
+        
+        self.last_preprocessing_stats = {
+            "original_bytes": original_bytes,
+            "uploaded_bytes": uploaded[0],
+            "saved_bytes": original_bytes - uploaded[0],
+            "duration_seconds": trimmed_duration,
+            "transcription_seconds": time.perf_counter() - started
+        }
+        print(
+            f"Audio pre-processing: {original_bytes} -> {uploaded[0]} bytes "
+            f"({100.0 * (1 - uploaded[0] / max(1, original_bytes)):.0f}% smaller), "
+            f"transcribed in {self.last_preprocessing_stats['transcription_seconds']:.2f}s"
+        )
+        return transcription
+    
+    def transcribe_chunked(self, audio_path, duration):
+        """
+        Transcribe a long WAV recording as overlapping chunks in parallel.
+        
+        Args:
+            audio_path (str): Path to a PCM WAV file
+            duration (float): Recording length in seconds
+            
+        Returns:
+            str: Transcript with chunk overlaps de-duplicated
+        """
+        window_seconds = 0.1
+        energies = window_energies(audio_path, window_seconds)
+        return self._transcribe_chunks(
+            energies, window_seconds, duration,
+            lambda start, end: (read_wav_segment(audio_path, start, end), "wav")
+        )
+    
+    def _transcribe_chunks(self, energies, window_seconds, duration, read_segment):
+        """Split on silence, transcribe chunks concurrently and stitch the results in order."""
+        chunks = plan_chunks(energies, window_seconds, duration, self.chunk_seconds, self.chunk_overlap_seconds)
+        
+        def transcribe_chunk(indexed_chunk):
+            index, (start, end) = indexed_chunk
+            segment, audio_format = read_segment(start, end)
+            transcription = self._transcribe_stream(f"chunk_{index:03d}.{audio_format}", io.BytesIO(segment))
+            return getattr(transcription, "text", transcription)
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(chunks)))) as executor:
+            texts = list(executor.map(transcribe_chunk, enumerate(chunks)))
+        
+        return stitch_transcripts(texts)
+    
+    def _transcribe_stream(self, filename, audio_stream):
+        # The (filename, file object) form lets the HTTP client read the
+        # upload in chunks instead of loading it into memory first
+        transcription = self.client.audio.transcriptions.create(
+            file=(filename, audio_stream),
+            model="whisper-large-v3",
+            prompt="This is a medical consultation recording. Please transcribe accurately including medical terminology.",
+            response_format="text",
+            language="en",
+            temperature=0.0
+        )
+        
+        return transcription
+
+
+class LiveTranscriptionSession:
+    def __init__(self, transcription_service, segment_seconds=None, overlap_seconds=None):
+        """
+        Transcribe microphone audio in rolling segments while recording continues.
+        
+        Args:
+            transcription_service (TranscriptionService): Service used for each segment
+            segment_seconds (float, optional): New audio collected before a segment is sent
+            overlap_seconds (float, optional): Audio repeated from the previous segment
+        """
+        self.transcription_service = transcription_service
+        self.segment_seconds = segment_seconds or float(os.getenv("LIVE_TRANSCRIPTION_SEGMENT_SECONDS", "10"))
+        self.overlap_seconds = overlap_seconds if overlap_seconds is not None else float(
+            os.getenv("LIVE_TRANSCRIPTION_OVERLAP_SECONDS", "1")
+        )
+        self.sample_rate = None
+        self._chunks = []  # overlap tail of the last segment followed by new audio
+        self._new_samples = 0
+        self._recorded_samples = 0
+        self._texts = []
+        self.failed_segments = []  # (segment number, start seconds, end seconds, error message)
+        self._lock = threading.Lock()
+        # One worker keeps segments in order without blocking the audio stream
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = []
+    
+    def _submit_segment(self):
+        audio = np.concatenate(self._chunks)
+        segment = encode_wav(audio, self.sample_rate)
+        overlap = int(self.overlap_seconds * self.sample_rate)
+        self._chunks = [audio[-overlap:]] if overlap else []
+        start = (self._recorded_samples - self._new_samples) / float(self.sample_rate)
+        end = self._recorded_samples / float(self.sample_rate)
+        self._new_samples = 0
+        self._pending.append(self._executor.submit(self._transcribe_segment, len(self._pending) + 1, segment, start, end))
+    
+    def _transcribe_segment(self, number, segment, start, end):
+        # A failed segment is recorded and skipped so the rest of the transcript survives
         try:
-            # Use Groq's Whisper API for transcription
-            with open(tmp_path, "rb") as audio_file_obj:
-                transcription = self.client.audio.transcriptions.create(
-                    file=audio_file_obj,
-                    model="whisper-large-v3",
-                    prompt="This is a medical consultation recording. Please transcribe accurately including medical terminology.",
-                    response_format="text",
-                    language="en",
-                    temperature=0.0
-                )
+            transcription = self.transcription_service._transcribe_stream("live_segment.wav", io.BytesIO(segment))
+        except Exception as e:
+            print(f"Live transcription of segment {number} ({start:.0f}-{end:.0f}s) failed: {e}")
+            with self._lock:
+                self.failed_segments.append((number, start, end, str(e)))
+            return
+        with self._lock:
+            self._texts.append(getattr(transcription, "text", transcription))
+    
+    def add_audio(self, sample_rate, samples):
+        """
+        Add a chunk of recorded audio; sends a segment once enough new audio is buffered.
+        
+        Args:
+            sample_rate (int): Sample rate of the chunk
+            samples (numpy.ndarray): Audio samples, mono or frames x channels
             
-            return transcription
+        Returns:
+            str: Transcript of the segments finished so far
+        """
+        if self.sample_rate is None:
+            self.sample_rate = sample_rate
+        samples = to_mono_int16(samples)
+        self._chunks.append(samples)
+        self._new_samples += len(samples)
+        self._recorded_samples += len(samples)
+        
+        if self._new_samples >= self.segment_seconds * self.sample_rate:
+            self._submit_segment()
+        return self.transcript()
+    
+    def transcript(self):
+        """Get the transcript of the segments finished so far."""
+        with self._lock:
+            return stitch_transcripts(self._texts)
+    
+    def finish(self):
+        """
+        Transcribe any remaining audio and wait for outstanding segments.
+        
+        Segments that fail are left out of the transcript and listed in
+        failed_segments.
         
-        finally:
-            if need_cleanup:
-                os.unlink(tmp_path)
+        Returns:
+            str: Transcript of every segment that was transcribed
+        """
+        if self._new_samples:
+            self._submit_segment()
+        for future in self._pending:
+            future.result()
+        self._executor.shutdown()
+        return self.transcript()